@@ -1,12 +1,23 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, WebSocket, WebSocketDisconnect
 from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 
-from app.services import resume_parser, resume_ai, question_generator, text_to_speech, speech_to_text
+from app.services import resume_cache, question_generator, speech_to_text, interview_pipeline, audio_preprocess
+from app.services.answer_stream import StreamingTranscriber
 from app.services.session_manager import session_manager
-from app.services.background_tasks import prefetch_tts, process_answer_evaluation
+from app.services.feedback_events import feedback_events
+from app.services.background_tasks import enqueue_prefetch_tts, enqueue_answer_evaluation
+from app.services.tts_scheduler import tts_scheduler
+from app.services.upload_ingest import ingest_upload
+from app.core.config import settings
 import os
+import json
+import asyncio
+import time
+import uuid
+from contextlib import aclosing
 
 router = APIRouter(prefix="/interview", tags=["Interview"])
 
@@ -28,44 +39,98 @@ class NextQuestionResponse(BaseModel):
     audio_path: Optional[str] = None
     progress: str
 
+async def _start_batch(questions: list[str]):
+    # 5. Create Session (store calls may hit the database: never on the loop)
+    session_id = await run_in_threadpool(session_manager.create_session, questions)
+
+    # 6. Speak First Question (ahead of every queued prefetch)
+    tts_result = await tts_scheduler.request(session_id, 0, questions[0])
+    return session_id, tts_result
+
+async def _start_streaming(parsed_data: dict):
+    """
+    Streams questions from the model. Each question goes to the TTS
+    scheduler the moment its line is complete (Q0 urgent), so synthesis
+    overlaps with the rest of the generation. The durable prefetch job
+    queued once the interview starts joins those jobs (or hits the clip
+    cache) and covers anything lost to a restart.
+    Returns (session_id, questions, Q0 TTS future); questions is empty if
+    nothing usable was streamed or the stream failed part-way (the partial
+    session and its queued TTS are dropped; the caller generates in batch).
+    """
+    session_id = await run_in_threadpool(session_manager.create_session, [])
+    first_tts, idx, complete = None, 0, False
+    try:
+        async with aclosing(question_generator.stream_interview_questions(parsed_data)) as stream:
+            async for question in stream:
+                await run_in_threadpool(session_manager.add_question, session_id, question)
+                if idx == 0:
+                    first_tts = tts_scheduler.submit(session_id, 0, question, urgent=True)
+                else:
+                    tts_scheduler.prefetch(session_id, idx, question)
+                idx += 1
+        complete = True
+    except Exception as e:
+        print(f"DEBUG: Question stream failed after {idx} question(s), falling back to batch: {e}")
+    finally:
+        if not complete or first_tts is None:
+            tts_scheduler.cancel_session(session_id)
+            await run_in_threadpool(session_manager.discard_session, session_id)
+
+    if not complete or first_tts is None:
+        return None, [], None
+
+    session = await run_in_threadpool(session_manager.get_session, session_id)
+    return session_id, session.questions, first_tts
+
 @router.post("/start", response_model=StartResponse)
-async def start_interview(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    # 1. Read File
+async def start_interview(
+    file: UploadFile = File(...),
+    mode: Optional[str] = Form(None) # "two_call" | "combined"; defaults to settings.PARSE_MODE
+):
     try:
-        file_bytes = await file.read()
-        filename = file.filename
-        
-        # 2. Parse Text
-        resume_text = await run_in_threadpool(resume_parser.extract_resume_text, filename, file_bytes)
-        
-        # 3. Extract Structured JSON
-        # (This uses the LLM to get skills/exp/edu)
-        parsed_data = await run_in_threadpool(resume_ai.convert_resume_to_json, resume_text)
-        
-        # 4. Generate Questions
-        # (This uses LLM to generate 10 questions)
-        questions = await run_in_threadpool(question_generator.generate_interview_questions, parsed_data)
-        
+        mode = interview_pipeline.resolve_mode(mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 1. Stream File (size-limited, hashed while streaming)
+    try:
+        session_id, first_tts = None, None
+        with await ingest_upload(file, settings.MAX_UPLOAD_BYTES) as upload, interview_pipeline.measure(mode):
+            questions = []
+            # 2-4 (combined mode). Structured resume + questions in a single LLM request
+            if mode == "combined":
+                questions = await interview_pipeline.combined_questions(upload)
+
+            if not questions:
+                # 2 + 3. Parse Text and Extract Structured JSON
+                # (This uses the LLM to get skills/exp/edu; cached by file hash so re-uploads skip both)
+                parsed_data = await resume_cache.get_parsed_resume(upload)
+
+                # 4. Generate Questions
+                # (streamed: Q0's TTS starts as soon as its line arrives)
+                if settings.QUESTION_STREAMING:
+                    session_id, questions, first_tts = await _start_streaming(parsed_data)
+                if not questions:
+                    questions = await question_generator.generate_interview_questions_async(parsed_data)
+
         if not questions:
             raise HTTPException(status_code=500, detail="Failed to generate questions")
 
-        # 5. Create Session
-        session_id = session_manager.create_session(questions)
-        
-        # 6. Speak First Question
-        first_q = questions[0]
-        # Use simple filenames as requested by user for now? 
-        # Actually for multiple questions in a session, we need unique filenames to avoid collision or overwrite.
-        # But user asked 'remove uuid' from TTS service. 
-        # I will pass a filename_prefix that includes session_id + index so it's unique but deterministic.
-        
-        tts_result = await run_in_threadpool(text_to_speech.speak_text, first_q, filename_prefix=f"q_{session_id}_0")
-        
+        # 5-6. Create Session, Speak First Question
+        if first_tts is not None:
+            # shield: a client disconnect mustn't cancel the shared job
+            tts_result = await asyncio.shield(first_tts)
+        else:
+            session_id, tts_result = await _start_batch(questions)
+
         if not tts_result["valid"]:
              raise HTTPException(status_code=500, detail=f"TTS Error: {tts_result.get('error')}")
 
-        # 7. Start Background Pre-fetch for Q1...QN
-        background_tasks.add_task(prefetch_tts, session_id, questions)
+        # 7. Queue Background Pre-fetch for Q1...QN (durable job)
+        await enqueue_prefetch_tts(session_id, questions)
+
+        first_q = questions[0]
 
         return StartResponse(
             session_id=session_id,
@@ -75,82 +140,83 @@ async def start_interview(background_tasks: BackgroundTasks, file: UploadFile =
             total_questions=len(questions)
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/next", response_model=NextQuestionResponse)
-async def next_question(
-    background_tasks: BackgroundTasks,
-    session_id: str = Form(...),
-    file: UploadFile = File(...)
-):
-    # 1. Save Audio File
-    audio_bytes = await file.read()
-    
-    # Generate Filename: answer_{session_id}_{q_index}.mp3
-    # We need index, so let's get it first
-    session = session_manager.get_session(session_id)
-    if not session:
-         raise HTTPException(status_code=404, detail="Session not found")
-         
-    current_idx = session.current_index
-    file_ext = "mp3" 
-    if file.filename.endswith(".wav"): file_ext = "wav"
-    
-    save_path = f"app/storage/answers/answer_{session_id}_{current_idx}.{file_ext}"
-    
-    with open(save_path, "wb") as f:
-        f.write(audio_bytes)
+def _answer_paths(session_id: str, index: int, ext: str) -> tuple[str, str]:
+    """
+    (attempt path, final path) for an answer recording. Every attempt
+    writes its own file; only the one whose submit is accepted is renamed
+    over the final path, so a rejected duplicate can't replace the answer.
+    """
+    final = f"app/storage/answers/answer_{session_id}_{index}.{ext}"
+    attempt = f"app/storage/answers/answer_{session_id}_{index}.{uuid.uuid4().hex[:8]}.{ext}"
+    return attempt, final
 
-    # 2. Transcribe Audio (STT)
-    answer_text = await run_in_threadpool(speech_to_text.transcribe_audio, audio_bytes)
-    
-    if not answer_text:
-        # Fallback if audio is silent or fails?
-        answer_text = "[Audio Unintelligible]"
-
-    # 2. Get Current Question for Context
-    current_q = session_manager.get_current_question(session_id)
-    if not current_q:
-         raise HTTPException(status_code=404, detail="Session not found or finished")
-
-    # Get index for background task
-    session = session_manager.get_session(session_id)
-    current_idx_for_eval = session.current_index
-
-    # 3. Submit Answer (Without Feedback)
-    # We submit the answer immediately. Evaluation happens in background.
-    success = session_manager.submit_answer(session_id, answer_text, feedback=None)
-    if not success:
-         raise HTTPException(status_code=404, detail="Session invalid")
-
-    # 4. Trigger Background Evaluation
-    # Note: submit_answer incremented the index, so 'current_q' is effectively the 'previous' question now.
-    # But we captured 'current_q' BEFORE submit_answer, so it is correct.
-    background_tasks.add_task(process_answer_evaluation, session_id, current_idx_for_eval, current_q, answer_text)
-         
-    # 5. Check if finished
-    if session_manager.is_finished(session_id):
-        return NextQuestionResponse(
-            is_finished=True,
-            message="Interview completed. You can now request feedback.",
-            progress="Done"
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+async def _submit_answer(session_id: str, answer_text: str, expected_index: int, audio: tuple[str, str] = None) -> NextQuestionResponse:
+    """
+    Records a transcribed answer to question `expected_index`, queues its
+    evaluation and returns the next question with its audio.
+    A second submit for the same question (client retry, double click)
+    gets 409 instead of silently answering, and skipping, the next one.
+    `audio` is (attempt path, final path) of the recording, moved into
+    place once the answer is accepted; callers delete the attempt file.
+    """
+    async with session_manager.async_lock(session_id):
+        # Not a cached snapshot: another worker may have appended questions
+        # or advanced the index since
+        session = await run_in_threadpool(session_manager.get_session, session_id, True)
+        if not session or expected_index >= len(session.questions):
+             raise HTTPException(status_code=404, detail="Session not found or finished")
+        current_q = session.questions[expected_index]
+
+        # 3. Submit Answer (Without Feedback)
+        # We submit the answer immediately. Evaluation happens in background.
+        success = await run_in_threadpool(
+            session_manager.submit_answer, session_id, answer_text, feedback=None, expected_index=expected_index
         )
-        
-    # 6. Get Next Question
-    next_q = session_manager.get_current_question(session_id)
-    session = session_manager.get_session(session_id)
-    current_idx = session.current_index
+        if not success:
+            if await run_in_threadpool(session_manager.get_session, session_id) is None:
+                raise HTTPException(status_code=404, detail="Session invalid")
+            raise HTTPException(status_code=409, detail=f"Question {expected_index + 1} was already answered")
+        if audio is not None:
+            await run_in_threadpool(os.replace, *audio)
+
+        # 4. Queue Background Evaluation (durable job, retried on failure)
+        await enqueue_answer_evaluation(session_id, expected_index, current_q, answer_text)
+
+        # 5. Check if finished
+        session = await run_in_threadpool(session_manager.get_session, session_id)
+        if session.is_completed:
+            return NextQuestionResponse(
+                is_finished=True,
+                message="Interview completed. You can now request feedback.",
+                progress="Done"
+            )
+
+        # 6. Get Next Question
+        current_idx = session.current_index
+        next_q = session.questions[current_idx]
+        cached_audio_path = session.pre_generated_audio.get(current_idx)
     
     # 7. Get Audio (Cached or Generate)
-    cached_audio_path = session_manager.get_cached_audio(session_id, current_idx)
-    
     if cached_audio_path:
         print(f"DEBUG: Using cached audio for Q{current_idx}: {cached_audio_path}")
         audio_path_result = cached_audio_path
     else:
-        print(f"DEBUG: Audio not cached for Q{current_idx}, generating now...")
-        tts_result = await run_in_threadpool(text_to_speech.speak_text, next_q, filename_prefix=f"q_{session_id}_{current_idx}")
+        # Joins the prefetch job if it's already queued/running instead of generating twice
+        print(f"DEBUG: Audio not cached for Q{current_idx}, waiting on TTS scheduler...")
+        tts_result = await tts_scheduler.request(session_id, current_idx, next_q)
+        if not tts_result["valid"]:
+            raise HTTPException(status_code=500, detail=f"TTS Error: {tts_result.get('error')}")
         audio_path_result = tts_result["relative_path"]
     
     return NextQuestionResponse(
@@ -161,9 +227,202 @@ async def next_question(
         progress=f"{current_idx + 1}"
     )
 
+@router.post("/next", response_model=NextQuestionResponse)
+async def next_question(
+    session_id: str = Form(...),
+    file: UploadFile = File(...)
+):
+    # 1. Save Audio File
+    # Generate Filename: answer_{session_id}_{q_index}.mp3
+    # We need index, so let's get it first (and don't stream uploads for unknown sessions).
+    # Read past the store's cache: a stale index would turn this answer into a 409
+    session = await run_in_threadpool(session_manager.get_session, session_id, True)
+    if not session:
+         raise HTTPException(status_code=404, detail="Session not found")
+
+    upload = await ingest_upload(file, settings.MAX_AUDIO_UPLOAD_BYTES)
+         
+    current_idx = session.current_index
+    file_ext = "mp3" 
+    if file.filename.endswith(".wav"): file_ext = "wav"
+    
+    # Saved per attempt; renamed to answer_{session_id}_{q_index} once accepted
+    attempt_path, save_path = _answer_paths(session_id, current_idx, file_ext)
+
+    try:
+        # Spooled uploads are moved into place, not copied
+        try:
+            await run_in_threadpool(upload.save_to, attempt_path)
+        finally:
+            upload.close()
+
+        # 2. Trim silence, downmix to mono 16 kHz (less audio uploaded to and billed by STT)
+        stt_input = attempt_path
+        if settings.AUDIO_PREPROCESS:
+            prepared = await run_in_threadpool(audio_preprocess.prepare_for_stt, attempt_path)
+            print(f"DEBUG: Answer audio pre-processed: -{prepared.bytes_removed} bytes, -{prepared.seconds_removed}s")
+            stt_input = prepared.audio
+
+        # 3. Transcribe Audio (STT)
+        answer_text = await speech_to_text.transcribe_audio_async(stt_input)
+
+        if not answer_text:
+            # Fallback if audio is silent or fails?
+            answer_text = "[Audio Unintelligible]"
+
+        return await _submit_answer(session_id, answer_text, expected_index=current_idx, audio=(attempt_path, save_path))
+    finally:
+        # Gone already if the answer was accepted
+        await run_in_threadpool(_remove_file, attempt_path)
+
+def _parse_control(text: str) -> Optional[dict]:
+    """
+    Validates a stream_answer control message; None if it is malformed.
+    """
+    try:
+        control = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(control, dict) or control.get("type") not in ("start", "end"):
+        return None
+    if control["type"] == "start":
+        rate = control.get("sample_rate", 16000)
+        if not isinstance(rate, int) or isinstance(rate, bool) or rate <= 0:
+            return None
+    return control
+
+@router.websocket("/stream/{session_id}")
+async def stream_answer(websocket: WebSocket, session_id: str):
+    """
+    Streams the answer to the current question while the candidate speaks.
+    Protocol:
+      client -> {"type": "start", "sample_rate": 16000}   (optional, default 16000)
+      client -> binary frames of 16-bit little-endian mono PCM
+      server -> {"type": "partial", "text": "..."}        as segments are transcribed
+      client -> {"type": "end"}                           end of speech
+      server -> {"type": "result", "transcript": "...", ...NextQuestionResponse}
+    Same submission and evaluation as /interview/next; the answer is saved as WAV.
+    A malformed control message closes the socket with 1007, a frame that is
+    neither binary nor text with 1003.
+    """
+    session = await run_in_threadpool(session_manager.get_session, session_id, True)
+    if not session:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+
+    # The question being answered is fixed when the stream opens
+    expected_index = session.current_index
+    sample_rate, transcriber, finished = 16000, None, False
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+            if message.get("bytes"):
+                transcriber = transcriber or StreamingTranscriber(sample_rate)
+                transcriber.feed(message["bytes"])
+                if transcriber.received_bytes > settings.MAX_AUDIO_UPLOAD_BYTES:
+                    await websocket.close(code=1009, reason="Answer exceeds the audio size limit")
+                    return
+                for text in transcriber.partials():
+                    await websocket.send_json({"type": "partial", "text": text})
+                continue
+
+            if message.get("text") is None:
+                await websocket.close(code=1003, reason="Expected PCM bytes or a JSON control message")
+                return
+            control = _parse_control(message["text"])
+            if control is None:
+                await websocket.close(code=1007, reason="Invalid control message")
+                return
+            if control["type"] == "start" and transcriber is None:
+                sample_rate = control.get("sample_rate", 16000)
+            elif control["type"] == "end":
+                break
+
+        # Only the segment still open at end-of-speech is left to transcribe
+        transcriber = transcriber or StreamingTranscriber(sample_rate)
+        answer_text = await transcriber.finish() or "[Audio Unintelligible]"
+        finished = True
+
+        attempt_path, save_path = _answer_paths(session_id, expected_index, "wav")
+        try:
+            await run_in_threadpool(transcriber.save_wav, attempt_path)
+            response = await _submit_answer(session_id, answer_text, expected_index=expected_index, audio=(attempt_path, save_path))
+        except HTTPException as e:
+            await websocket.send_json({"type": "error", "status_code": e.status_code, "detail": e.detail})
+            await websocket.close()
+            return
+        finally:
+            await run_in_threadpool(_remove_file, attempt_path)
+
+        await websocket.send_json({"type": "result", "transcript": answer_text, **response.dict()})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Whatever ended the stream early, stop the segment transcriptions
+        if transcriber and not finished:
+            transcriber.cancel()
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/feedback/stream")
+async def stream_feedback(session_id: str):
+    """
+    Server-Sent Events instead of polling /interview/feedback:
+      event: feedback  {"index": i, "feedback": {...}}  as each answer is graded
+      event: done      {"total": n}                     every question graded; stream ends
+      event: timeout   {}                               FEEDBACK_STREAM_TIMEOUT reached; reconnect
+      event: error     {"detail": ...}                  session gone
+    Feedback already available is sent immediately. Between events the
+    stream waits on an in-process notification (no polling), with a
+    keepalive comment every FEEDBACK_KEEPALIVE_SECONDS.
+    """
+    if await run_in_threadpool(session_manager.get_session, session_id) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    async def events():
+        deadline = time.monotonic() + settings.FEEDBACK_STREAM_TIMEOUT
+        sent = set()
+        with feedback_events.subscribe(session_id) as changed:
+            while True:
+                changed.clear()
+                session = await run_in_threadpool(session_manager.get_session, session_id)
+                if session is None:
+                    yield _sse("error", {"detail": "Session not found"})
+                    return
+
+                feedbacks = session.feedbacks
+                for index in sorted(feedbacks.keys() - sent):
+                    sent.add(index)
+                    yield _sse("feedback", {"index": index, "feedback": feedbacks[index]})
+
+                if session.is_completed and len(sent) >= len(session.questions):
+                    yield _sse("done", {"total": len(sent)})
+                    return
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    yield _sse("timeout", {})
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=min(remaining, settings.FEEDBACK_KEEPALIVE_SECONDS))
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/feedback")
 async def get_feedback(session_id: str):
-    feedbacks = session_manager.get_all_feedback(session_id)
+    feedbacks = await run_in_threadpool(session_manager.get_all_feedback, session_id)
     if feedbacks is None:
         raise HTTPException(status_code=404, detail="Session not found")
         
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from app.services.job_queue import job_queue
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+@router.get("/stats")
+async def job_stats():
+    """
+    Background job queue: depth, in-flight count, outcomes and per-type
+    queue-wait / run-time percentiles.
+    """
+    return await run_in_threadpool(job_queue.stats)
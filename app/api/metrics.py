@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from app.services import metrics
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("")
+async def get_metrics():
+    """
+    Counters and gauges reported by the services (cache hit rates etc.).
+    """
+    return await metrics.asnapshot()
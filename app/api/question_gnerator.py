@@ -1,9 +1,10 @@
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.concurrency import run_in_threadpool
-from app.services.resume_parser import extract_resume_text
-from app.services.resume_ai import convert_resume_to_json
-from app.services.question_generator import generate_interview_questions
+from typing import Optional
+from app.services import interview_pipeline
+from app.services.resume_cache import get_parsed_resume
+from app.services.upload_ingest import ingest_upload
+from app.services.question_generator import generate_interview_questions_async
 
 router = APIRouter(prefix="/question")
 def sanitize_json(data: dict) -> dict:
@@ -14,26 +15,34 @@ def sanitize_json(data: dict) -> dict:
     }
 
 @router.post("/generate-questions")
-async def generate_questions_only(file: UploadFile = File(...)):
+async def generate_questions_only(file: UploadFile = File(...), mode: Optional[str] = None):
     try:
-        file_bytes = await file.read()
-        if not file_bytes:
-            raise HTTPException(status_code=400, detail="Empty file uploaded")
+        mode = interview_pipeline.resolve_mode(mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        extracted_text = await run_in_threadpool(extract_resume_text, file.filename, file_bytes)
-        if not extracted_text.strip():
-            raise HTTPException(status_code=400, detail="No text extracted")
+    try:
+        with await ingest_upload(file) as upload, interview_pipeline.measure(mode):
+            if not upload.size:
+                raise HTTPException(status_code=400, detail="Empty file uploaded")
+
+            questions = []
+            if mode == "combined":
+                questions = await interview_pipeline.combined_questions(upload)
 
-        ats_json = await run_in_threadpool(convert_resume_to_json, extracted_text)
-        clean_data = sanitize_json(ats_json)
+            if not questions:
+                ats_json = await get_parsed_resume(upload)
+                clean_data = sanitize_json(ats_json)
 
-        questions = await run_in_threadpool(generate_interview_questions, clean_data)
+                questions = await generate_interview_questions_async(clean_data)
 
         return {
             "status": "success",
             "interview_questions": questions
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"CRITICAL ERROR in generate_questions: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,8 +1,7 @@
 from fastapi import APIRouter, UploadFile, File
-from app.services.resume_parser import extract_resume_text, extract_text_from_pdf
+from app.services.resume_parser import extract_text_from_pdf_async, plain_text, PDFBudgetExceeded
+from app.services.upload_ingest import ingest_upload
 router = APIRouter(prefix="/resume")
-import os
-import tempfile
 from fastapi import HTTPException
 @router.post("/extract-text")
 
@@ -11,15 +10,11 @@ async def extract_text(file: UploadFile = File(...)):
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files supported")
 
-    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        tmp.write(await file.read())
-        tmp_path = tmp.name
+    # Large uploads are spooled to a temp file and the workers open it by path
+    with await ingest_upload(file) as upload:
+        try:
+            text = await extract_text_from_pdf_async(upload.source())
+        except PDFBudgetExceeded as e:
+            raise HTTPException(status_code=413, detail=str(e))
 
-    try:
-        with open(tmp_path, "rb") as f:
-            file_bytes = f.read()
-            text = extract_text_from_pdf(file_bytes)
-    finally:
-        os.remove(tmp_path)
-
-    return {"resume_text": text}
+    return {"resume_text": plain_text(text)}
@@ -1,7 +1,9 @@
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.resume_parser import extract_resume_text, extract_text_from_pdf
-from app.services.resume_ai import convert_resume_to_json
+from typing import Optional
+from app.services import skills_extractor
+from app.services.resume_cache import get_parsed_resume, get_resume_text
+from app.services.upload_ingest import ingest_upload
 router = APIRouter(prefix="/parse")
 def sanitize_json(data: dict) -> dict:
     return {
@@ -10,26 +12,42 @@ def sanitize_json(data: dict) -> dict:
         "education": data.get("education", [])
     }
 
+PARSE_MODES = ("llm", "fast")
+
 @router.post("/parse-ats")
-async def parse_ats(file: UploadFile = File(...)):
+async def parse_ats(file: UploadFile = File(...), mode: Optional[str] = None):
+    """
+    mode=llm (default): full ATS JSON from the model.
+    mode=fast: local dictionary/heading extraction in milliseconds, no model
+    call; skills are reliable, experience and education are best-effort.
+    """
+    mode = (mode or "llm").lower()
+    if mode not in PARSE_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}'. Use one of: {', '.join(PARSE_MODES)}")
+
     try:
-        file_bytes = await file.read()
-        if not file_bytes:
-            raise HTTPException(status_code=400, detail="Empty file uploaded")
-            
-        extracted_text = extract_resume_text(file.filename, file_bytes)
+        with await ingest_upload(file) as upload:
+            if not upload.size:
+                raise HTTPException(status_code=400, detail="Empty file uploaded")
 
-        if not extracted_text or not extracted_text.strip():
-            raise HTTPException(status_code=400, detail="No text extracted from resume")
- 
-        ats_json = convert_resume_to_json(extracted_text)
+            if mode == "fast":
+                text = await get_resume_text(upload)
+                if not text or not text.strip():
+                    raise ValueError("No text extracted from resume")
+                ats_json = skills_extractor.extract(text)
+            else:
+                # Cached by file hash: a re-upload skips both extraction and the LLM
+                ats_json = await get_parsed_resume(upload)
         clean_data = sanitize_json(ats_json)
 
         return {
             "status": "success",
+            "mode": mode,
             "data": clean_data
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"CRITICAL ERROR in parse_ats: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 from app.services import text_to_speech, question_generator
+from app.services.session_manager import session_manager
+from app.services.tts_scheduler import tts_scheduler
 import traceback
 
 router = APIRouter(prefix="/tts", tags=["Text to Speech"])
@@ -45,7 +48,7 @@ async def generate_and_speak(resume_data: ResumeData):
         clean_data = resume_data.dict()
 
         # 2. Generate Questions
-        questions = await run_in_threadpool(question_generator.generate_interview_questions, clean_data)
+        questions = await question_generator.generate_interview_questions_async(clean_data)
         if not questions:
             print("DEBUG: No questions generated.")
             raise HTTPException(status_code=500, detail="No questions generated")
@@ -53,7 +56,7 @@ async def generate_and_speak(resume_data: ResumeData):
         # 3. Speak First Question
         first_q = questions[0]
         print(f"DEBUG: Generating audio for: {first_q}")
-        result = await run_in_threadpool(text_to_speech.speak_text, first_q, filename_prefix="resume_gen_test")
+        result = await text_to_speech.speak_text_async(first_q, filename_prefix="resume_gen_test")
 
         if not result["valid"]:
             print(f"DEBUG: TTS Invalid result: {result}")
@@ -81,8 +84,7 @@ async def generate_speech(payload: TTSRequest):
     if not payload.text:
         raise HTTPException(status_code=400, detail="Text is required")
 
-    result = await run_in_threadpool(
-        text_to_speech.speak_text,
+    result = await text_to_speech.speak_text_async(
         text=payload.text,
         filename_prefix=payload.filename_prefix
     )
@@ -96,3 +98,35 @@ async def generate_speech(payload: TTSRequest):
         duration=result["duration"],
         message="Audio generated successfully"
     )
+
+@router.get("/stream/{session_id}/{index}")
+async def stream_question_audio(session_id: str, index: int):
+    """
+    Streams the MP3 for question `index` of a session as it is synthesised
+    (chunked response), instead of waiting for the whole file and fetching
+    it from /storage. The finished clip is still saved for replay.
+    """
+    session = await run_in_threadpool(session_manager.get_session, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if not 0 <= index < len(session.questions):
+        raise HTTPException(status_code=404, detail="Question not found")
+
+    question = session.questions[index]
+
+    if tts_scheduler.pending(session_id, index):
+        # A prefetch is already on it: join that job (now urgent) rather than
+        # synthesising the clip twice, then stream the file it leaves in the cache
+        await tts_scheduler.request(session_id, index, question)
+
+    async def audio():
+        try:
+            async for chunk in text_to_speech.stream_speech(question, f"q_{session_id}_{index}"):
+                yield chunk
+        except Exception as e:
+            # Headers are already sent; all we can do is end the stream
+            print(f"[TTS] Stream failed for {session_id} Q{index + 1}: {e}")
+            return
+        await run_in_threadpool(session_manager.set_cached_audio, session_id, index, text_to_speech.clip_relative_path(question))
+
+    return StreamingResponse(audio(), media_type="audio/mpeg", headers={"Cache-Control": "no-store"})
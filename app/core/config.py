@@ -3,11 +3,159 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Settings:
-    DATABASE_URL: str = os.getenv("DATABASE_URL")
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///app/storage/app.sqlite3")
     API_KEY: str = os.getenv("HF_API_KEY")
-    
+
     Project_Name: str = "Mock_Interview_Platform"
     API_VERSION: str = "v1"
 
+    # PDF extraction engine
+    PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 2)))
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "3"))
+    PDF_PAGE_TIMEOUT: float = float(os.getenv("PDF_PAGE_TIMEOUT", "5"))
+    PDF_DOC_TIMEOUT: float = float(os.getenv("PDF_DOC_TIMEOUT", "20"))
+    PDF_MAX_PAGES: int = int(os.getenv("PDF_MAX_PAGES", "30"))
+    PDF_MAX_BYTES: int = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+    PDF_MAX_PAGE_CHARS: int = int(os.getenv("PDF_MAX_PAGE_CHARS", "20000"))
+
+    # Resume text / ATS JSON cache
+    RESUME_CACHE_PATH: str = os.getenv("RESUME_CACHE_PATH", "app/storage/cache/resume_cache.sqlite3")
+    RESUME_CACHE_MEMORY_ITEMS: int = int(os.getenv("RESUME_CACHE_MEMORY_ITEMS", "256"))
+    RESUME_CACHE_MAX_BYTES: int = int(os.getenv("RESUME_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    RESUME_CACHE_MAX_AGE: int = int(os.getenv("RESUME_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+    # Resume text compaction before LLM parsing (see resume_compact)
+    RESUME_COMPACT: bool = os.getenv("RESUME_COMPACT", "true").lower() == "true"
+    RESUME_TOKEN_BUDGET: int = int(os.getenv("RESUME_TOKEN_BUDGET", "2500"))
+
+    # Local skills extraction (/parse/parse-ats?mode=fast) and the skills it
+    # pre-fills into the LLM parsing prompt
+    SKILLS_DICTIONARY_PATH: str = os.getenv("SKILLS_DICTIONARY_PATH", "app/data/skills.json")
+    SKILLS_PREFILL: bool = os.getenv("SKILLS_PREFILL", "true").lower() == "true"
+
+    # Question bank: banked questions are reused for a resume when at least
+    # QUESTION_BANK_MIN_COVERAGE of its top skills are covered by questions
+    # scoring QUESTION_BANK_MIN_SCORE or more; otherwise the LLM generates
+    QUESTION_BANK_ENABLED: bool = os.getenv("QUESTION_BANK_ENABLED", "true").lower() == "true"
+    QUESTION_BANK_DIR: str = os.getenv("QUESTION_BANK_DIR", "app/storage/question_bank")
+    QUESTION_BANK_MIN_SCORE: float = float(os.getenv("QUESTION_BANK_MIN_SCORE", "0.2"))
+    QUESTION_BANK_MIN_COVERAGE: float = float(os.getenv("QUESTION_BANK_MIN_COVERAGE", "0.6"))
+
+    # Upload ingestion
+    MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+    MAX_AUDIO_UPLOAD_BYTES: int = int(os.getenv("MAX_AUDIO_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+    UPLOAD_SPOOL_BYTES: int = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+    UPLOAD_CHUNK_BYTES: int = int(os.getenv("UPLOAD_CHUNK_BYTES", str(256 * 1024)))
+
+    # Shared HTTP transport (Hugging Face router)
+    HF_BASE_URL: str = os.getenv("HF_BASE_URL", "https://router.huggingface.co")
+    HTTP_POOL_SIZE: int = int(os.getenv("HTTP_POOL_SIZE", "32"))
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+    HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+    HTTP_BACKOFF_BASE: float = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+    HTTP_BACKOFF_MAX: float = float(os.getenv("HTTP_BACKOFF_MAX", "8"))
+
+    # Async model clients: max concurrent in-flight calls per upstream model.
+    # Overrides as "model=limit,model=limit".
+    MODEL_CONCURRENCY: int = int(os.getenv("MODEL_CONCURRENCY", "32"))
+    MODEL_CONCURRENCY_OVERRIDES: str = os.getenv("MODEL_CONCURRENCY_OVERRIDES", "")
+    # Per-model chat endpoint instead of HF_BASE_URL, as "model=base_url,..."
+    # (self-hosted replicas, or the fake servers in benchmarks/)
+    MODEL_ENDPOINTS: str = os.getenv("MODEL_ENDPOINTS", "")
+
+    # Model router: each task's candidates as "task=model|model,...", in order
+    # of preference. A task without a route uses its module's MODEL_ID.
+    MODEL_ROUTER_ENABLED: bool = os.getenv("MODEL_ROUTER_ENABLED", "true").lower() == "true"
+    MODEL_ROUTES: str = os.getenv(
+        "MODEL_ROUTES",
+        "questions=mistralai/Mistral-7B-Instruct-v0.2|mistralai/Mistral-7B-Instruct-v0.3,"
+        "evaluate=mistralai/Mistral-7B-Instruct-v0.2|mistralai/Mistral-7B-Instruct-v0.3,"
+        "resume_parse=Qwen/Qwen2.5-7B-Instruct|mistralai/Mistral-7B-Instruct-v0.3,"
+        "llm=mistralai/Mistral-7B-Instruct-v0.3|mistralai/Mistral-7B-Instruct-v0.2",
+    )
+    ROUTER_EWMA_ALPHA: float = float(os.getenv("ROUTER_EWMA_ALPHA", "0.2"))
+    # A model whose stats are older than this gets the next call, to re-measure it
+    ROUTER_STALE_SECONDS: float = float(os.getenv("ROUTER_STALE_SECONDS", "60"))
+    # Hedge: once a call has run past its model's p95 (known after
+    # ROUTER_HEDGE_MIN_SAMPLES calls, never sooner than ROUTER_HEDGE_MIN_DELAY
+    # seconds), send the same request to the next candidate and take the
+    # first answer. At most ROUTER_HEDGE_BUDGET of calls are hedged.
+    ROUTER_HEDGE_ENABLED: bool = os.getenv("ROUTER_HEDGE_ENABLED", "true").lower() == "true"
+    ROUTER_HEDGE_MIN_SAMPLES: int = int(os.getenv("ROUTER_HEDGE_MIN_SAMPLES", "20"))
+    ROUTER_HEDGE_MIN_DELAY: float = float(os.getenv("ROUTER_HEDGE_MIN_DELAY", "0.25"))
+    ROUTER_HEDGE_BUDGET: float = float(os.getenv("ROUTER_HEDGE_BUDGET", "0.1"))
+    # Circuit breaker: a model is skipped for ROUTER_BREAKER_COOLDOWN seconds
+    # after ROUTER_BREAKER_FAILURES consecutive failures, then gets one probe
+    ROUTER_BREAKER_FAILURES: int = int(os.getenv("ROUTER_BREAKER_FAILURES", "5"))
+    ROUTER_BREAKER_COOLDOWN: float = float(os.getenv("ROUTER_BREAKER_COOLDOWN", "30"))
+
+    # Stream question generation so Q1's audio starts before Q10 is written
+    QUESTION_STREAMING: bool = os.getenv("QUESTION_STREAMING", "true").lower() == "true"
+
+    # Default for /interview/start and /question/generate-questions:
+    # "two_call" (parse, then generate) or "combined" (one request for both)
+    PARSE_MODE: str = os.getenv("PARSE_MODE", "two_call")
+
+    # Max concurrent TTS syntheses across all sessions
+    TTS_CONCURRENCY: int = int(os.getenv("TTS_CONCURRENCY", "4"))
+    # Content-addressed clip cache shared by all sessions (app/storage/audio/cache)
+    TTS_CACHE_MAX_BYTES: int = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    # Clips used more recently than this are never evicted (sessions keep their
+    # URLs in pre_generated_audio); defaults to SESSION_TTL_SECONDS
+    TTS_CACHE_GRACE_SECONDS: int = int(os.getenv("TTS_CACHE_GRACE_SECONDS", os.getenv("SESSION_TTL_SECONDS", str(2 * 60 * 60))))
+
+    # Answer audio before STT: trim leading/trailing silence, mono, 16 kHz FLAC.
+    # A frame is voiced when its energy is VAD_MARGIN_DB above the recording's
+    # noise floor (and above VAD_FLOOR_DB); VAD_PADDING_MS is kept around speech.
+    AUDIO_PREPROCESS: bool = os.getenv("AUDIO_PREPROCESS", "true").lower() == "true"
+    VAD_MARGIN_DB: float = float(os.getenv("VAD_MARGIN_DB", "12"))
+    VAD_FLOOR_DB: float = float(os.getenv("VAD_FLOOR_DB", "-50"))
+    VAD_PADDING_MS: int = int(os.getenv("VAD_PADDING_MS", "250"))
+
+    # Speech-to-text backend: "hf" (whisper via Inference API) or "stub"
+    # (local stand-in that returns a placeholder transcript, for tests/dev)
+    STT_BACKEND: str = os.getenv("STT_BACKEND", "hf")
+
+    # WebSocket answer streaming: a segment ends after this much silence
+    # (or at the max length) and is transcribed while the candidate talks on
+    STREAM_SEGMENT_SILENCE_MS: int = int(os.getenv("STREAM_SEGMENT_SILENCE_MS", "600"))
+    STREAM_MAX_SEGMENT_SECONDS: float = float(os.getenv("STREAM_MAX_SEGMENT_SECONDS", "20"))
+
+    # Interview sessions: "memory" (one worker) or "sql" (DATABASE_URL, shared by
+    # all workers). SQL reads are served from a per-worker snapshot for up to
+    # SESSION_CACHE_TTL seconds; writes always go to the database.
+    SESSION_STORE: str = os.getenv("SESSION_STORE", "memory")
+    SESSION_CACHE_TTL: float = float(os.getenv("SESSION_CACHE_TTL", "1.0"))
+    # Sessions idle longer than SESSION_TTL_SECONDS are evicted (with their
+    # answer files); past SESSION_MAX_COUNT the least recently used go first.
+    SESSION_TTL_SECONDS: int = int(os.getenv("SESSION_TTL_SECONDS", str(2 * 60 * 60)))
+    SESSION_MAX_COUNT: int = int(os.getenv("SESSION_MAX_COUNT", "1000"))
+    SESSION_SWEEP_INTERVAL: int = int(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+
+    # Durable background jobs (TTS prefetch, answer evaluation)
+    JOB_QUEUE_PATH: str = os.getenv("JOB_QUEUE_PATH", "app/storage/queue/jobs.sqlite3")
+    # Also caps how many evaluations can wait in one batch (EVAL_BATCH_MAX_ITEMS)
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "16"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "4"))
+    JOB_BACKOFF_BASE: float = float(os.getenv("JOB_BACKOFF_BASE", "1.0"))
+    JOB_BACKOFF_MAX: float = float(os.getenv("JOB_BACKOFF_MAX", "30"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+    JOB_RETENTION_SECONDS: int = int(os.getenv("JOB_RETENTION_SECONDS", str(24 * 60 * 60)))
+    # A running job's claim expires unless its worker renews it (every third
+    # of the lease); expired jobs are queued again for any worker process.
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+    # GET /interview/feedback/stream: keepalive comment (and re-check) interval,
+    # and how long one stream may stay open before the client must reconnect
+    FEEDBACK_KEEPALIVE_SECONDS: float = float(os.getenv("FEEDBACK_KEEPALIVE_SECONDS", "15"))
+    FEEDBACK_STREAM_TIMEOUT: float = float(os.getenv("FEEDBACK_STREAM_TIMEOUT", "900"))
+
+    # Answer evaluation micro-batching: one model call grades up to
+    # EVAL_BATCH_MAX_ITEMS answers, waiting at most EVAL_BATCH_MAX_WAIT_MS
+    # for the batch to fill. 1 disables batching.
+    EVAL_BATCH_MAX_ITEMS: int = int(os.getenv("EVAL_BATCH_MAX_ITEMS", "8"))
+    EVAL_BATCH_MAX_WAIT_MS: int = int(os.getenv("EVAL_BATCH_MAX_WAIT_MS", "50"))
+
 
-settings = Settings()    
\ No newline at end of file
+settings = Settings()
@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+# SQLite connections are shared across the threadpool
+connect_args = {"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
+engine = create_engine(settings.DATABASE_URL, connect_args=connect_args, pool_pre_ping=True)
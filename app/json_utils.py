@@ -1,38 +1,220 @@
 import json
 import re
 
+from app.services import metrics
 
-def safe_json_parse(text: str):
+
+class JSONRepairError(ValueError):
+    """Raised when none of the local repair strategies produce valid JSON."""
+
+
+# Strategies are applied cumulatively, cheapest first; the counter records
+# the stage at which the text first parsed ("llm" is counted by callers
+# that fall back to fix_json_with_llm, "failed" when that is still needed).
+STRATEGIES = (
+    "direct",
+    "strip_fences",
+    "extract_block",
+    "trailing_commas",
+    "single_quotes",
+    "unescaped_quotes",
+    "close_truncated",
+)
+_repair_counts = {name: 0 for name in STRATEGIES + ("llm", "failed")}
+
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_PARTIAL_LITERAL = re.compile(r"(?<=[\[:,])\s*(?:t|tr|tru|f|fa|fal|fals|n|nu|nul|-)?\s*$")
+_DANGLING_KEY = re.compile(r"([{,])\s*\"(?:[^\"\\]|\\.)*\"\s*:?\s*$")
+
+
+def record_strategy(name: str):
+    _repair_counts[name] += 1
+
+
+def repair_stats() -> dict:
+    return dict(_repair_counts)
+
+
+metrics.register("json_repair", repair_stats)
+
+
+def _loads(text: str):
+    # strict=False: models routinely put raw newlines/tabs inside strings
+    return json.loads(text, strict=False)
+
+
+def _strip_fences(text: str) -> str:
+    return re.sub(r"```(?:json|JSON)?", "", text).strip()
+
+
+def _opens_string(out: list) -> bool:
+    # A single quote only starts a string where a JSON value/key can start,
+    # so apostrophes in prose ("candidate's") are left alone.
+    for ch in reversed(out):
+        if not ch.isspace():
+            return ch in "{[,:"
+    return True
+
+
+def _extract_block(text: str) -> str:
     """
-    Attempts multiple strategies to parse JSON safely.
-    Returns dict or raises ValueError.
+    Drops prose before the first { / [ and after its matching close.
+    If the block never closes (max_tokens cut-off) the tail is kept as-is.
     """
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text
+    start = min(starts)
+    depth, quote, last, i = 0, None, "{", start
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == "\\":
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch == '"' or (ch == "'" and last in "{[,:"):
+            quote = ch
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+        if not quote and not ch.isspace():
+            last = ch
+        i += 1
+    return text[start:]
 
-    # remove markdown
-    text = re.sub(r"```json|```", "", text).strip()
 
-    # extract first JSON block
-    match = re.search(r"\{[\s\S]*\}", text)
-    if not match:
-        raise ValueError("No JSON object found")
+def _remove_trailing_commas(text: str) -> str:
+    return re.sub(r",\s*([\]}])", r"\1", text)
 
-    json_text = match.group(0)
 
-    # Attempt 1: direct load
-    try:
-        return json.loads(json_text)
-    except json.JSONDecodeError:
-        pass
+def _closes_string(text: str, j: int) -> bool:
+    # A quote ends the string if what follows can only follow a JSON string.
+    k = j + 1
+    while k < len(text) and text[k] in " \t\r":
+        k += 1
+    return k >= len(text) or text[k] in ",:}]\n"
 
-    # Attempt 2: remove trailing commas
-    json_text = re.sub(r",\s*([\]}])", r"\1", json_text)
 
-    try:
-        return json.loads(json_text)
-    except json.JSONDecodeError:
-        pass
+def _normalize_quotes(text: str, inner_quotes: bool) -> str:
+    """
+    Rewrites single-quoted strings and Python literals as JSON; with
+    inner_quotes, also escapes stray double quotes inside string values.
+    """
+    out, i, n = [], 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '"' or (ch == "'" and _opens_string(out)):
+            quote, buf, j = ch, [], i + 1
+            while j < n:
+                c = text[j]
+                if c == "\\" and j + 1 < n:
+                    buf.append(text[j:j + 2])
+                    j += 2
+                    continue
+                if c == quote and (not inner_quotes or _closes_string(text, j)):
+                    break
+                buf.append('\\"' if c == '"' else c)
+                j += 1
+            out.append('"' + "".join(buf) + ('"' if j < n else ""))
+            i = j + 1
+            continue
+        word = re.match(r"True|False|None", text[i:i + 5])
+        if word and not (out and (out[-1].isalnum() or out[-1] == "_")):
+            out.append(_PY_LITERALS[word.group(0)])
+            i += len(word.group(0))
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _close_truncated(text: str) -> str:
+    """
+    Completes JSON cut off mid-stream: closes an open string, drops a
+    dangling key or partial literal, then closes every open bracket.
+    """
+    stack, in_string, i = [], False, 0
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            if ch == "\\":
+                i += 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+        i += 1
+
+    if in_string:
+        text = text[:-1] if text.endswith("\\") else text
+        text += '"'
+    text = _PARTIAL_LITERAL.sub("", text).rstrip().rstrip(",")
+    if stack and stack[-1] == "}":
+        text = _DANGLING_KEY.sub(r"\1", text).rstrip().rstrip(",")
+    return _remove_trailing_commas(text + "".join(reversed(stack)))
+
+
+def repair_json(text: str):
+    """
+    Local, deterministic recovery for malformed model output.
+    Returns (parsed, strategy) or raises JSONRepairError.
+    """
+    def attempt(name, candidate):
+        try:
+            parsed = _loads(candidate)
+        except (json.JSONDecodeError, RecursionError):
+            return None
+        record_strategy(name)
+        return parsed, name
+
+    candidate = text or ""
+    for name, stage in (
+        ("direct", lambda t: t),
+        ("strip_fences", _strip_fences),
+        ("extract_block", _extract_block),
+        ("trailing_commas", _remove_trailing_commas),
+    ):
+        candidate = stage(candidate)
+        result = attempt(name, candidate)
+        if result:
+            return result
+
+    # Both quote passes start from the same text: the lenient one can
+    # mangle a string that only the inner-quote pass reads correctly.
+    result = attempt("single_quotes", _remove_trailing_commas(_normalize_quotes(candidate, inner_quotes=False)))
+    if result:
+        return result
+    candidate = _remove_trailing_commas(_normalize_quotes(candidate, inner_quotes=True))
+    result = attempt("unescaped_quotes", candidate)
+    if result:
+        return result
+
+    result = attempt("close_truncated", _close_truncated(candidate))
+    if result:
+        return result
+
+    raise JSONRepairError("JSON parsing failed after local repair")
+
+
+def safe_json_parse(text: str):
+    """
+    Attempts multiple strategies to parse JSON safely.
+    Returns dict or raises ValueError.
+    """
+    parsed, _ = repair_json(text)
+    if not isinstance(parsed, dict):
+        raise ValueError("No JSON object found")
+    return parsed
+
 
-    raise ValueError("JSON parsing failed after cleanup")
 def parse_kv_to_json(text: str):
     lines = text.splitlines()
     data = {}
@@ -1,9 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import resume_extract, resume_parse, question_gnerator
-from app.api import interview, tts_routes
+from app.api import interview, tts_routes, metrics, jobs
+from app.services import resume_parser, http_transport, session_manager, text_to_speech
+from app.services.job_queue import job_queue
+from app.services import background_tasks  # registers the job types
+import asyncio
+from app.core.config import settings
 
 app = FastAPI(title="Resume Parser & Interview Generator API")
 
@@ -15,10 +20,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads from the Content-Length header, before the multipart body is parsed.
+# ingest_upload() still enforces the limit on the actual stream (chunked requests have no header).
+MULTIPART_OVERHEAD = 64 * 1024
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    length = request.headers.get("content-length")
+    if request.method == "POST" and length and length.isdigit():
+        limit = settings.MAX_AUDIO_UPLOAD_BYTES if request.url.path == "/interview/next" else settings.MAX_UPLOAD_BYTES
+        if int(length) > limit + MULTIPART_OVERHEAD:
+            return JSONResponse(status_code=413, content={"detail": f"Upload exceeds the {limit} byte limit"})
+    return await call_next(request)
+
 # Mount Static Files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 app.mount("/storage", StaticFiles(directory="app/storage"), name="storage") # For Audio Playback
 
+_sweeper = None
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    global _sweeper
+    _sweeper = asyncio.create_task(session_manager.run_sweeper())
+
+@app.on_event("startup")
+async def start_job_workers():
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    if _sweeper:
+        _sweeper.cancel()
+    await job_queue.stop()
+    await text_to_speech.flush_pending_writes()
+    resume_parser.shutdown_pool()
+    await http_transport.aclose()
+
 # Serve Index on Root
 @app.get("/")
 async def read_index():
@@ -35,3 +73,5 @@ app.include_router(question_gnerator.router)
 
 app.include_router(interview.router)
 app.include_router(tts_routes.router)
+app.include_router(metrics.router)
+app.include_router(jobs.router)
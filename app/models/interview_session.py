@@ -0,0 +1,29 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text
+from app.models.base import Base
+
+# Interview sessions live in their own tables: create_all() can add new
+# tables to a deployed database, but never alters existing ones.
+
+class InterviewSessionRecord(Base):
+    __tablename__ = "interview_sessions"
+    id = Column(String(16), primary_key=True)
+    current_index = Column(Integer, nullable=False, default=0)
+    is_completed = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class SessionQuestion(Base):
+    __tablename__ = "session_questions"
+    session_id = Column(String(16), primary_key=True)
+    position = Column(Integer, primary_key=True) # question index
+    question = Column(Text, nullable=False)
+    audio_path = Column(Text)
+
+class SessionAnswer(Base):
+    __tablename__ = "session_answers"
+    session_id = Column(String(16), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    answer_text = Column(Text)
+    feedback = Column(Text) # JSON from the evaluator
+    score = Column(Integer)
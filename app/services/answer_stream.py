@@ -0,0 +1,173 @@
+import asyncio
+import wave
+from collections import deque
+from typing import List, Optional
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services import audio_preprocess, metrics, speech_to_text
+from app.services.audio_preprocess import FRAME_MS
+
+_counters = {"streams": 0, "segments": 0, "cancelled": 0}
+# end-of-speech (client "end") -> final transcript ready
+_finish_latency = metrics.LatencyStats()
+
+
+class SpeechSegmenter:
+    """
+    Incremental energy VAD over a live PCM stream. feed() returns the speech
+    segments that have just ended: a segment closes after
+    STREAM_SEGMENT_SILENCE_MS of silence, or at STREAM_MAX_SEGMENT_SECONDS.
+    The noise floor is tracked as a running minimum that creeps up slowly,
+    so it follows the room without needing the whole recording. It starts
+    at VAD_FLOOR_DB - VAD_MARGIN_DB, so speech in the very first frame counts.
+    """
+
+    NOISE_RISE_DB = 0.05  # per frame (~1.7 dB/s)
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.frame = max(1, rate * FRAME_MS // 1000)
+        self._pending = np.empty(0, dtype=np.float32)
+        self._segment: List[np.ndarray] = []
+        self._silent_run = 0
+        self._noise_db = settings.VAD_FLOOR_DB - settings.VAD_MARGIN_DB
+        pad = max(1, settings.VAD_PADDING_MS // FRAME_MS)
+        self._pad = pad
+        self._preroll = deque(maxlen=pad)
+        self._end_frames = max(1, settings.STREAM_SEGMENT_SILENCE_MS // FRAME_MS)
+        self._max_frames = max(1, int(settings.STREAM_MAX_SEGMENT_SECONDS * 1000) // FRAME_MS)
+
+    def feed(self, samples: np.ndarray) -> List[np.ndarray]:
+        buffer = np.concatenate((self._pending, samples)) if len(self._pending) else samples
+        count = len(buffer) // self.frame
+        self._pending = buffer[count * self.frame:]
+        if count == 0:
+            return []
+
+        frames = buffer[: count * self.frame].reshape(count, self.frame)
+        energies = audio_preprocess.frame_energy_db(frames)
+        done = []
+        for frame, energy in zip(frames, energies):
+            segment = self._push(frame, float(energy))
+            if segment is not None:
+                done.append(segment)
+        return done
+
+    def _push(self, frame: np.ndarray, energy: float) -> Optional[np.ndarray]:
+        if energy < self._noise_db:
+            self._noise_db = energy
+        else:
+            self._noise_db += self.NOISE_RISE_DB
+        voiced = energy > max(self._noise_db + settings.VAD_MARGIN_DB, settings.VAD_FLOOR_DB)
+
+        if not self._segment:
+            if voiced:
+                self._segment = list(self._preroll)
+                self._segment.append(frame)
+                self._silent_run = 0
+            else:
+                self._preroll.append(frame)
+            return None
+
+        self._segment.append(frame)
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        if self._silent_run >= self._end_frames or len(self._segment) >= self._max_frames:
+            return self._close()
+        return None
+
+    def _close(self) -> np.ndarray:
+        # Keep VAD_PADDING_MS of the trailing silence, drop the rest
+        keep = len(self._segment) - max(self._silent_run - self._pad, 0)
+        segment = np.concatenate(self._segment[:keep])
+        self._segment, self._silent_run = [], 0
+        self._preroll.clear()
+        return segment
+
+    def flush(self) -> Optional[np.ndarray]:
+        if self._segment:
+            return self._close()
+        return None
+
+
+async def transcribe_segment(samples: np.ndarray, rate: int) -> str:
+    encoded = await run_in_threadpool(
+        lambda: audio_preprocess.encode_flac(audio_preprocess.to_mono_16k(samples, rate))
+    )
+    return (await speech_to_text.transcribe_audio_async(encoded)).strip()
+
+
+class StreamingTranscriber:
+    """
+    One answer being streamed over a WebSocket as 16-bit little-endian mono
+    PCM. Each finished speech segment is transcribed in its own task while
+    audio keeps arriving, so by the end of speech only the last segment is
+    still outstanding.
+    """
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.segmenter = SpeechSegmenter(rate)
+        self.received_bytes = 0
+        self._carry = b""
+        self._chunks: List[bytes] = []
+        self._tasks: List[asyncio.Task] = []
+        self._reported = 0
+        _counters["streams"] += 1
+
+    def feed(self, pcm: bytes):
+        self.received_bytes += len(pcm)
+        # A frame may split a sample: carry the odd byte into the next one
+        pcm = self._carry + pcm
+        usable = len(pcm) - len(pcm) % 2
+        self._carry = pcm[usable:]
+        self._chunks.append(pcm[:usable])
+        samples = np.frombuffer(pcm[:usable], dtype="<i2").astype(np.float32) / 32768.0
+        for segment in self.segmenter.feed(samples):
+            self._start(segment)
+
+    def _start(self, segment: np.ndarray):
+        _counters["segments"] += 1
+        self._tasks.append(asyncio.create_task(transcribe_segment(segment, self.rate)))
+
+    def partials(self) -> List[str]:
+        """
+        Transcripts of segments finished since the last call, in order.
+        """
+        texts = []
+        while self._reported < len(self._tasks) and self._tasks[self._reported].done():
+            task = self._tasks[self._reported]
+            texts.append("" if task.exception() else task.result())
+            self._reported += 1
+        return [t for t in texts if t]
+
+    async def finish(self) -> str:
+        started = asyncio.get_running_loop().time()
+        segment = self.segmenter.flush()
+        if segment is not None:
+            self._start(segment)
+        results = await asyncio.gather(*self._tasks, return_exceptions=True)
+        _finish_latency.record(asyncio.get_running_loop().time() - started)
+        return " ".join(r for r in results if isinstance(r, str) and r)
+
+    def cancel(self):
+        _counters["cancelled"] += 1
+        for task in self._tasks:
+            task.cancel()
+
+    def save_wav(self, path: str):
+        with wave.open(path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.rate)
+            for chunk in self._chunks:
+                f.writeframes(chunk)
+
+
+def stats() -> dict:
+    return {**_counters, "finish_latency": _finish_latency.snapshot()}
+
+
+metrics.register("answer_stream", stats)
@@ -0,0 +1,119 @@
+"""
+Duration of MP3 / WAV clips read from their headers, without decoding samples.
+"""
+import struct
+from typing import Optional
+
+# Layer III bitrates (kbps) by [MPEG-1?][index]
+_BITRATES = {
+    True: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    False: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates by version bits (00 = MPEG-2.5, 10 = MPEG-2, 11 = MPEG-1)
+_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+
+def detect_format(data: bytes) -> Optional[str]:
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:4] == b"\x1aE\xdf\xa3":
+        return "webm"
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return None
+
+
+def _skip_id3(data: bytes) -> int:
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    # Syncsafe size: 7 bits per byte
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+
+def _frame_header(data: bytes, pos: int):
+    """
+    (frame_length, samples, sample_rate) of the Layer III frame at pos, or None.
+    """
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 0x3
+    layer = (data[pos + 1] >> 1) & 0x3
+    bitrate_index = data[pos + 2] >> 4
+    rate_index = (data[pos + 2] >> 2) & 0x3
+    padding = (data[pos + 2] >> 1) & 0x1
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _BITRATES[mpeg1][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    samples = 1152 if mpeg1 else 576
+    length = (samples // 8) * bitrate // sample_rate + padding
+    return length, samples, sample_rate
+
+
+def _xing_frames(data: bytes, pos: int) -> Optional[int]:
+    # A Xing/Info tag in the first frame carries the total frame count (VBR files)
+    window = data[pos: pos + 64]
+    for tag in (b"Xing", b"Info"):
+        at = window.find(tag)
+        if at != -1 and len(window) >= at + 12:
+            flags = struct.unpack(">I", window[at + 4: at + 8])[0]
+            if flags & 0x1:
+                return struct.unpack(">I", window[at + 8: at + 12])[0]
+    return None
+
+
+def mp3_duration(data: bytes) -> float:
+    """
+    Walks the frame headers (4 bytes each) and sums their sample counts.
+    Handles concatenated clips (e.g. gTTS output, one segment per request)
+    and skips ID3 tags between them.
+    """
+    pos = _skip_id3(data)
+    first = _frame_header(data, pos)
+    if first:
+        frames = _xing_frames(data, pos)
+        if frames:
+            return frames * first[1] / first[2]
+
+    seconds = 0.0
+    while pos < len(data) - 4:
+        header = _frame_header(data, pos)
+        if header is None:
+            if data[pos: pos + 3] == b"ID3":
+                pos += _skip_id3(data[pos:]) or 1
+            else:
+                pos += 1  # resync
+            continue
+        length, samples, sample_rate = header
+        seconds += samples / sample_rate
+        pos += max(length, 1)
+    return seconds
+
+
+def wav_duration(data: bytes) -> float:
+    pos, byte_rate = 12, 0
+    while pos + 8 <= len(data):
+        chunk_id, size = data[pos: pos + 4], struct.unpack("<I", data[pos + 4: pos + 8])[0]
+        if chunk_id == b"fmt ":
+            byte_rate = struct.unpack("<I", data[pos + 16: pos + 20])[0]
+        elif chunk_id == b"data":
+            # Streamed WAVs may carry a placeholder size; trust the bytes we have
+            size = min(size, len(data) - pos - 8)
+            return size / byte_rate if byte_rate else 0.0
+        pos += 8 + size + (size & 1)
+    return 0.0
+
+
+def audio_duration(data: bytes) -> float:
+    fmt = detect_format(data)
+    if fmt == "wav":
+        return wav_duration(data)
+    if fmt == "mp3":
+        return mp3_duration(data)
+    return 0.0
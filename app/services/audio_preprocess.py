@@ -0,0 +1,153 @@
+import io
+import os
+import time
+from math import gcd
+from typing import Tuple, Union
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+from app.core.config import settings
+from app.services import metrics
+
+TARGET_RATE = 16000
+FRAME_MS = 30
+
+_latency = metrics.LatencyStats()
+_totals = {"answers": 0, "passthrough": 0, "bytes_in": 0, "bytes_out": 0, "seconds_in": 0.0, "seconds_out": 0.0}
+
+
+class PreparedAudio:
+    """
+    What to send to STT, plus how much the pre-processing removed.
+    `audio` is the original input when the recording could not be decoded
+    (e.g. webm/opus) or the re-encoded clip would not be smaller.
+    """
+    __slots__ = ("audio", "bytes_in", "bytes_out", "seconds_in", "seconds_out")
+
+    def __init__(self, audio: Union[bytes, str], bytes_in: int, bytes_out: int, seconds_in: float, seconds_out: float):
+        self.audio = audio
+        self.bytes_in = bytes_in
+        self.bytes_out = bytes_out
+        self.seconds_in = seconds_in
+        self.seconds_out = seconds_out
+
+    @property
+    def bytes_removed(self) -> int:
+        return self.bytes_in - self.bytes_out
+
+    @property
+    def seconds_removed(self) -> float:
+        return round(self.seconds_in - self.seconds_out, 3)
+
+
+def frame_energy_db(frames: np.ndarray) -> np.ndarray:
+    """
+    Mean energy in dB of each row of a (count, frame) array.
+    """
+    return 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+
+def voiced_span(samples: np.ndarray, rate: int) -> Tuple[int, int]:
+    """
+    [start, stop) sample range between the first and last voiced frame,
+    padded by VAD_PADDING_MS. (0, 0) if nothing is voiced.
+    Energy is computed per FRAME_MS frame on a reshaped view, no Python loop.
+    """
+    frame = max(1, rate * FRAME_MS // 1000)
+    count = len(samples) // frame
+    if count == 0:
+        return 0, len(samples)
+
+    frames = samples[: count * frame].reshape(count, frame)
+    energy_db = frame_energy_db(frames)
+    noise_floor = np.percentile(energy_db, 10)
+    # On a recording that is speech end to end the 10th percentile is speech
+    # too, so never demand more than MARGIN below the loudest frame.
+    threshold = max(min(noise_floor + settings.VAD_MARGIN_DB, energy_db.max() - settings.VAD_MARGIN_DB), settings.VAD_FLOOR_DB)
+    voiced = np.flatnonzero(energy_db > threshold)
+    if voiced.size == 0:
+        return 0, 0
+
+    pad = settings.VAD_PADDING_MS // FRAME_MS
+    start = max(int(voiced[0]) - pad, 0) * frame
+    stop = min((int(voiced[-1]) + 1 + pad) * frame, len(samples))
+    return start, stop
+
+
+def to_mono_16k(data: np.ndarray, rate: int) -> np.ndarray:
+    """
+    (frames, channels) float32 -> mono float32 at TARGET_RATE (polyphase resampling).
+    """
+    mono = data.mean(axis=1) if data.ndim == 2 else data
+    if rate == TARGET_RATE or len(mono) == 0:
+        return mono.astype(np.float32, copy=False)
+    g = gcd(TARGET_RATE, rate)
+    return resample_poly(mono, TARGET_RATE // g, rate // g).astype(np.float32, copy=False)
+
+
+def encode_flac(samples: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, np.clip(samples, -1.0, 1.0), TARGET_RATE, format="FLAC", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def _record(prepared: PreparedAudio, started: float, passthrough: bool = False):
+    _latency.record(time.perf_counter() - started)
+    _totals["answers"] += 1
+    _totals["passthrough"] += int(passthrough)
+    _totals["bytes_in"] += prepared.bytes_in
+    _totals["bytes_out"] += prepared.bytes_out
+    _totals["seconds_in"] += prepared.seconds_in
+    _totals["seconds_out"] += prepared.seconds_out
+
+
+def prepare_for_stt(audio: Union[bytes, str]) -> PreparedAudio:
+    """
+    Trims leading/trailing silence, downmixes to mono, resamples to 16 kHz
+    and re-encodes as 16-bit FLAC, for bytes or a path to an answer recording.
+    Falls back to the untouched input if it can't be decoded.
+    """
+    started = time.perf_counter()
+    size = len(audio) if isinstance(audio, bytes) else os.path.getsize(audio)
+    try:
+        data, rate = sf.read(io.BytesIO(audio) if isinstance(audio, bytes) else audio, dtype="float32", always_2d=True)
+    except Exception as e:
+        print(f"DEBUG: Audio pre-processing skipped (can't decode): {e}")
+        prepared = PreparedAudio(audio, size, size, 0.0, 0.0)
+        _record(prepared, started, passthrough=True)
+        return prepared
+
+    seconds_in = len(data) / rate
+    mono = data.mean(axis=1)
+    start, stop = voiced_span(mono, rate)
+    if stop <= start:
+        # All silence: let STT see the original rather than an empty clip
+        prepared = PreparedAudio(audio, size, size, seconds_in, seconds_in)
+        _record(prepared, started, passthrough=True)
+        return prepared
+
+    samples = to_mono_16k(mono[start:stop], rate)
+    encoded = encode_flac(samples)
+    seconds_out = len(samples) / TARGET_RATE
+    if len(encoded) >= size:
+        prepared = PreparedAudio(audio, size, size, seconds_in, seconds_in)
+        _record(prepared, started, passthrough=True)
+        return prepared
+
+    prepared = PreparedAudio(encoded, size, len(encoded), seconds_in, seconds_out)
+    _record(prepared, started)
+    return prepared
+
+
+def stats() -> dict:
+    return {
+        **{k: round(v, 3) if isinstance(v, float) else v for k, v in _totals.items()},
+        "bytes_removed": _totals["bytes_in"] - _totals["bytes_out"],
+        "seconds_removed": round(_totals["seconds_in"] - _totals["seconds_out"], 3),
+        "latency": _latency.snapshot(),
+    }
+
+
+metrics.register("audio_preprocess", stats)
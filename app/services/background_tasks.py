@@ -1,56 +1,65 @@
-from app.services import text_to_speech, evaluator
+from fastapi.concurrency import run_in_threadpool
+
+from app.services import evaluator
+from app.services.evaluation_batcher import evaluation_batcher
+from app.services.job_queue import job_queue
 from app.services.session_manager import session_manager
-import asyncio
+from app.services.tts_scheduler import tts_scheduler
+
+# Job types (see job_queue.JobQueue)
+PREFETCH_TTS = "prefetch_tts"
+EVALUATE_ANSWER = "evaluate_answer"
 
 async def prefetch_tts(session_id: str, questions: list[str]):
     """
-    Generates audio for all questions (skipping 0 since it's likely already done or doing it parallel).
-    We start from index 1 because index 0 is needed immediately by the /start endpoint, 
-    so it might be handled there or here depending on logic.
-    Actual logic: The /start endpoint generates Q0. We generate Q1..QN here.
+    Hands audio for all questions (skipping 0, which /start generates itself)
+    to the shared TTS scheduler and returns without waiting for it, so a job
+    worker isn't held for a whole session's synthesis ahead of evaluations.
+    The scheduler decides the order and how many run at once: the question
+    a session needs next goes first, across all sessions. A clip that fails
+    is generated on demand when /interview/next reaches its question.
     """
+    if await run_in_threadpool(session_manager.get_session, session_id) is None:
+        return # Evicted or discarded: nobody will play it
+
     print(f"[Background] Starting TTS pre-fetch for session {session_id}")
-    
-    # Iterate from 1 to end
+
     for idx, question in enumerate(questions):
-        if idx == 0: continue # Already generated in /start
-        
-        try:
-            filename_prefix = f"q_{session_id}_{idx}"
-            print(f"[Background] Generating audio for Q{idx+1}: {filename_prefix}")
-            
-            # We don't need run_in_threadpool here if we are already in a background task, 
-            # but if speak_text is blocking (synchronous), we might want to wrap it.
-            # Assuming speak_text is synchronous blocking IO, we should await it properly if it was async
-            # or wrap it. The original code used run_in_threadpool(speak_text).
-            # Here we will re-use that pattern if possible, or just call it if we are sure.
-            # Since we are in a pure async function called by BackgroundTasks, we should ideally use threadpool for blocking IO.
-            
-            # For simplicity in this helper, let's assume valid async/sync. 
-            # If `speak_text` is sync, we wrap it.
-            from fastapi.concurrency import run_in_threadpool
-            result = await run_in_threadpool(text_to_speech.speak_text, question, filename_prefix)
-            
-            if result["valid"]:
-                session_manager.set_cached_audio(session_id, idx, result["relative_path"])
-                print(f"[Background] Cached audio for Q{idx+1}")
-            else:
-                print(f"[Background] Failed audio for Q{idx+1}: {result.get('error')}")
-                
-        except Exception as e:
-            print(f"[Background] Error pre-fetching Q{idx+1}: {e}")
+        if idx != 0: # Already generated in /start
+            tts_scheduler.prefetch(session_id, idx, question)
 
 async def process_answer_evaluation(session_id: str, index: int, question: str, answer_text: str):
     """
     Evaluates the answer and updates the session feedback asynchronously.
+    Concurrent evaluations (from any session) share one model call, see
+    evaluation_batcher.
+    A failed model call raises, so the job queue retries it with backoff.
     """
     print(f"[Background] Evaluating answer for session {session_id} Q{index}")
-    try:
-        from fastapi.concurrency import run_in_threadpool
-        feedback = await run_in_threadpool(evaluator.evaluate_answer, question, answer_text)
-        
-        session_manager.add_feedback(session_id, index, feedback)
-        print(f"[Background] Feedback saved for session {session_id} Q{index}")
-        
-    except Exception as e:
-        print(f"[Background] Error evaluating answer: {e}")
+    feedback = await evaluation_batcher.evaluate(question, answer_text)
+    if evaluator.is_error(feedback):
+        raise RuntimeError(f"Evaluation failed for session {session_id} Q{index}")
+
+    await run_in_threadpool(session_manager.add_feedback, session_id, index, feedback)
+    print(f"[Background] Feedback saved for session {session_id} Q{index}")
+
+def record_evaluation_error(session_id: str, index: int, question: str, answer_text: str):
+    # Out of retries: record the error result so the session's feedback is complete
+    session_manager.add_feedback(session_id, index, dict(evaluator.ERROR_RESULT))
+
+job_queue.register(PREFETCH_TTS, prefetch_tts, priority="interactive")
+job_queue.register(EVALUATE_ANSWER, process_answer_evaluation, priority="default", on_give_up=record_evaluation_error)
+
+async def enqueue_prefetch_tts(session_id: str, questions: list[str]):
+    await run_in_threadpool(
+        job_queue.enqueue, PREFETCH_TTS,
+        {"session_id": session_id, "questions": list(questions)},
+        key=f"{PREFETCH_TTS}:{session_id}",
+    )
+
+async def enqueue_answer_evaluation(session_id: str, index: int, question: str, answer_text: str):
+    await run_in_threadpool(
+        job_queue.enqueue, EVALUATE_ANSWER,
+        {"session_id": session_id, "index": index, "question": question, "answer_text": answer_text},
+        key=f"{EVALUATE_ANSWER}:{session_id}:{index}",
+    )
@@ -0,0 +1,143 @@
+import asyncio
+import time
+from collections import Counter
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services import evaluator, http_transport, metrics
+from app.services.singleflight import call_key, singleflight
+
+
+class PendingEvaluation:
+    __slots__ = ("question", "answer", "future", "enqueued_at")
+
+    def __init__(self, question: str, answer: str, future: asyncio.Future):
+        self.question = question
+        self.answer = answer
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class EvaluationBatcher:
+    """
+    Collects answer evaluations from all sessions and grades them together.
+    - A batch is sent when it reaches max_items, or max_wait_ms after its
+      first item arrived, whichever comes first.
+    - One multi-item prompt grades the whole batch; results go back to each
+      caller's future, in order.
+    - If the batch call or its JSON fails, every item is graded on its own;
+      items the batch response left out or got wrong are graded singly too.
+    A single pending item skips the batch prompt and uses the normal one.
+    """
+
+    def __init__(self, max_items: int, max_wait_ms: int):
+        self.max_items = max(1, max_items)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self._pending: List[PendingEvaluation] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = set()
+        self.batch_sizes = Counter()
+        self.counters = {
+            "items": 0, "batches": 0, "single_calls": 0,
+            "batch_failures": 0, "item_fallbacks": 0,
+            "prompt_tokens": 0, "completion_tokens": 0,
+        }
+        self.wait_time = metrics.LatencyStats()
+        self.batch_time = metrics.LatencyStats()
+
+    async def evaluate(self, question: str, answer: str) -> dict:
+        """
+        Same contract as evaluator.evaluate_answer_async. Identical pairs
+        already pending or in flight share one result.
+        """
+        if not evaluator.API_TOKEN:
+            return dict(evaluator.MISSING_KEY_RESULT)
+
+        key = call_key(evaluator.MODEL_ID, question, answer)
+        return await singleflight.do("evaluate_answer", key, self._enqueue, question, answer)
+
+    async def _enqueue(self, question: str, answer: str) -> dict:
+        loop = asyncio.get_running_loop()
+        item = PendingEvaluation(question, answer, loop.create_future())
+        self._pending.append(item)
+        self.counters["items"] += 1
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await item.future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[: self.max_items], self._pending[self.max_items:]
+            task = asyncio.create_task(self._run(batch))
+            # Keep a reference until done, or the task can be collected
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[PendingEvaluation]):
+        started = time.perf_counter()
+        for item in batch:
+            self.wait_time.record(started - item.enqueued_at)
+        self.batch_sizes[len(batch)] += 1
+
+        try:
+            results = await self._grade(batch)
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        finally:
+            self.batch_time.record(time.perf_counter() - started)
+        for item, result in zip(batch, results):
+            if not item.future.done():
+                item.future.set_result(result)
+
+    async def _grade(self, batch: List[PendingEvaluation]) -> list:
+        with http_transport.track_usage() as usage:
+            if len(batch) == 1:
+                self.counters["single_calls"] += 1
+                results = [None]
+            else:
+                self.counters["batches"] += 1
+                try:
+                    results = await evaluator.evaluate_batch_async([(i.question, i.answer) for i in batch])
+                except Exception as e:
+                    print(f"[Eval] Batch of {len(batch)} failed, grading singly: {e}")
+                    self.counters["batch_failures"] += 1
+                    results = [None] * len(batch)
+
+            missing = [i for i, result in enumerate(results) if result is None]
+            if len(batch) > 1:
+                self.counters["item_fallbacks"] += len(missing)
+            singles = await asyncio.gather(
+                *(evaluator.evaluate_answer_async(batch[i].question, batch[i].answer) for i in missing)
+            )
+            for i, result in zip(missing, singles):
+                results[i] = result
+
+        self.counters["prompt_tokens"] += usage["prompt_tokens"]
+        self.counters["completion_tokens"] += usage["completion_tokens"]
+        return results
+
+    def stats(self) -> dict:
+        items = self.counters["items"]
+        tokens = self.counters["prompt_tokens"] + self.counters["completion_tokens"]
+        return {
+            "max_items": self.max_items,
+            "max_wait_ms": round(self.max_wait * 1000),
+            "pending": len(self._pending),
+            **self.counters,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "tokens_per_item": round(tokens / items, 1) if items else 0,
+            "wait_time": self.wait_time.snapshot(),
+            "batch_time": self.batch_time.snapshot(),
+        }
+
+
+evaluation_batcher = EvaluationBatcher(settings.EVAL_BATCH_MAX_ITEMS, settings.EVAL_BATCH_MAX_WAIT_MS)
+metrics.register("evaluation_batcher", evaluation_batcher.stats)
@@ -1,32 +1,37 @@
 import os
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
-import json
+from app.services.model_router import model_router
+from app.json_utils import repair_json
 
 load_dotenv()
 
 API_TOKEN = os.getenv("HF_API_KEY")
 MODEL_ID = "mistralai/Mistral-7B-Instruct-v0.2"
 
-def evaluate_answer(question: str, answer: str) -> dict:
-    """
-    Evaluates the candidate's answer to the interview question.
-    Returns a dict: {"feedback": str, "rating": str, "is_satisfactory": bool}
-    """
-    if not API_TOKEN:
-        return {"feedback": "Error: API Key missing", "rating": "N/A", "is_satisfactory": False}
+MISSING_KEY_RESULT = {"feedback": "Error: API Key missing", "rating": "N/A", "is_satisfactory": False}
+# "error" marks a failed (retryable) evaluation; the model's JSON never has it
+ERROR_RESULT = {
+    "feedback": "Could not evaluate answer due to system error.",
+    "rating": "N/A",
+    "is_satisfactory": False,
+    "error": True,
+}
+
+def is_error(result: dict) -> bool:
+    return result.get("error") is True
 
+def _build_payload(question: str, answer: str) -> dict:
     prompt = f"""
     You are an expert technical interviewer.
-    
+
     Question: "{question}"
     Candidate's Answer: "{answer}"
-    
-    Evaluate the answer. 
+
+    Evaluate the answer.
     1. Is it correct?
     2. specific feedback on what was good or missing.
     3. Rating (1-10).
-    
+
     Output strictly in this JSON format:
     {{
       "feedback": "Your feedback here...",
@@ -34,34 +39,126 @@ def evaluate_answer(question: str, answer: str) -> dict:
       "is_satisfactory": true/false
     }}
     """
-    
-    client = InferenceClient(token=API_TOKEN)
-    
+
+    messages = [
+        {"role": "system", "content": "You are a strict technical evaluator. Output only JSON."},
+        {"role": "user", "content": prompt}
+    ]
+
+    return {
+        "model": MODEL_ID,
+        "messages": messages,
+        "max_tokens": 300,
+        "temperature": 0.1
+    }
+
+def _build_batch_payload(items: list) -> dict:
+    """
+    One request grading several (question, answer) pairs. Items are
+    numbered so each result can be matched back even if the model
+    reorders or drops some.
+    """
+    listed = "\n".join(
+        f'{i}. Question: "{question}"\n   Candidate\'s Answer: "{answer}"'
+        for i, (question, answer) in enumerate(items, 1)
+    )
+    prompt = f"""
+    You are an expert technical interviewer.
+    Evaluate each of the {len(items)} answers below independently.
+    For each: is it correct, specific feedback on what was good or missing, and a rating (1-10).
+
+    {listed}
+
+    Output strictly one JSON array with exactly {len(items)} objects, one per item, in this format:
+    [
+      {{"id": 1, "feedback": "Your feedback here...", "rating": "X/10", "is_satisfactory": true/false}}
+    ]
+    """
+
+    messages = [
+        {"role": "system", "content": "You are a strict technical evaluator. Output only JSON."},
+        {"role": "user", "content": prompt}
+    ]
+
+    return {
+        "model": MODEL_ID,
+        "messages": messages,
+        "max_tokens": 300 * len(items),
+        "temperature": 0.1
+    }
+
+def _valid_evaluation(item) -> bool:
+    return (
+        isinstance(item, dict)
+        and isinstance(item.get("feedback"), str)
+        and isinstance(item.get("rating"), (str, int))
+        and isinstance(item.get("is_satisfactory"), bool)
+    )
+
+def _parse_batch_evaluation(response: dict, count: int) -> list:
+    """
+    Returns one result per item, in order; None where the model's entry is
+    missing or doesn't match the schema (the caller grades those singly).
+    """
+    content = response["choices"][0]["message"]["content"].strip()
+    parsed = repair_json(content)[0]
+    if isinstance(parsed, dict):
+        parsed = parsed.get("evaluations") or parsed.get("results") or []
+    if not isinstance(parsed, list):
+        raise ValueError("Batch evaluation is not a JSON array")
+
+    results = [None] * count
+    for position, item in enumerate(parsed):
+        if not _valid_evaluation(item):
+            continue
+        item_id = item.get("id", position + 1)
+        index = item_id - 1 if isinstance(item_id, int) else position
+        if 0 <= index < count and results[index] is None:
+            results[index] = {k: item[k] for k in ("feedback", "rating", "is_satisfactory")}
+    return results
+
+async def evaluate_batch_async(items: list) -> list:
+    """
+    Grades several (question, answer) pairs in one model call.
+    Returns a list aligned with items: an evaluation dict, or None for
+    items the response didn't cover. Raises if the call or parse fails.
+    """
+    response = await model_router.achat("evaluate:batch", _build_batch_payload(items))
+    return _parse_batch_evaluation(response, len(items))
+
+def _parse_evaluation(response: dict) -> dict:
+    content = response["choices"][0]["message"]["content"].strip()
+
+    # Fences, prose, stray quotes and max_tokens cut-offs are repaired locally
+    return repair_json(content)[0]
+
+def evaluate_answer(question: str, answer: str) -> dict:
+    """
+    Evaluates the candidate's answer to the interview question.
+    Returns a dict: {"feedback": str, "rating": str, "is_satisfactory": bool}
+    """
+    if not API_TOKEN:
+        return dict(MISSING_KEY_RESULT)
+
+    try:
+        response = model_router.chat("evaluate", _build_payload(question, answer))
+        return _parse_evaluation(response)
+
+    except Exception as e:
+        print(f"DEBUG: Evaluation Error: {e}")
+        return dict(ERROR_RESULT)
+
+async def evaluate_answer_async(question: str, answer: str) -> dict:
+    """
+    Async version of evaluate_answer (no threadpool hop).
+    """
+    if not API_TOKEN:
+        return dict(MISSING_KEY_RESULT)
+
     try:
-        messages = [
-            {"role": "system", "content": "You are a strict technical evaluator. Output only JSON."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response = client.chat_completion(
-            messages=messages,
-            model=MODEL_ID,
-            max_tokens=300,
-            temperature=0.1
-        )
-        
-        content = response.choices[0].message.content.strip()
-        
-        # Clean up markdown if present
-        if content.startswith("```json"):
-            content = content.replace("```json", "").replace("```", "")
-        
-        return json.loads(content)
-        
+        response = await model_router.achat("evaluate", _build_payload(question, answer))
+        return _parse_evaluation(response)
+
     except Exception as e:
         print(f"DEBUG: Evaluation Error: {e}")
-        return {
-            "feedback": "Could not evaluate answer due to system error.", 
-            "rating": "N/A", 
-            "is_satisfactory": False
-        }
+        return dict(ERROR_RESULT)
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Set
+
+from app.services import metrics
+
+
+class FeedbackEvents:
+    """
+    In-process wake-up for clients streaming a session's feedback.
+    A subscriber is an asyncio.Event parked on the event loop, so an idle
+    stream costs nothing until notify() fires. notify() is called by the
+    session store whenever feedback is written, from the loop or from a
+    threadpool thread.
+    Only covers writes made by this process: with a shared (SQL) session
+    store, streams also re-check on their keepalive interval.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Event]] = defaultdict(set)
+        self._loop = None
+        self._lock = threading.Lock()
+        self.counters = {"notifications": 0, "wakeups": 0}
+
+    @contextmanager
+    def subscribe(self, session_id: str) -> Iterator[asyncio.Event]:
+        """
+        Registers an event for the block's duration. Clear it before reading
+        the session, then wait on it: a write in between still sets it.
+        """
+        self._loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        with self._lock:
+            self._subscribers[session_id].add(event)
+        try:
+            yield event
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(session_id)
+                if subscribers is not None:
+                    subscribers.discard(event)
+                    if not subscribers:
+                        del self._subscribers[session_id]
+
+    def notify(self, session_id: str):
+        with self._lock:
+            events = list(self._subscribers.get(session_id, ()))
+        self.counters["notifications"] += 1
+        if not events:
+            return
+        self.counters["wakeups"] += len(events)
+
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            for event in events:
+                event.set()
+        else:
+            self._loop.call_soon_threadsafe(lambda: [event.set() for event in events])
+
+    def stats(self) -> dict:
+        with self._lock:
+            streams = sum(len(s) for s in self._subscribers.values())
+        return {"open_streams": streams, **self.counters}
+
+
+feedback_events = FeedbackEvents()
+metrics.register("feedback_events", feedback_events.stats)
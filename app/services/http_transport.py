@@ -0,0 +1,382 @@
+import asyncio
+import contextvars
+import json as jsonlib
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import AsyncIterator, Union
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.core.config import settings
+from app.services import audio_info, metrics
+
+CHAT_URL = f"{settings.HF_BASE_URL}/v1/chat/completions"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+AUDIO_CONTENT_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+    ".webm": "audio/webm",
+    ".ogg": "audio/ogg",
+    ".flac": "audio/flac",
+    ".m4a": "audio/mp4",
+}
+
+
+def chat_url(model: str) -> str:
+    for item in settings.MODEL_ENDPOINTS.split(","):
+        name, _, base = item.strip().partition("=")
+        if name == model and base:
+            return f"{base.rstrip('/')}/v1/chat/completions"
+    return CHAT_URL
+
+
+def asr_url(model: str) -> str:
+    return f"{settings.HF_BASE_URL}/hf-inference/models/{model}"
+
+
+# ---------------------------------------------------------------------------
+# Shared session: one connection pool per host, kept alive across calls so
+# only the first request to the router pays for TCP + TLS.
+# ---------------------------------------------------------------------------
+_session = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=settings.HTTP_POOL_SIZE,
+    pool_block=True,  # wait for a free connection rather than opening throwaway ones
+    max_retries=0,    # retries are handled below, with jitter
+)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+_stats_lock = threading.Lock()
+_in_flight = defaultdict(int)
+_peak_in_flight = defaultdict(int)
+_retries = defaultdict(int)
+_errors = defaultdict(int)
+_latency = defaultdict(metrics.LatencyStats)
+
+
+# Token usage of the chat calls made inside a track_usage() block. A
+# contextvar follows the request through awaits without threading it
+# through every service signature.
+_usage = contextvars.ContextVar("http_transport_usage", default=None)
+_tokens = defaultdict(lambda: {"prompt_tokens": 0, "completion_tokens": 0})
+
+
+@contextmanager
+def track_usage():
+    totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    token = _usage.set(totals)
+    try:
+        yield totals
+    finally:
+        _usage.reset(token)
+
+
+def _record_usage(model: str, body: dict):
+    usage = body.get("usage") or {}
+    prompt, completion = usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0
+    with _stats_lock:
+        _tokens[model]["prompt_tokens"] += prompt
+        _tokens[model]["completion_tokens"] += completion
+    totals = _usage.get()
+    if totals is not None:
+        totals["calls"] += 1
+        totals["prompt_tokens"] += prompt
+        totals["completion_tokens"] += completion
+
+
+def _auth_headers() -> dict:
+    return {"Authorization": f"Bearer {settings.API_KEY}"}
+
+
+def _backoff(attempt: int, response: requests.Response = None) -> float:
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), settings.HTTP_BACKOFF_MAX)
+    # "full jitter": spreads retries from many workers hitting the same outage
+    return random.uniform(0, min(settings.HTTP_BACKOFF_MAX, settings.HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+def post(url: str, *, json: dict = None, data: bytes = None, headers: dict = None,
+         timeout: tuple = None, retries: int = None) -> requests.Response:
+    """
+    POSTs through the pooled session with connect/read timeouts.
+    Connection errors, timeouts, 429 and 5xx are retried with jittered
+    exponential backoff; the final response is raise_for_status()-ed.
+    """
+    host = urlparse(url).netloc
+    timeout = timeout or (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT)
+    retries = settings.HTTP_MAX_RETRIES if retries is None else retries
+    headers = {**_auth_headers(), **(headers or {})}
+
+    attempt = 0
+    while True:
+        with _stats_lock:
+            _in_flight[host] += 1
+            _peak_in_flight[host] = max(_peak_in_flight[host], _in_flight[host])
+        started = time.perf_counter()
+        response, error = None, None
+        try:
+            response = _session.post(url, json=json, data=data, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        finally:
+            with _stats_lock:
+                _in_flight[host] -= 1
+                _latency[host].record(time.perf_counter() - started)
+
+        retryable = error is not None or response.status_code in RETRY_STATUSES
+        if retryable and attempt < retries:
+            with _stats_lock:
+                _retries[host] += 1
+            time.sleep(_backoff(attempt, response))
+            attempt += 1
+            continue
+
+        if error is not None or response.status_code >= 400:
+            with _stats_lock:
+                _errors[host] += 1
+        if error is not None:
+            raise error
+        response.raise_for_status()
+        return response
+
+
+def chat_completion(payload: dict, **kwargs) -> dict:
+    """
+    OpenAI-style chat completion against the HF router; returns the JSON body.
+    """
+    body = post(chat_url(payload.get("model")), json=payload, **kwargs).json()
+    _record_usage(payload.get("model"), body)
+    return body
+
+
+def read_audio(audio: Union[bytes, str]) -> tuple:
+    """
+    Returns (bytes, content_type) for raw bytes or a path to an audio file.
+    """
+    if isinstance(audio, str):
+        content_type = AUDIO_CONTENT_TYPES.get(os.path.splitext(audio)[1].lower(), "application/octet-stream")
+        with open(audio, "rb") as f:
+            return f.read(), content_type
+    # Bytes carry no extension: sniff the container from its magic number
+    return audio, AUDIO_CONTENT_TYPES.get(f".{audio_info.detect_format(audio)}", "application/octet-stream")
+
+
+def automatic_speech_recognition(audio: Union[bytes, str], model: str, **kwargs) -> dict:
+    audio_bytes, content_type = read_audio(audio)
+    return post(asr_url(model), data=audio_bytes, headers={"Content-Type": content_type}, **kwargs).json()
+
+
+# ---------------------------------------------------------------------------
+# Async path: one shared httpx.AsyncClient, so hundreds of concurrent model
+# calls wait on sockets instead of occupying threadpool workers. Each
+# upstream model gets its own semaphore to cap how hard we hit it.
+# ---------------------------------------------------------------------------
+_async_client = None
+_semaphores = {}
+_waiting = defaultdict(int)
+_in_use = defaultdict(int)  # model -> slots held (asyncio.Semaphore doesn't expose it)
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_POOL_SIZE,
+                max_keepalive_connections=settings.HTTP_POOL_SIZE,
+            ),
+            timeout=httpx.Timeout(settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+        )
+    return _async_client
+
+
+async def aclose():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def _concurrency_limit(model: str) -> int:
+    for item in settings.MODEL_CONCURRENCY_OVERRIDES.split(","):
+        name, _, limit = item.strip().rpartition("=")
+        if name == model and limit.isdigit():
+            return int(limit)
+    return settings.MODEL_CONCURRENCY
+
+
+def model_semaphore(model: str) -> asyncio.Semaphore:
+    if model not in _semaphores:
+        _semaphores[model] = asyncio.Semaphore(_concurrency_limit(model))
+    return _semaphores[model]
+
+
+async def apost(url: str, *, json: dict = None, data: bytes = None, headers: dict = None,
+                timeout: tuple = None, retries: int = None, model: str = None) -> httpx.Response:
+    """
+    Async counterpart of post(): same timeouts, retry/backoff policy and stats.
+    When `model` is given the call holds that model's concurrency slot.
+    """
+    host = urlparse(url).netloc
+    retries = settings.HTTP_MAX_RETRIES if retries is None else retries
+    headers = {**_auth_headers(), **(headers or {})}
+    if timeout:
+        timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+    semaphore = model_semaphore(model) if model else None
+
+    attempt = 0
+    while True:
+        if semaphore:
+            _waiting[model] += 1
+            try:
+                await semaphore.acquire()
+            finally:
+                _waiting[model] -= 1
+        with _stats_lock:
+            if semaphore:
+                _in_use[model] += 1
+            _in_flight[host] += 1
+            _peak_in_flight[host] = max(_peak_in_flight[host], _in_flight[host])
+        started = time.perf_counter()
+        response, error = None, None
+        try:
+            kwargs = {"timeout": timeout} if timeout else {}
+            response = await _get_async_client().post(url, json=json, content=data, headers=headers, **kwargs)
+        except (httpx.TransportError, httpx.TimeoutException) as e:
+            error = e
+        finally:
+            with _stats_lock:
+                _in_flight[host] -= 1
+                _latency[host].record(time.perf_counter() - started)
+                if semaphore:
+                    _in_use[model] -= 1
+            if semaphore:
+                semaphore.release()
+
+        retryable = error is not None or response.status_code in RETRY_STATUSES
+        if retryable and attempt < retries:
+            with _stats_lock:
+                _retries[host] += 1
+            await asyncio.sleep(_backoff(attempt, response))
+            attempt += 1
+            continue
+
+        if error is not None or response.status_code >= 400:
+            with _stats_lock:
+                _errors[host] += 1
+        if error is not None:
+            raise error
+        response.raise_for_status()
+        return response
+
+
+async def achat_completion(payload: dict, **kwargs) -> dict:
+    response = await apost(chat_url(payload.get("model")), json=payload, model=payload.get("model"), **kwargs)
+    body = response.json()
+    _record_usage(payload.get("model"), body)
+    return body
+
+
+async def astream_chat_completion(payload: dict) -> AsyncIterator[str]:
+    """
+    Streams an OpenAI-style chat completion (server-sent events) and yields
+    the content deltas as they arrive. Not retried: once tokens have been
+    handed to the caller a retry would duplicate them.
+    """
+    model = payload.get("model")
+    url = chat_url(model)
+    host = urlparse(url).netloc
+    semaphore = model_semaphore(model) if model else None
+    if semaphore:
+        await semaphore.acquire()
+    with _stats_lock:
+        if semaphore:
+            _in_use[model] += 1
+        _in_flight[host] += 1
+        _peak_in_flight[host] = max(_peak_in_flight[host], _in_flight[host])
+    started = time.perf_counter()
+    try:
+        async with _get_async_client().stream(
+            "POST", url, json={**payload, "stream": True, "stream_options": {"include_usage": True}},
+            headers=_auth_headers()
+        ) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = jsonlib.loads(data)
+                if chunk.get("usage"):
+                    _record_usage(model, chunk)
+                choices = chunk.get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+    except Exception:
+        with _stats_lock:
+            _errors[host] += 1
+        raise
+    finally:
+        with _stats_lock:
+            _in_flight[host] -= 1
+            _latency[host].record(time.perf_counter() - started)
+            if semaphore:
+                _in_use[model] -= 1
+        if semaphore:
+            semaphore.release()
+
+
+async def aautomatic_speech_recognition(audio: Union[bytes, str], model: str, **kwargs) -> dict:
+    if isinstance(audio, str):
+        audio_bytes, content_type = await asyncio.to_thread(read_audio, audio)
+    else:
+        audio_bytes, content_type = read_audio(audio)
+    response = await apost(asr_url(model), data=audio_bytes, headers={"Content-Type": content_type}, model=model, **kwargs)
+    return response.json()
+
+
+def stats() -> dict:
+    with _stats_lock:
+        hosts = set(_latency) | set(_in_flight)
+        return {
+            "pool_maxsize": settings.HTTP_POOL_SIZE,
+            "hosts": {
+                host: {
+                    "in_flight": _in_flight[host],
+                    "peak_in_flight": _peak_in_flight[host],
+                    "pool_utilisation": round(_in_flight[host] / settings.HTTP_POOL_SIZE, 3),
+                    "retries": _retries[host],
+                    "errors": _errors[host],
+                    "latency": _latency[host].snapshot(),
+                }
+                for host in hosts
+            },
+            "models": {
+                model: {
+                    "limit": _concurrency_limit(model),
+                    "in_use": _in_use[model],
+                    "waiting": _waiting[model],
+                }
+                for model in _semaphores
+            },
+            "tokens": {model: dict(counts) for model, counts in _tokens.items()},
+        }
+
+
+metrics.register("http_transport", stats)
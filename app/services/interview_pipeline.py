@@ -0,0 +1,105 @@
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from app.core.config import settings
+from app.services import http_transport, metrics, resume_ai, resume_parser
+from app.services.resume_cache import resume_cache, ats_key, get_resume_text
+from app.services.singleflight import singleflight
+from app.services.upload_ingest import IngestedUpload
+
+MODES = ("two_call", "combined")
+OUTCOMES = ("ok", "error")
+# singleflight groups of the model calls made inside measure()
+COALESCED_GROUPS = ("resume_parse", "parse_and_generate", "generate_questions")
+
+_latency = {mode: {outcome: metrics.LatencyStats() for outcome in OUTCOMES} for mode in MODES}
+_tokens = {mode: {"requests": 0, "errors": 0, "calls": 0, "prompt_tokens": 0, "completion_tokens": 0} for mode in MODES}
+_combined_fallbacks = 0
+
+
+def resolve_mode(requested: Optional[str]) -> str:
+    """
+    Per-request mode if given, else settings.PARSE_MODE.
+    """
+    mode = (requested or settings.PARSE_MODE or "two_call").lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{requested}'. Use one of: {', '.join(MODES)}")
+    return mode
+
+
+@contextmanager
+def measure(mode: str):
+    """
+    Records wall-clock latency and LLM token usage of the parse + generate
+    work done inside the block, so the two modes can be compared under load.
+    - Latency is labelled ok/error by whether the block raised; failed
+      requests are recorded too (their tokens were spent all the same).
+    - Tokens are those of the calls this request made: a request that joined
+      another's identical in-flight call (singleflight) adds none.
+    """
+    started = time.perf_counter()
+    outcome, usage = "error", None
+    try:
+        with http_transport.track_usage() as usage:
+            yield
+        outcome = "ok"
+    finally:
+        _latency[mode][outcome].record(time.perf_counter() - started)
+        totals = _tokens[mode]
+        totals["requests"] += 1
+        if outcome == "error":
+            totals["errors"] += 1
+        for key in ("calls", "prompt_tokens", "completion_tokens"):
+            totals[key] += (usage or {}).get(key, 0)
+
+
+async def combined_questions(upload: IngestedUpload, num_questions: int = 10) -> list[str]:
+    """
+    Parses the resume and writes the questions in one LLM request.
+    The parsed resume is cached like the two-call path's. Returns [] when
+    the caller should use the two-call path instead: the parse is already
+    cached (so it would be a single call anyway) or the response failed
+    validation.
+    """
+    global _combined_fallbacks
+    if await resume_cache.aget(ats_key(upload.sha256)) is not None:
+        return []
+
+    text = await get_resume_text(upload)
+    if not text or not text.strip():
+        raise ValueError("No text extracted from resume")
+
+    try:
+        parsed, questions = await resume_ai.parse_and_generate_async(text, num_questions)
+    except Exception as e:
+        _combined_fallbacks += 1
+        print(f"DEBUG: Combined parse+generate failed, falling back to two calls: {e}")
+        return []
+
+    if not resume_parser.is_partial(text):
+        await resume_cache.aset(ats_key(upload.sha256), parsed)
+    return questions
+
+
+def stats() -> dict:
+    return {
+        "default_mode": settings.PARSE_MODE,
+        "combined_fallbacks": _combined_fallbacks,
+        # Calls answered by another request's in-flight call: their tokens
+        # are counted once, under the request that made the call
+        "coalesced_calls": {group: singleflight.counters.get(group, {}).get("coalesced", 0) for group in COALESCED_GROUPS},
+        "modes": {
+            mode: {
+                "latency": {outcome: _latency[mode][outcome].snapshot() for outcome in OUTCOMES},
+                **_tokens[mode],
+                "avg_total_tokens": round(
+                    (_tokens[mode]["prompt_tokens"] + _tokens[mode]["completion_tokens"]) / _tokens[mode]["requests"], 1
+                ) if _tokens[mode]["requests"] else 0.0,
+            }
+            for mode in MODES
+        },
+    }
+
+
+metrics.register("interview_pipeline", stats)
@@ -0,0 +1,336 @@
+import asyncio
+import inspect
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from uuid import uuid4
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services import metrics
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Lower runs first
+PRIORITIES = {"interactive": 0, "default": 1, "bulk": 2}
+
+STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_FAILED = "queued", "running", "done", "failed"
+
+
+class JobType:
+    __slots__ = ("name", "handler", "priority", "max_attempts", "on_give_up")
+
+    def __init__(self, name: str, handler: Callable, priority: str, max_attempts: int, on_give_up: Optional[Callable]):
+        self.name = name
+        self.handler = handler
+        self.priority = PRIORITIES[priority]
+        self.max_attempts = max_attempts
+        self.on_give_up = on_give_up
+
+
+class JobQueue:
+    """
+    Durable local job queue on SQLite, replacing in-process BackgroundTasks.
+    - Job types are registered with a handler (async, or sync to run in the
+      threadpool); payloads are JSON kwargs for it.
+    - A pool of `workers` asyncio tasks claims the next due job by priority
+      class, then age.
+    - Failures are retried with exponential backoff and jitter, up to the
+      type's max_attempts; then on_give_up(**payload) runs and the job is
+      marked failed.
+    - An idempotency key makes enqueueing the same work twice a no-op.
+    - Several worker processes can share the database: a claim is a
+      conditional UPDATE, so only one of them gets a job, and it holds the
+      job under a lease (owner + lease_expires_at) that it renews while the
+      handler runs. Jobs whose lease expired (their process crashed or was
+      restarted) are queued again; jobs other live processes are running
+      are left alone.
+    """
+
+    def __init__(self, path: str, workers: int):
+        self.path = Path(path) if Path(path).is_absolute() else BASE_DIR / path
+        self.workers = max(1, workers)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.types: Dict[str, JobType] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+        self._recovered_at = 0.0
+        self.in_flight = 0
+        self.counters = defaultdict(int)
+        self.wait_time: Dict[str, metrics.LatencyStats] = defaultdict(metrics.LatencyStats)
+        self.run_time: Dict[str, metrics.LatencyStats] = defaultdict(metrics.LatencyStats)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+                " priority INTEGER NOT NULL, idempotency_key TEXT UNIQUE, status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0, available_at REAL NOT NULL, created_at REAL NOT NULL,"
+                " finished_at REAL, last_error TEXT, owner TEXT, lease_expires_at REAL)"
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("lease_expires_at", "REAL")):
+                if column not in columns:
+                    # Databases created before leases
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (status, priority, available_at)")
+            self._conn.commit()
+        return self._conn
+
+    def register(self, name: str, handler: Callable, priority: str = "default",
+                 max_attempts: int = None, on_give_up: Callable = None):
+        self.types[name] = JobType(
+            name, handler, priority, max_attempts or settings.JOB_MAX_ATTEMPTS, on_give_up
+        )
+
+    # -- producer side -------------------------------------------------------
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], key: str = None, priority: str = None) -> bool:
+        """
+        Persists a job. Returns False if a job with the same idempotency key
+        already exists (queued, running or done).
+        """
+        job_type = self.types[kind]
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO jobs (kind, payload, priority, idempotency_key, status, available_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload), PRIORITIES[priority] if priority else job_type.priority,
+                 key, STATUS_QUEUED, now, now),
+            )
+            db.commit()
+        if not cursor.rowcount:
+            self.counters["deduplicated"] += 1
+            return False
+        self.counters["enqueued"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    # -- worker side -----------------------------------------------------------
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """
+        Takes the next due job. The UPDATE only matches a job that is still
+        queued, so when another process claims it first this one moves on to
+        the next candidate. Returns the row as claimed (attempts included).
+        """
+        with self._lock:
+            db = self._db()
+            while True:
+                now = time.time()
+                row = db.execute(
+                    "SELECT id FROM jobs WHERE status = ? AND available_at <= ?"
+                    " ORDER BY priority, available_at, id LIMIT 1",
+                    (STATUS_QUEUED, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                claimed = db.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, owner = ?, lease_expires_at = ?"
+                    " WHERE id = ? AND status = ?",
+                    (STATUS_RUNNING, self.owner, now + settings.JOB_LEASE_SECONDS, row["id"], STATUS_QUEUED),
+                ).rowcount
+                if claimed:
+                    row = db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                db.commit()
+                if claimed:
+                    return row
+                self.counters["claim_conflicts"] += 1
+
+    def _renew(self, job_id: int) -> bool:
+        with self._lock:
+            db = self._db()
+            renewed = db.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND owner = ? AND status = ?",
+                (time.time() + settings.JOB_LEASE_SECONDS, job_id, self.owner, STATUS_RUNNING),
+            ).rowcount
+            db.commit()
+        return bool(renewed)
+
+    async def _keep_lease(self, row: sqlite3.Row):
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            try:
+                if not await run_in_threadpool(self._renew, row["id"]):
+                    print(f"[Jobs] Lost the lease on {row['kind']} #{row['id']}")
+                    return
+            except Exception as e:
+                print(f"[Jobs] Lease renewal for {row['kind']} #{row['id']} failed: {e}")
+
+    def _next_due_in(self) -> float:
+        with self._lock:
+            due = self._db().execute(
+                "SELECT MIN(available_at) FROM jobs WHERE status = ?", (STATUS_QUEUED,)
+            ).fetchone()[0]
+        return max(0.0, due - time.time()) if due is not None else settings.JOB_POLL_INTERVAL
+
+    def _finish(self, job_id: int, status: str, error: str = None, retry_at: float = None):
+        # Only while this process still holds the job: after a lost lease
+        # the job belongs to whoever re-claimed it
+        with self._lock:
+            db = self._db()
+            if retry_at is not None:
+                db.execute(
+                    "UPDATE jobs SET status = ?, available_at = ?, last_error = ?, owner = NULL, lease_expires_at = NULL"
+                    " WHERE id = ? AND owner = ?",
+                    (STATUS_QUEUED, retry_at, error, job_id, self.owner),
+                )
+            else:
+                db.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, last_error = ?, lease_expires_at = NULL"
+                    " WHERE id = ? AND owner = ?",
+                    (status, time.time(), error, job_id, self.owner),
+                )
+            db.commit()
+
+    def _backoff(self, attempts: int) -> float:
+        # Full jitter, like http_transport's retries
+        return random.uniform(0, min(settings.JOB_BACKOFF_MAX, settings.JOB_BACKOFF_BASE * 2 ** (attempts - 1)))
+
+    async def _call(self, fn: Callable, payload: dict):
+        if inspect.iscoroutinefunction(fn):
+            return await fn(**payload)
+        return await run_in_threadpool(fn, **payload)
+
+    async def _run(self, row: sqlite3.Row):
+        job_type = self.types.get(row["kind"])
+        attempts = row["attempts"]  # as claimed
+        payload = json.loads(row["payload"])
+        self.wait_time[row["kind"]].record(time.time() - row["available_at"])
+        self.in_flight += 1
+        started = time.perf_counter()
+        lease = asyncio.create_task(self._keep_lease(row))
+        try:
+            if job_type is None:
+                raise LookupError(f"No handler registered for job type '{row['kind']}'")
+            await self._call(job_type.handler, payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job_type is not None and attempts < job_type.max_attempts:
+                self.counters["retried"] += 1
+                await run_in_threadpool(self._finish, row["id"], STATUS_QUEUED, error, time.time() + self._backoff(attempts))
+                print(f"[Jobs] {row['kind']} #{row['id']} failed (attempt {attempts}), retrying: {error}")
+                return
+            self.counters["failed"] += 1
+            print(f"[Jobs] {row['kind']} #{row['id']} gave up after {attempts} attempt(s): {error}")
+            if job_type is not None and job_type.on_give_up:
+                try:
+                    await self._call(job_type.on_give_up, payload)
+                except Exception as give_up_error:
+                    print(f"[Jobs] on_give_up for {row['kind']} #{row['id']} failed: {give_up_error}")
+            await run_in_threadpool(self._finish, row["id"], STATUS_FAILED, error)
+        else:
+            self.counters["completed"] += 1
+            await run_in_threadpool(self._finish, row["id"], STATUS_DONE)
+        finally:
+            lease.cancel()
+            self.in_flight -= 1
+            self.run_time[row["kind"]].record(time.perf_counter() - started)
+
+    async def _worker(self):
+        while True:
+            try:
+                row = await run_in_threadpool(self._claim)
+            except Exception as e:
+                print(f"[Jobs] Claim failed: {e}")
+                row = None
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+            if row is not None:
+                await self._run(row)
+                continue
+
+            if time.monotonic() - self._recovered_at >= settings.JOB_LEASE_SECONDS:
+                # Idle: pick up jobs a crashed process was holding
+                self._recovered_at = time.monotonic()
+                try:
+                    await run_in_threadpool(self._recover)
+                except Exception as e:
+                    print(f"[Jobs] Recovery failed: {e}")
+
+            self._wakeup.clear()
+            try:
+                timeout = await run_in_threadpool(self._next_due_in)
+                await asyncio.wait_for(self._wakeup.wait(), timeout=min(timeout, settings.JOB_POLL_INTERVAL))
+            except asyncio.TimeoutError:
+                pass
+
+    def _recover(self):
+        """
+        Queues again the running jobs whose lease expired (rows from before
+        leases have none), and drops finished jobs past retention.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            requeued = db.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, owner = NULL, lease_expires_at = NULL"
+                " WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (STATUS_QUEUED, now, STATUS_RUNNING, now),
+            ).rowcount
+            db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (STATUS_DONE, STATUS_FAILED, time.time() - settings.JOB_RETENTION_SECONDS),
+            )
+            db.commit()
+        if requeued:
+            self.counters["lease_expired"] += requeued
+            print(f"[Jobs] Re-queued {requeued} job(s) whose worker stopped renewing its lease")
+
+    async def start(self):
+        await run_in_threadpool(self._recover)
+        self._recovered_at = time.monotonic()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # -- visibility ----------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT kind, status, COUNT(*) AS n FROM jobs GROUP BY kind, status"
+            ).fetchall()
+        by_kind = defaultdict(dict)
+        for row in rows:
+            by_kind[row["kind"]][row["status"]] = row["n"]
+        return {
+            "workers": self.workers,
+            "queue_depth": sum(r["n"] for r in rows if r["status"] == STATUS_QUEUED),
+            "in_flight": self.in_flight,
+            **self.counters,
+            "kinds": {
+                kind: {
+                    **counts,
+                    "wait_time": self.wait_time[kind].snapshot(),
+                    "run_time": self.run_time[kind].snapshot(),
+                }
+                for kind, counts in by_kind.items()
+            },
+        }
+
+
+job_queue = JobQueue(settings.JOB_QUEUE_PATH, settings.JOB_WORKERS)
+metrics.register("job_queue", job_queue.stats, blocking=True)
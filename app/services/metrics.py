@@ -0,0 +1,76 @@
+import threading
+from collections import deque
+from typing import Callable, Dict
+
+from fastapi.concurrency import run_in_threadpool
+
+# name -> zero-arg function returning a JSON-serialisable dict
+_providers: Dict[str, Callable[[], dict]] = {}
+# providers that query a database: run in the threadpool by asnapshot()
+_blocking = set()
+
+
+def register(name: str, provider: Callable[[], dict], blocking: bool = False):
+    """
+    Registers a stats provider. Services call this at import time so
+    GET /metrics can report counters without knowing about each module.
+    blocking=True for providers that do I/O (a database query).
+    """
+    _providers[name] = provider
+    if blocking:
+        _blocking.add(name)
+
+
+def snapshot() -> dict:
+    return {name: provider() for name, provider in _providers.items()}
+
+
+async def asnapshot() -> dict:
+    """
+    snapshot() for the event loop: blocking providers go in the threadpool,
+    the rest (in-memory counters) run inline.
+    """
+    return {
+        name: await run_in_threadpool(provider) if name in _blocking else provider()
+        for name, provider in list(_providers.items())
+    }
+
+
+class LatencyStats:
+    """
+    Rolling latency window (last `window` samples) with percentile snapshot.
+    Thread-safe; record() is called from both the event loop and threadpool.
+    """
+
+    def __init__(self, window: int = 1024):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    @staticmethod
+    def _pick(samples: list, pct: float) -> float:
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+    def percentile(self, pct: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        return self._pick(samples, pct) if samples else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"count": self.count}
+        return {
+            "count": self.count,
+            "avg_ms": round(sum(samples) / len(samples) * 1000, 1),
+            "p50_ms": round(self._pick(samples, 50) * 1000, 1),
+            "p95_ms": round(self._pick(samples, 95) * 1000, 1),
+            "p99_ms": round(self._pick(samples, 99) * 1000, 1),
+            "max_ms": round(samples[-1] * 1000, 1),
+        }
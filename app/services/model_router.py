@@ -0,0 +1,442 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import requests
+
+from app.core.config import settings
+from app.services import http_transport, metrics
+
+# Later candidates in a route must be this much faster (per position) to
+# take traffic from an earlier one: the list order is a quality preference
+PREFERENCE_PENALTY = 0.2
+# An error rate of 0.25 counts like a 2x slower model
+ERROR_PENALTY = 4.0
+LATENCY_WINDOW = 256
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class RouteStats:
+    """
+    One model on one task: EWMA latency and error rate, and a latency
+    window for the hedge delay (p95).
+    """
+    __slots__ = ("ewma_latency", "ewma_errors", "updated_at", "measuring", "latency", "calls", "failures", "hedge_wins", "cancelled")
+
+    def __init__(self):
+        self.ewma_latency: Optional[float] = None
+        self.ewma_errors = 0.0
+        self.updated_at = 0.0
+        self.measuring = False
+        self.latency = metrics.LatencyStats(LATENCY_WINDOW)
+        self.calls = 0
+        self.failures = 0
+        self.hedge_wins = 0
+        self.cancelled = 0
+
+    def stale(self, now: float) -> bool:
+        return now - self.updated_at > settings.ROUTER_STALE_SECONDS
+
+    def touch(self, now: float):
+        # Averages nobody has refreshed in a while describe an endpoint that
+        # may have recovered (or degraded) since: start over
+        if self.stale(now):
+            self.ewma_latency, self.ewma_errors = None, 0.0
+        self.updated_at = now
+        self.measuring = False
+
+    def observe(self, seconds: float, alpha: float):
+        self.ewma_latency = seconds if self.ewma_latency is None else alpha * seconds + (1 - alpha) * self.ewma_latency
+
+    def unknown(self, now: float) -> bool:
+        return self.ewma_latency is None or self.stale(now)
+
+    def score(self, now: float) -> float:
+        # Untried and stale models score 0, so the next call (re)measures
+        # them; the calls after it wait for that measurement
+        if self.unknown(now):
+            return float("inf") if self.measuring else 0.0
+        return self.ewma_latency * (1 + ERROR_PENALTY * self.ewma_errors)
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "ewma_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "error_rate": round(self.ewma_errors, 3),
+            "hedge_wins": self.hedge_wins,
+            "cancelled": self.cancelled,
+            "latency": self.latency.snapshot(),
+        }
+
+
+class CircuitBreaker:
+    """
+    Per model, shared by every task (it's the endpoint that is down):
+    opens after `failures` consecutive failures, lets a single probe
+    through after `cooldown` seconds (half-open) and closes again when the
+    probe succeeds.
+    """
+    __slots__ = ("state", "consecutive", "opened_at", "probing", "trips")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.consecutive = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.trips = 0
+
+    def available(self, now: float) -> bool:
+        if self.state == OPEN and now - self.opened_at >= settings.ROUTER_BREAKER_COOLDOWN:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            return not self.probing
+        return self.state == CLOSED
+
+    def record(self, ok: bool, now: float):
+        self.probing = False
+        if ok:
+            self.state, self.consecutive = CLOSED, 0
+            return
+        self.consecutive += 1
+        if self.state == HALF_OPEN or self.consecutive >= settings.ROUTER_BREAKER_FAILURES:
+            if self.state != OPEN:
+                self.trips += 1
+            self.state, self.opened_at = OPEN, now
+
+
+def parse_routes(spec: str) -> Dict[str, List[str]]:
+    routes = {}
+    for item in spec.split(","):
+        task, _, models = item.strip().partition("=")
+        candidates = [m.strip() for m in models.split("|") if m.strip()]
+        if task and candidates:
+            routes[task.strip()] = list(dict.fromkeys(candidates))
+    return routes
+
+
+def _is_model_failure(error: BaseException) -> bool:
+    # A 4xx (other than 429) is our request's fault and would fail on any
+    # model: it shouldn't trip the breaker or be retried elsewhere
+    response = getattr(error, "response", None)
+    if isinstance(error, (httpx.HTTPStatusError, requests.HTTPError)) and response is not None:
+        return response.status_code >= 500 or response.status_code == 429
+    return True
+
+
+class ModelRouter:
+    """
+    Sends each chat call to the fastest healthy model among its task's
+    candidates (MODEL_ROUTES).
+    - Latency and error rate are tracked per (task, model) as EWMAs;
+      candidates are ranked by latency weighted by error rate, with a
+      small bias towards the route's order.
+    - A call still running past its model's p95 is hedged: the same
+      payload goes to the next candidate and the first answer wins; the
+      other request is cancelled. Hedges are capped at ROUTER_HEDGE_BUDGET
+      of calls so a slow upstream doesn't get double the load.
+    - A failed call fails over to the next candidate straight away.
+    - Per-model circuit breakers take a failing endpoint out of rotation;
+      if every candidate's breaker is open the call goes to the one that
+      opened first rather than failing outright.
+    - Stats not refreshed for ROUTER_STALE_SECONDS are dropped, so a model
+      that lost its traffic while slow gets re-measured.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], RouteStats] = defaultdict(RouteStats)
+        self._breakers: Dict[str, CircuitBreaker] = defaultdict(CircuitBreaker)
+        self._routes_spec = None
+        self._routes: Dict[str, List[str]] = {}
+        self.counters = defaultdict(lambda: {"calls": 0, "hedges": 0, "failovers": 0, "errors": 0, "forced": 0})
+
+    # -- selection -------------------------------------------------------------
+
+    def routes(self) -> Dict[str, List[str]]:
+        # Re-parsed when settings change (tests, benchmarks)
+        if settings.MODEL_ROUTES != self._routes_spec:
+            self._routes = parse_routes(settings.MODEL_ROUTES)
+            self._routes_spec = settings.MODEL_ROUTES
+        return self._routes
+
+    def route(self, task: str, default: str) -> List[str]:
+        """
+        The task's configured models (any of which may answer a call), or
+        just `default` for a task without a route.
+        """
+        if not settings.MODEL_ROUTER_ENABLED:
+            return [default]
+        # "questions:stream" is ranked on its own stats but shares the route
+        return self.routes().get(task.partition(":")[0]) or [default]
+
+    def candidates(self, task: str, default: str) -> List[str]:
+        """
+        The task's models, best first. Models whose breaker is open are
+        left out; a half-open one is included (and claims its probe).
+        """
+        models = self.route(task, default)
+        now = time.monotonic()
+        with self._lock:
+            healthy = [m for m in models if self._breakers[m].available(now)]
+            if not healthy:
+                self.counters[task]["forced"] += 1
+                healthy = [min(models, key=lambda m: self._breakers[m].opened_at)]
+            # A half-open model goes first: its probe decides whether it's back
+            ranked = sorted(
+                healthy,
+                key=lambda m: (
+                    self._breakers[m].state != HALF_OPEN,
+                    self._stats[task, m].score(now) * (1 + PREFERENCE_PENALTY * models.index(m)),
+                ),
+            )
+            for model in ranked[:1]:
+                self._claim(model)
+                if self._stats[task, model].unknown(now):
+                    self._stats[task, model].measuring = True
+        return ranked
+
+    def _claim(self, model: str):
+        breaker = self._breakers[model]
+        if breaker.state == HALF_OPEN:
+            breaker.probing = True
+
+    def hedge_delay(self, task: str, model: str) -> Optional[float]:
+        if not settings.ROUTER_HEDGE_ENABLED:
+            return None
+        latency = self._stats[task, model].latency
+        if latency.count < settings.ROUTER_HEDGE_MIN_SAMPLES:
+            return None
+        return max(settings.ROUTER_HEDGE_MIN_DELAY, latency.percentile(95))
+
+    def _hedge_allowed(self, task: str) -> bool:
+        counts = self.counters[task]
+        return counts["hedges"] < settings.ROUTER_HEDGE_BUDGET * counts["calls"]
+
+    # -- outcomes --------------------------------------------------------------
+
+    def record(self, task: str, model: str, seconds: float, ok: bool):
+        alpha = settings.ROUTER_EWMA_ALPHA
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stats[task, model]
+            stats.touch(now)
+            stats.calls += 1
+            stats.ewma_errors = alpha * (0.0 if ok else 1.0) + (1 - alpha) * stats.ewma_errors
+            if ok:
+                stats.observe(seconds, alpha)
+                stats.latency.record(seconds)
+            else:
+                stats.failures += 1
+            breaker = self._breakers[model]
+            probed = breaker.state == HALF_OPEN
+            breaker.record(ok, now)
+            if probed and ok:
+                # Back in rotation: its outage shouldn't keep weighing on its rank
+                for (_, other), other_stats in self._stats.items():
+                    if other == model:
+                        other_stats.ewma_errors = 0.0
+
+    def record_cancelled(self, task: str, model: str, seconds: float):
+        """
+        The loser of a hedge: it took at least `seconds`. Folded into the
+        EWMA so a slow model drops in the ranking even though it never
+        finished; the breaker and p95 window are left alone.
+        """
+        with self._lock:
+            stats = self._stats[task, model]
+            stats.touch(time.monotonic())
+            stats.cancelled += 1
+            if stats.ewma_latency is None or seconds > stats.ewma_latency:
+                stats.observe(seconds, settings.ROUTER_EWMA_ALPHA)
+        self._release(model)
+
+    def _release(self, model: str):
+        # A probe that ended without a verdict: let the next call probe
+        with self._lock:
+            self._breakers[model].probing = False
+
+    # -- calls -----------------------------------------------------------------
+
+    async def _attempt(self, task: str, model: str, payload: dict, kwargs: dict) -> dict:
+        started = time.perf_counter()
+        try:
+            body = await http_transport.achat_completion({**payload, "model": model}, **kwargs)
+        except asyncio.CancelledError:
+            self.record_cancelled(task, model, time.perf_counter() - started)
+            raise
+        except Exception as e:
+            if _is_model_failure(e):
+                self.record(task, model, time.perf_counter() - started, ok=False)
+            else:
+                self._release(model)
+            raise
+        self.record(task, model, time.perf_counter() - started, ok=True)
+        return body
+
+    async def achat(self, task: str, payload: dict, **kwargs) -> dict:
+        """
+        http_transport.achat_completion, routed. payload["model"] is only
+        used for a task without a route.
+        """
+        if not settings.MODEL_ROUTER_ENABLED:
+            return await http_transport.achat_completion(payload, **kwargs)
+
+        counts = self.counters[task]
+        counts["calls"] += 1
+        remaining = self.candidates(task, payload.get("model"))
+        if len(remaining) > 1:
+            # The next candidate is a better retry than the same model again
+            kwargs.setdefault("retries", 0)
+
+        pending: Dict[asyncio.Task, str] = {}
+        error, hedged = None, False
+
+        def launch():
+            model = remaining.pop(0)
+            if pending or error is not None:
+                with self._lock:
+                    self._claim(model)
+            pending[asyncio.ensure_future(self._attempt(task, model, payload, kwargs))] = model
+            return model
+
+        first = launch()
+        hedge_after = self.hedge_delay(task, first)
+        try:
+            while pending:
+                timeout = hedge_after if remaining and not hedged else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Past p95: hedge once, if the budget allows
+                    hedged = True
+                    if self._hedge_allowed(task):
+                        counts["hedges"] += 1
+                        launch()
+                    continue
+                for finished in done:
+                    model = pending.pop(finished)
+                    if finished.exception() is None:
+                        if hedged and model != first:
+                            with self._lock:
+                                self._stats[task, model].hedge_wins += 1
+                        return finished.result()
+                    error = finished.exception()
+                    if not _is_model_failure(error):
+                        raise error
+                if not pending and remaining:
+                    counts["failovers"] += 1
+                    hedged = True  # no hedging a failover
+                    launch()
+        finally:
+            for other in pending:
+                other.cancel()
+        counts["errors"] += 1
+        raise error
+
+    def chat(self, task: str, payload: dict, **kwargs) -> dict:
+        """
+        http_transport.chat_completion, routed (for the sync paths). Fails
+        over to the next candidate, but doesn't hedge: that would take a
+        second worker thread per call.
+        """
+        if not settings.MODEL_ROUTER_ENABLED:
+            return http_transport.chat_completion(payload, **kwargs)
+
+        counts = self.counters[task]
+        counts["calls"] += 1
+        candidates = self.candidates(task, payload.get("model"))
+        if len(candidates) > 1:
+            kwargs.setdefault("retries", 0)
+        error = None
+        for position, model in enumerate(candidates):
+            if position:
+                counts["failovers"] += 1
+                with self._lock:
+                    self._claim(model)
+            started = time.perf_counter()
+            try:
+                body = http_transport.chat_completion({**payload, "model": model}, **kwargs)
+            except Exception as e:
+                if not _is_model_failure(e):
+                    self._release(model)
+                    raise
+                self.record(task, model, time.perf_counter() - started, ok=False)
+                error = e
+                continue
+            self.record(task, model, time.perf_counter() - started, ok=True)
+            return body
+        counts["errors"] += 1
+        raise error
+
+    async def astream(self, task: str, payload: dict) -> AsyncIterator[str]:
+        """
+        http_transport.astream_chat_completion, routed. Latency is time to
+        the first delta, tracked apart from the task's non-streamed calls.
+        Fails over only if nothing has been yielded yet.
+        """
+        if not settings.MODEL_ROUTER_ENABLED:
+            async with aclosing(http_transport.astream_chat_completion(payload)) as deltas:
+                async for delta in deltas:
+                    yield delta
+            return
+
+        stream_task = f"{task}:stream"
+        counts = self.counters[stream_task]
+        counts["calls"] += 1
+        candidates = self.candidates(stream_task, payload.get("model"))
+        for position, model in enumerate(candidates):
+            if position:
+                counts["failovers"] += 1
+                with self._lock:
+                    self._claim(model)
+            started = time.perf_counter()
+            first = True
+            try:
+                async with aclosing(http_transport.astream_chat_completion({**payload, "model": model})) as deltas:
+                    async for delta in deltas:
+                        if first:
+                            self.record(stream_task, model, time.perf_counter() - started, ok=True)
+                            first = False
+                        yield delta
+            except Exception as e:
+                if not first:
+                    raise
+                if not _is_model_failure(e):
+                    self._release(model)
+                    raise
+                self.record(stream_task, model, time.perf_counter() - started, ok=False)
+                if position == len(candidates) - 1:
+                    counts["errors"] += 1
+                    raise
+                continue
+            if first:
+                # Ended without content: counts as an answer, not a failure
+                self.record(stream_task, model, time.perf_counter() - started, ok=True)
+            return
+
+    def stats(self) -> dict:
+        with self._lock:
+            tasks = defaultdict(dict)
+            for (task, model), stats in self._stats.items():
+                tasks[task][model] = stats.snapshot()
+            return {
+                "enabled": settings.MODEL_ROUTER_ENABLED,
+                "routes": self.routes(),
+                "tasks": {
+                    task: {**self.counters[task], "models": models}
+                    for task, models in sorted(tasks.items())
+                },
+                "breakers": {
+                    model: {"state": b.state, "consecutive_failures": b.consecutive, "trips": b.trips}
+                    for model, b in self._breakers.items()
+                },
+            }
+
+
+model_router = ModelRouter()
+metrics.register("model_router", model_router.stats)
@@ -0,0 +1,318 @@
+import json
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+if sys.platform != "win32":
+    import fcntl
+else:
+    fcntl = None
+
+from app.core.config import settings
+from app.services import metrics
+from app.services.skills_extractor import skills_dictionary
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# float32, not float16: NumPy has no BLAS path for float16 and converting
+# the bank on every lookup costs ~10x the product itself. 1 KB per question.
+DIM = 256
+VECTOR_DTYPE = np.float32
+# Feature weights: a shared skill tag says more than a shared word
+TAG_WEIGHT = 3.0
+WORD_WEIGHT = 1.0
+# Candidates considered for diversification, and its relevance/novelty trade-off
+CANDIDATES = 64
+MMR_LAMBDA = 0.7
+# A new question this close to a banked one is a duplicate
+DUPLICATE_SIMILARITY = 0.95
+PROFILE_TOP_SKILLS = 8
+# Shorter entity names ("HP", "GE") would match too much by accident
+ENTITY_MIN_CHARS = 3
+
+_LEGAL_SUFFIX = re.compile(
+    r"[\s,.]+(inc|llc|ltd|limited|corp|corporation|co|gmbh|plc|pvt|private|technologies|solutions)\.?$"
+)
+_INSTITUTION_WORDS = re.compile(r"^(the )?(university|college|institute) of |\s(university|college|institute|school)$")
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#./-]*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can could describe did do does explain for from have how i if in into is it its "
+    "me of on or tell that the their there this to was we what when where which while who why will with would "
+    "you your about experience".split()
+)
+
+
+def _bucket(feature: str) -> tuple:
+    # crc32, not hash(): vectors on disk must mean the same in every process
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % DIM, 1.0 if (h >> 16) & 1 else -1.0
+
+
+def embed(words: List[str], tags: List[str]) -> np.ndarray:
+    """
+    Hashed bag of words + skill tags, L2-normalised.
+    """
+    vector = np.zeros(DIM, dtype=np.float32)
+    for word in words:
+        index, sign = _bucket(f"w:{word}")
+        vector[index] += sign * WORD_WEIGHT
+    for tag in tags:
+        index, sign = _bucket(f"t:{tag.lower()}")
+        vector[index] += sign * TAG_WEIGHT
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def words_of(text: str) -> List[str]:
+    return [w.strip(".") for w in _WORD.findall(text.lower()) if w.strip(".") not in _STOPWORDS]
+
+
+def question_tags(question: str) -> List[str]:
+    return list(dict.fromkeys(skills_dictionary.find(question)))
+
+
+def profile_skills(clean_data: dict) -> List[str]:
+    skills = []
+    for skill in clean_data.get("skills", []):
+        if isinstance(skill, str):
+            skills.append(skills_dictionary.canonical(skill) or skill.strip())
+    return list(dict.fromkeys(s for s in skills if s))[:PROFILE_TOP_SKILLS]
+
+
+def resume_entities(clean_data: dict) -> List[str]:
+    """
+    Lowercased company, institution and project names from a parsed
+    resume, each also without a trailing location, legal suffix or
+    "University" ("Acme Corp, Pune" -> "acme corp, pune", "acme";
+    "Stanford University" -> "stanford").
+    """
+    names = []
+    for section, fields in (("experience", ("company",)), ("education", ("institution",)), ("projects", ("name", "title"))):
+        for entry in (clean_data or {}).get(section, []) or []:
+            if isinstance(entry, dict):
+                names += [entry.get(f) for f in fields]
+    entities = set()
+    for name in names:
+        if not isinstance(name, str) or name.strip().upper() in ("NA", "N/A"):
+            continue
+        name = " ".join(name.lower().split())
+        base = _LEGAL_SUFFIX.sub("", re.split(r"[,(|]", name)[0]).strip()
+        short = _INSTITUTION_WORDS.sub("", base).strip()
+        entities.update(n for n in (name, base, short) if len(n) >= ENTITY_MIN_CHARS)
+    return sorted(entities)
+
+
+def mentions_any(question: str, entities: List[str]) -> bool:
+    text = " ".join(question.lower().split())
+    return any(re.search(rf"(?<![a-z0-9]){re.escape(e)}(?![a-z0-9])", text) for e in entities)
+
+
+def embed_profile(clean_data: dict) -> np.ndarray:
+    skills = profile_skills(clean_data)
+    words = [w for s in skills for w in words_of(s)]
+    for entry in clean_data.get("experience", []):
+        if isinstance(entry, dict):
+            words += words_of(str(entry.get("title", "")))
+    return embed(words, skills)
+
+
+class QuestionBank:
+    """
+    Interview questions from earlier generations, with skill tags and
+    hashed bag-of-words embeddings, so a resume whose skills are already
+    well covered gets its questions without a model call.
+    - Stored as questions.jsonl (text + tags) and vectors.f32, a float32
+      [n, DIM] array read through np.memmap (so workers share the OS page
+      cache instead of each loading a copy); both are append-only.
+    - lookup() scores every banked question against the resume profile in
+      one matrix-vector product, then picks N by maximal marginal relevance
+      so they don't all ask about the same skill.
+    - Other workers' appends are picked up on the next lookup.
+    """
+
+    def __init__(self, directory: str):
+        self.dir = Path(directory) if Path(directory).is_absolute() else BASE_DIR / directory
+        self.questions_path = self.dir / "questions.jsonl"
+        self.vectors_path = self.dir / "vectors.f32"
+        self._questions: List[dict] = []
+        self._seen = set()
+        self._vectors = np.zeros((0, DIM), dtype=VECTOR_DTYPE)
+        self._jsonl_offset = 0
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.lookup_time = metrics.LatencyStats()
+
+    # -- storage ---------------------------------------------------------------
+
+    def _refresh(self):
+        """
+        Reads questions appended since the last call (by this or another
+        process) and remaps the vectors. Rows are only visible once both
+        their line and their vector are on disk.
+        """
+        if not self.questions_path.exists() or not self.vectors_path.exists():
+            return
+        if self.questions_path.stat().st_size > self._jsonl_offset:
+            with open(self.questions_path, "rb") as f:
+                f.seek(self._jsonl_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # still being written
+                    self._jsonl_offset += len(line)
+                    record = json.loads(line)
+                    self._questions.append(record)
+                    self._seen.add(_key(record["q"]))
+
+        rows = min(len(self._questions), self.vectors_path.stat().st_size // (DIM * np.dtype(VECTOR_DTYPE).itemsize))
+        if rows != len(self._vectors):
+            self._vectors = np.memmap(self.vectors_path, dtype=VECTOR_DTYPE, mode="r", shape=(rows, DIM)) if rows else self._vectors[:0]
+
+    def add(self, questions: List[str], source: Optional[dict] = None) -> int:
+        """
+        Banks questions from a successful generation. Questions naming one
+        of the source resume's companies, schools or projects are skipped:
+        they'd be served to other candidates. So are exact repeats and
+        near-duplicates of banked questions. Returns how many were added.
+        """
+        if not settings.QUESTION_BANK_ENABLED or not questions:
+            return 0
+        entities = resume_entities(source)
+        with self._lock:
+            self._refresh()
+            records, vectors = [], []
+            for question in questions:
+                if entities and mentions_any(question, entities):
+                    self.counters["personal"] += 1
+                    continue
+                key = _key(question)
+                if key in self._seen:
+                    self.counters["duplicates"] += 1
+                    continue
+                tags = question_tags(question)
+                vector = embed(words_of(question), tags)
+                if len(self._vectors) and float(np.max(score(self._vectors, vector))) >= DUPLICATE_SIMILARITY:
+                    self.counters["duplicates"] += 1
+                    continue
+                self._seen.add(key)
+                records.append({"q": question, "tags": tags, "at": time.time()})
+                vectors.append(vector.astype(VECTOR_DTYPE))
+            if not records:
+                return 0
+
+            self.dir.mkdir(parents=True, exist_ok=True)
+            # Line first, vector second: a reader never sees a vector without
+            # its text. The file lock keeps rows of concurrent workers aligned.
+            with open(self.questions_path, "ab") as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                f.write(b"".join(json.dumps(r).encode("utf-8") + b"\n" for r in records))
+                f.flush()
+                with open(self.vectors_path, "ab") as v:
+                    v.write(np.stack(vectors).tobytes())
+            self._refresh()
+        self.counters["added"] += len(records)
+        return len(records)
+
+    # -- retrieval -------------------------------------------------------------
+
+    def lookup(self, clean_data: dict, num_questions: int) -> Optional[List[str]]:
+        """
+        num_questions banked questions for this resume, or None when the
+        bank doesn't cover it well enough (the caller generates instead):
+        fewer than num_questions relevant questions, or less than
+        QUESTION_BANK_MIN_COVERAGE of the resume's top skills asked about.
+        """
+        if not settings.QUESTION_BANK_ENABLED:
+            return None
+        started = time.perf_counter()
+        try:
+            return self._lookup(clean_data, num_questions)
+        except Exception as e:
+            # A broken bank must never block generation
+            print(f"[QuestionBank] Lookup failed: {e}")
+            self.counters["errors"] += 1
+            return None
+        finally:
+            self.lookup_time.record(time.perf_counter() - started)
+
+    def _lookup(self, clean_data: dict, num_questions: int) -> Optional[List[str]]:
+        skills = profile_skills(clean_data)
+        if not skills:
+            self.counters["miss_no_skills"] += 1
+            return None
+        with self._lock:
+            self._refresh()
+            vectors, questions = self._vectors, self._questions
+        if len(vectors) < num_questions:
+            self.counters["miss_too_few"] += 1
+            return None
+
+        profile = embed_profile(clean_data)
+        scores = score(vectors, profile)
+        k = min(CANDIDATES, len(scores))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[scores[candidates] >= settings.QUESTION_BANK_MIN_SCORE]
+        if len(candidates) < num_questions:
+            self.counters["miss_too_few"] += 1
+            return None
+
+        chosen = _mmr(np.asarray(vectors[candidates], dtype=np.float32), scores[candidates], num_questions)
+        picked = [int(candidates[i]) for i in chosen]
+
+        wanted = {s.lower() for s in skills}
+        covered = {t.lower() for i in picked for t in questions[i]["tags"]} & wanted
+        if len(covered) < settings.QUESTION_BANK_MIN_COVERAGE * len(wanted):
+            self.counters["miss_low_coverage"] += 1
+            return None
+        self.counters["hits"] += 1
+        return [questions[i]["q"] for i in picked]
+
+    def stats(self) -> dict:
+        hits = self.counters["hits"]
+        misses = sum(v for k, v in self.counters.items() if k.startswith("miss_"))
+        return {
+            "enabled": settings.QUESTION_BANK_ENABLED,
+            "size": len(self._questions),
+            **self.counters,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0,
+            "lookup_time": self.lookup_time.snapshot(),
+        }
+
+
+def score(vectors: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity of every row to query (all rows are unit length).
+    """
+    return np.asarray(vectors @ query, dtype=np.float32)
+
+
+def _key(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def _mmr(vectors: np.ndarray, scores: np.ndarray, n: int) -> List[int]:
+    """
+    Greedy maximal marginal relevance: each pick trades relevance against
+    similarity to the questions already picked.
+    """
+    chosen = [int(np.argmax(scores))]
+    closest = vectors @ vectors[chosen[0]]
+    while len(chosen) < n:
+        value = MMR_LAMBDA * scores - (1 - MMR_LAMBDA) * closest
+        value[chosen] = -np.inf
+        best = int(np.argmax(value))
+        chosen.append(best)
+        closest = np.maximum(closest, vectors @ vectors[best])
+    return chosen
+
+
+question_bank = QuestionBank(settings.QUESTION_BANK_DIR)
+metrics.register("question_bank", question_bank.stats)
@@ -1,6 +1,11 @@
 import os
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
+from contextlib import aclosing
+from typing import AsyncIterator
+from fastapi.concurrency import run_in_threadpool
+from app.services.model_router import model_router
+from app.services.question_bank import question_bank
+from app.services.singleflight import coalesce
 
 load_dotenv()
 
@@ -8,15 +13,7 @@ API_TOKEN = os.getenv("HF_API_KEY")
 # Using a widely available open model
 MODEL_ID = "mistralai/Mistral-7B-Instruct-v0.2"
 
-def generate_interview_questions(clean_data: dict, model: str = MODEL_ID, num_questions: int = 10):
-    """
-    Generates interview questions based on parsed resume data.
-    Returns a list of questions.
-    """
-    if not API_TOKEN:
-        print("DEBUG: HF_API_KEY is missing!")
-        return []
-
+def _build_payload(clean_data: dict, model: str, num_questions: int) -> dict:
     skills = ", ".join(clean_data.get("skills", [])) or "NA"
 
     experience_text = "; ".join(
@@ -38,7 +35,7 @@ def generate_interview_questions(clean_data: dict, model: str = MODEL_ID, num_qu
     - The questions should be relevant to the candidate's skills, experience, and education.
     - Do Not output fewer than {num_questions}.
     - Each questions must be on its own Line.
-    
+
     Resume Information:
     Skills: {skills}
     Experience: {experience_text}
@@ -50,41 +47,158 @@ def generate_interview_questions(clean_data: dict, model: str = MODEL_ID, num_qu
     - No numbering
     - No extra text
     """
-    
-    client = InferenceClient(token=API_TOKEN)
-    
+
+    messages = [
+        {"role": "system", "content": "You generate interview questions. Output only Plain text Questions."},
+        {"role": "user", "content": prompt}
+    ]
+
+    return {
+        "model": model,
+        "messages": messages,
+        "max_tokens": 500,
+        "temperature": 0.2
+    }
+
+def _is_question(line: str) -> bool:
+    return bool(line.strip()) and "?" in line # basic validation
+
+def _parse_questions(raw_text: str, num_questions: int) -> list[str]:
+    # Safe parsing
+    questions = [
+        line.strip()
+        for line in raw_text.split("\n")
+        if _is_question(line)
+    ]
+
+    # Fallback if parsing failed (e.g. numbered list)
+    if not questions:
+        # simple split by newline
+         questions = [l.strip() for l in raw_text.split("\n") if l.strip()]
+
+    return questions[:num_questions]
+
+def _bank(questions: list[str], clean_data: dict):
+    # The fallback path can return lines that aren't questions: never bank those
+    try:
+        question_bank.add([q for q in questions if _is_question(q)], source=clean_data)
+    except Exception as e:
+        print(f"DEBUG: Question bank append failed: {e}")
+
+def generate_interview_questions(clean_data: dict, model: str = MODEL_ID, num_questions: int = 10):
+    """
+    Generates interview questions based on parsed resume data.
+    Returns a list of questions.
+    Served from the question bank when it covers the resume's skills;
+    generated questions are added to it.
+    """
+    banked = question_bank.lookup(clean_data, num_questions)
+    if banked:
+        return banked
+
+    if not API_TOKEN:
+        print("DEBUG: HF_API_KEY is missing!")
+        return []
+
     try:
-        messages = [
-            {"role": "system", "content": "You generate interview questions. Output only Plain text Questions."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        # Use simple text generation if chat completion is tricky, but chat is better for instruct models.
-        # client.chat_completion is the way.
-        response = client.chat_completion(
-            messages=messages,
-            model=model,
-            max_tokens=500,
-            temperature=0.2
-        )
-        
-        raw_text = response.choices[0].message.content.strip()
-        
-        # Safe parsing
-        questions = [
-            line.strip()
-            for line in raw_text.split("\n")
-            if line.strip() and "?" in line # basic validation
-        ]
-        
-        # Fallback if parsing failed (e.g. numbered list)
-        if not questions:
-            # simple split by newline
-             questions = [l.strip() for l in raw_text.split("\n") if l.strip()]
-
-        return questions[:num_questions]
+        # Routed to the fastest healthy model, over the shared pooled transport
+        response = model_router.chat("questions", _build_payload(clean_data, model, num_questions))
+
+        raw_text = response["choices"][0]["message"]["content"].strip()
+        questions = _parse_questions(raw_text, num_questions)
+        _bank(questions, clean_data)
+        return questions
 
     except Exception as e:
         print(f"DEBUG: Question Generation Error: {e}")
         # Return empty list so the caller (API) can raise 500
-        return []
\ No newline at end of file
+        return []
+
+@coalesce("generate_questions")
+async def generate_interview_questions_async(clean_data: dict, model: str = MODEL_ID, num_questions: int = 10):
+    """
+    Async version of generate_interview_questions (no threadpool hop
+    for the model call).
+    """
+    # File reads and the bank lock: not on the event loop
+    banked = await run_in_threadpool(question_bank.lookup, clean_data, num_questions)
+    if banked:
+        return banked
+
+    if not API_TOKEN:
+        print("DEBUG: HF_API_KEY is missing!")
+        return []
+
+    try:
+        response = await model_router.achat("questions", _build_payload(clean_data, model, num_questions))
+
+        raw_text = response["choices"][0]["message"]["content"].strip()
+        questions = _parse_questions(raw_text, num_questions)
+        await run_in_threadpool(_bank, questions, clean_data)
+        return questions
+
+    except Exception as e:
+        print(f"DEBUG: Question Generation Error: {e}")
+        return []
+
+async def stream_interview_questions(clean_data: dict, model: str = MODEL_ID, num_questions: int = 10) -> AsyncIterator[str]:
+    """
+    Streams the chat completion and yields each question as soon as its line
+    is complete and passes validation, so callers can start TTS on Q1 while
+    the model is still writing Q2..Q10.
+    Applies the same fallback as _parse_questions if no line looks like a question.
+    Raises if the stream fails after some questions were yielded.
+    A bank hit yields the banked questions at once; a completed stream's
+    questions are added to the bank.
+    """
+    banked = await run_in_threadpool(question_bank.lookup, clean_data, num_questions)
+    if banked:
+        for question in banked:
+            yield question
+        return
+
+    if not API_TOKEN:
+        print("DEBUG: HF_API_KEY is missing!")
+        return
+
+    generated = []
+    async with aclosing(_stream_questions(clean_data, model, num_questions)) as stream:
+        async for question in stream:
+            generated.append(question)
+            yield question
+    # Only a full set: a stream cut short by an error isn't a good generation
+    if len(generated) >= num_questions:
+        await run_in_threadpool(_bank, generated, clean_data)
+
+async def _stream_questions(clean_data: dict, model: str, num_questions: int) -> AsyncIterator[str]:
+    buffer, other_lines, yielded = "", [], 0
+    try:
+        # aclosing: stopping at num_questions must also close the HTTP stream
+        async with aclosing(model_router.astream("questions", _build_payload(clean_data, model, num_questions))) as deltas:
+            async for delta in deltas:
+                buffer += delta
+                *lines, buffer = buffer.split("\n")
+                for line in lines:
+                    if _is_question(line):
+                        yield line.strip()
+                        yielded += 1
+                        if yielded >= num_questions:
+                            return
+                    elif line.strip():
+                        other_lines.append(line.strip())
+    except Exception as e:
+        print(f"DEBUG: Question Streaming Error: {e}")
+        if yielded:
+            # The caller already has part of a set: let it start over
+            raise
+        buffer = ""
+
+    if _is_question(buffer) and yielded < num_questions:
+        yield buffer.strip()
+        yielded += 1
+    elif buffer.strip():
+        other_lines.append(buffer.strip())
+
+    if not yielded:
+        for line in other_lines[:num_questions]:
+            yield line
@@ -1,16 +1,21 @@
-import requests
 import json
 import os
 import re
 from dotenv import load_dotenv
-###from app.json_utils import parse_kv_to_json,safe_json_parse  
+from app.json_utils import repair_json, record_strategy, JSONRepairError
+from app.core.config import settings
+from app.services import resume_compact, skills_extractor
+from app.services.model_router import model_router
+from app.services.singleflight import coalesce
 load_dotenv()
 
 API_TOKEN = os.getenv("HF_API_KEY")  # set env variable
 
-HF_URL = "https://router.huggingface.co/v1/chat/completions"
+MODEL_ID = "Qwen/Qwen2.5-7B-Instruct"
+# Bump whenever the parsing prompt changes so cached ATS JSON is invalidated.
+PROMPT_VERSION = "3"
 
-def fix_json_with_llm(broken_json: str):
+def _repair_payload(broken_json: str) -> dict:
     repair_prompt = f"""
 You are a JSON repair engine.
 
@@ -25,8 +30,8 @@ Broken JSON:
 {broken_json}
 """
 
-    payload = {
-        "model": "Qwen/Qwen2.5-7B-Instruct",
+    return {
+        "model": MODEL_ID,
         "messages": [
             {"role": "system", "content": "You fix invalid JSON."},
             {"role": "user", "content": repair_prompt}
@@ -35,17 +40,37 @@ Broken JSON:
         "max_tokens": 1200
     }
 
-    headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
-        "Content-Type": "application/json"
-    }
+def fix_json_with_llm(broken_json: str):
+    # Pooled keep-alive session with timeouts + retries
+    response = model_router.chat("resume_parse", _repair_payload(broken_json))
 
-    response = requests.post(HF_URL, headers=headers, json=payload)
-    response.raise_for_status()
+    return response["choices"][0]["message"]["content"]
 
-    return response.json()["choices"][0]["message"]["content"]
+async def fix_json_with_llm_async(broken_json: str):
+    response = await model_router.achat("resume_parse", _repair_payload(broken_json))
 
-def convert_resume_to_json(text: str):
+    return response["choices"][0]["message"]["content"]
+
+def _detected_skills(text: str) -> list:
+    return skills_extractor.extract_skills(text) if settings.SKILLS_PREFILL else []
+
+def _skills_hint(detected: list) -> str:
+    # Pre-fill from the local extractor: the model checks and extends the
+    # list instead of finding every skill itself
+    if not detected:
+        return ""
+    return f"""
+Skills already detected in the resume (keep the correct ones, add any that are missing):
+{", ".join(detected)}
+"""
+
+def _with_skills(parsed, detected: list):
+    # Model returned no skills at all: fall back to the local ones
+    if isinstance(parsed, dict) and detected and not parsed.get("skills"):
+        parsed["skills"] = list(detected)
+    return parsed
+
+def _parse_payload(text: str, detected: list = ()) -> dict:
     prompt = f"""
 You are an ATS resume parser.
 
@@ -85,13 +110,13 @@ Rules:
 - If a value is missing, use "NA"
 - Do NOT add extra fields
 - Do NOT return text outside JSON
-
+{_skills_hint(detected)}
 Resume:
-{text}
+{resume_compact.prepare_for_llm(text)}
 """
 
-    payload = {
-        "model": "Qwen/Qwen2.5-7B-Instruct",
+    return {
+        "model": MODEL_ID,
         "messages": [
             {
                 "role": "system",
@@ -106,18 +131,146 @@ Resume:
         "max_tokens": 1200
     }
 
-    headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
-        "Content-Type": "application/json"
-    }
-
-    response = requests.post(HF_URL, headers=headers, json=payload)
-    response.raise_for_status()
+def _local_parse(raw_text: str):
+    """
+    Tries the local repair pipeline; None means only the LLM can fix it.
+    """
+    try:
+        return repair_json(raw_text)[0]
+    except JSONRepairError:
+        record_strategy("failed")
+        return None
 
-    raw_text = response.json()["choices"][0]["message"]["content"]
+def _parse_fixed(fixed: str):
+    record_strategy("llm")
     try:
-        return json.loads(raw_text)
-    except json.JSONDecodeError:
-        fixed = fix_json_with_llm(raw_text)
+        return repair_json(fixed)[0]
+    except JSONRepairError:
         return json.loads(fixed)
+
+def convert_resume_to_json(text: str):
+    detected = _detected_skills(text)
+    response = model_router.chat("resume_parse", _parse_payload(text, detected))
+
+    raw_text = response["choices"][0]["message"]["content"]
+    parsed = _local_parse(raw_text)
+    if parsed is not None:
+        return _with_skills(parsed, detected)
+    # Second 1200-token round trip only when local repair gave up
+    return _with_skills(_parse_fixed(fix_json_with_llm(raw_text)), detected)
+
+@coalesce("resume_parse", model=lambda: MODEL_ID)
+async def convert_resume_to_json_async(text: str):
+    """
+    Async version of convert_resume_to_json; awaits the model instead of
+    holding a threadpool worker for the whole round trip.
+    """
+    detected = _detected_skills(text)
+    response = await model_router.achat("resume_parse", _parse_payload(text, detected))
+
+    raw_text = response["choices"][0]["message"]["content"]
+    parsed = _local_parse(raw_text)
+    if parsed is not None:
+        return _with_skills(parsed, detected)
+    return _with_skills(_parse_fixed(await fix_json_with_llm_async(raw_text)), detected)
     
+
+def _combined_payload(text: str, num_questions: int, detected: list = ()) -> dict:
+    prompt = f"""
+You are an ATS resume parser and an expert technical interviewer.
+
+1. Extract ONLY the Skills, Experience and Education sections from the resume.
+2. Write Exactly {num_questions} clear, professional interview questions relevant
+   to the candidate's skills, experience and education.
+
+Return STRICTLY valid JSON.
+The JSON MUST be parsable by json.loads().
+Do NOT include markdown, comments, or explanations.
+
+Output format MUST be exactly:
+
+{{
+  "skills": ["skill1", "skill2", "..."],
+  "experience": [
+    {{
+      "title": "NA",
+      "company": "NA",
+      "description": "NA"
+    }}
+  ],
+  "education": [
+    {{
+      "degree": "NA",
+      "institution": "NA"
+    }}
+  ],
+  "questions": ["question 1?", "question 2?", "..."]
+}}
+
+Rules:
+- Extract ALL experience entries (do NOT merge them)
+- Extract ALL education entries
+- Skills must be deduplicated
+- Preserve original wording
+- If a value is missing, use "NA"
+- "questions" must contain exactly {num_questions} strings, one question each, no numbering
+- Do NOT add extra fields
+- Do NOT return text outside JSON
+{_skills_hint(detected)}
+Resume:
+{resume_compact.prepare_for_llm(text)}
+"""
+
+    return {
+        "model": MODEL_ID,
+        "messages": [
+            {
+                "role": "system",
+                "content": "You parse resumes and write interview questions. Return ONLY valid JSON. No markdown. No explanation."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "temperature": 0.1,
+        "max_tokens": 1700
+    }
+
+def _validate_combined(data, num_questions: int):
+    """
+    Checks the single-call response against the combined schema.
+    Raises ValueError so the caller can fall back to the two-call path.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Combined response is not a JSON object")
+    for key in ("skills", "experience", "education", "questions"):
+        if not isinstance(data.get(key), list):
+            raise ValueError(f"Combined response field '{key}' missing or not a list")
+
+    questions = [q.strip() for q in data["questions"] if isinstance(q, str) and "?" in q]
+    if not questions:
+        raise ValueError("Combined response has no usable questions")
+
+    parsed = {
+        "skills": data["skills"],
+        "experience": [e for e in data["experience"] if isinstance(e, dict)],
+        "education": [e for e in data["education"] if isinstance(e, dict)],
+    }
+    return parsed, questions[:num_questions]
+
+@coalesce("parse_and_generate", model=lambda: MODEL_ID)
+async def parse_and_generate_async(text: str, num_questions: int = 10):
+    """
+    Single round trip: structured resume + interview questions from one prompt.
+    Returns (parsed_resume, questions); raises ValueError if the response
+    doesn't validate. Never calls fix_json_with_llm, the two-call path is
+    the fallback instead.
+    """
+    detected = _detected_skills(text)
+    response = await model_router.achat("resume_parse", _combined_payload(text, num_questions, detected))
+
+    raw_text = response["choices"][0]["message"]["content"]
+    data = _local_parse(raw_text)
+    parsed, questions = _validate_combined(data, num_questions)
+    return _with_skills(parsed, detected), questions
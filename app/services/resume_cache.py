@@ -0,0 +1,196 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services import metrics, resume_ai, resume_parser
+from app.services.model_router import model_router
+from app.services.upload_ingest import IngestedUpload
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+class ResumeCache:
+    """
+    Two-level cache for resume extraction results.
+    An in-process LRU sits in front of a SQLite store that is bounded by
+    total bytes (least-recently-used rows go first) and by entry age.
+    get()/set() block on SQLite; async code uses aget()/aset().
+    """
+
+    def __init__(self, path: str, memory_items: int, max_bytes: int, max_age: int):
+        self.path = Path(path) if Path(path).is_absolute() else BASE_DIR / path
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # key -> (created_at, value): memory entries age out like rows do
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key: str, value: Any, created_at: float):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _get_memory(self, key: str, now: float) -> Optional[Any]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if now - entry[0] > self.max_age:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        self.counters["memory_hits"] += 1
+        return entry[1]
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            now = time.time()
+            value = self._get_memory(key, now)
+            if value is not None:
+                return value
+
+            db = self._db()
+            row = db.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                if row is not None:
+                    db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    db.commit()
+                self.counters["misses"] += 1
+                return None
+
+            db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            db.commit()
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            self.counters["disk_hits"] += 1
+            return value
+
+    def set(self, key: str, value: Any):
+        encoded = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now, now),
+            )
+            self._evict(db, now)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        cutoff = now - self.max_age
+        expired = db.execute("DELETE FROM entries WHERE created_at < ?", (cutoff,)).rowcount
+        self.counters["evictions"] += max(expired, 0)
+        for key in [k for k, (created_at, _) in self._memory.items() if created_at < cutoff]:
+            del self._memory[key]
+
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            total -= size
+            self.counters["evictions"] += 1
+
+    async def aget(self, key: str) -> Optional[Any]:
+        # Memory hits don't need the threadpool hop
+        with self._lock:
+            value = self._get_memory(key, time.time())
+        if value is not None:
+            return value
+        return await run_in_threadpool(self.get, key)
+
+    async def aset(self, key: str, value: Any):
+        await run_in_threadpool(self.set, key, value)
+
+    def stats(self) -> dict:
+        lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+        hits = lookups - self.counters["misses"]
+        return {
+            **self.counters,
+            "memory_items": len(self._memory),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+resume_cache = ResumeCache(
+    settings.RESUME_CACHE_PATH,
+    settings.RESUME_CACHE_MEMORY_ITEMS,
+    settings.RESUME_CACHE_MAX_BYTES,
+    settings.RESUME_CACHE_MAX_AGE,
+)
+metrics.register("resume_cache", resume_cache.stats)
+
+
+def text_key(digest: str) -> str:
+    # Versioned: text cached in an older format mustn't be served
+    return f"text:{digest}:{resume_parser.EXTRACT_VERSION}"
+
+
+def ats_key(digest: str) -> str:
+    # The parsed JSON depends on the models and the prompt, not just the file.
+    # Any model on the route may answer, so the key is the route.
+    models = "|".join(model_router.route("resume_parse", resume_ai.MODEL_ID))
+    return f"ats:{digest}:{models}:{resume_ai.PROMPT_VERSION}"
+
+
+async def get_resume_text(upload: IngestedUpload) -> str:
+    """
+    Returns the extracted resume text, extracting only on a cache miss.
+    Text from an extraction that skipped pages is returned but not cached
+    (resume_parser.is_partial), nor is anything parsed from it.
+    """
+    text = await resume_cache.aget(text_key(upload.sha256))
+    if text is None:
+        text = await resume_parser.extract_resume_text_async(upload.filename, upload.source())
+        if text and not resume_parser.is_partial(text):
+            await resume_cache.aset(text_key(upload.sha256), text)
+    return text
+
+
+async def get_parsed_resume(upload: IngestedUpload) -> dict:
+    """
+    Returns the ATS JSON for an uploaded resume.
+    On a hit both the PDF extraction and the LLM call are skipped.
+    """
+    parsed = await resume_cache.aget(ats_key(upload.sha256))
+    if parsed is not None:
+        return parsed
+
+    text = await get_resume_text(upload)
+    if not text or not text.strip():
+        raise ValueError("No text extracted from resume")
+
+    parsed = await resume_ai.convert_resume_to_json_async(text)
+    if isinstance(parsed, dict) and not resume_parser.is_partial(text):
+        await resume_cache.aset(ats_key(upload.sha256), parsed)
+    return parsed
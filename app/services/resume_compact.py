@@ -0,0 +1,303 @@
+import re
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services import metrics
+
+# resume_parser joins PDF pages with a form feed, so boilerplate repeated on
+# every page can be recognised here. DOCX text is a single "page".
+PAGE_BREAK = "\f"
+
+# Rough tokens-per-character for English resume text on the Qwen/Mistral
+# tokenizers; only used for budgeting, the model reports the real count.
+CHARS_PER_TOKEN = 4
+
+# Section heading -> canonical section. Headings not listed here don't start
+# a new section (they stay part of the one they're in).
+SECTION_HEADINGS = {
+    "skills": (
+        "skills", "technical skills", "key skills", "core skills", "skill set", "skillset",
+        "core competencies", "competencies", "technologies", "tech stack", "tools",
+        "tools and technologies", "technical proficiency",
+    ),
+    "experience": (
+        "experience", "work experience", "professional experience", "employment",
+        "employment history", "work history", "career history", "internships", "internship",
+        "relevant experience",
+    ),
+    "projects": ("projects", "personal projects", "academic projects", "key projects", "selected projects"),
+    "education": (
+        "education", "academic background", "academics", "qualifications",
+        "educational qualifications", "academic qualifications", "education and training",
+    ),
+    "certifications": ("certifications", "certificates", "licenses and certifications", "courses", "training"),
+    "summary": ("summary", "professional summary", "profile", "objective", "career objective", "about me"),
+    "other": (
+        "achievements", "awards", "honors", "honours", "publications", "languages",
+        "interests", "hobbies", "extracurricular activities", "activities", "volunteering",
+        "references", "declaration", "personal details", "personal information", "contact",
+    ),
+}
+_HEADING_LOOKUP = {h: section for section, headings in SECTION_HEADINGS.items() for h in headings}
+
+# When the budget is tight, a tier only gets what the tiers before it left
+# over; sections within a tier share it evenly. The first tier is what the
+# parser prompt asks for. "header" is the text before the first heading,
+# "other" is never sent.
+SECTION_TIERS = (
+    ("skills", "experience", "education"),
+    ("projects", "certifications"),
+    ("summary", "header"),
+)
+
+_PAGE_NUMBER = re.compile(r"^(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?$", re.IGNORECASE)
+_PAGE_SUFFIX = re.compile(r"\s*(page\s*)?#(\s*(of|/)\s*#)?$")
+_FIELD_SEPARATOR = re.compile(r"\s*[|•·]\s*")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+_PHONE = re.compile(r"(\+?\d[\d\s().-]{7,}\d)")
+_URL = re.compile(r"(https?://|www\.)\S+|\b(linkedin|github)\.com/\S*", re.IGNORECASE)
+_CONTACT_LABEL = re.compile(r"^(e-?mail|phone|mobile|tel|address|linkedin|github|portfolio)\s*[:|]", re.IGNORECASE)
+_DIGITS = re.compile(r"\d+")
+_BULLETS = "•●▪■◦‣∙·*-–—"
+
+_counters = {"documents": 0, "tokens_before": 0, "tokens_after": 0, "boilerplate_lines": 0,
+             "contact_lines": 0, "sections_dropped": 0, "truncated": 0, "no_sections": 0}
+_latency = metrics.LatencyStats()
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class CompactedResume:
+    __slots__ = ("text", "tokens_before", "tokens_after", "sections", "dropped", "truncated")
+
+    def __init__(self, text: str, tokens_before: int, tokens_after: int,
+                 sections: List[str], dropped: List[str], truncated: bool):
+        self.text = text
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.sections = sections
+        self.dropped = dropped
+        self.truncated = truncated
+
+
+def normalize_line(line: str) -> str:
+    line = unicodedata.normalize("NFKC", line)
+    line = " ".join(line.split())
+    # One bullet style; pdfplumber keeps whatever glyph the template used
+    if line and line[0] in _BULLETS and len(line) > 1 and (line[1] == " " or line[0] not in "*-"):
+        line = "- " + line[1:].lstrip()
+    return line
+
+
+def _signature(line: str) -> str:
+    # "Name - Page 1 of 2", "Name - Page 2 of 2" and "Name" are the same footer
+    return _PAGE_SUFFIX.sub("", _DIGITS.sub("#", line.lower()))
+
+
+def repeated_lines(pages: List[List[str]], edge: int = 3) -> set:
+    """
+    Signatures of lines that open or close most pages: running headers,
+    footers, the name/contact line some templates repeat.
+    """
+    if len(pages) < 2:
+        return set()
+    seen = Counter()
+    for lines in pages:
+        seen.update({_signature(l) for l in lines[:edge] + lines[-edge:] if l})
+    threshold = max(2, (len(pages) + 1) // 2)
+    return {sig for sig, count in seen.items() if count >= threshold}
+
+
+def _drop_phone(match: re.Match) -> str:
+    # "2019 - 2021" has too few digits to be a phone number
+    return "" if sum(c.isdigit() for c in match.group(0)) >= 9 else match.group(0)
+
+
+def is_contact(text: str) -> bool:
+    if _CONTACT_LABEL.match(text):
+        return True
+    stripped = _URL.sub("", _PHONE.sub(_drop_phone, _EMAIL.sub("", text)))
+    # Mostly email/phone/links once those are taken out
+    return stripped != text and len(stripped.strip(" |,;·•-/")) < len(text) * 0.3
+
+
+def strip_contact(line: str) -> str:
+    """
+    The line without contact details; "" if that's all it was. Fields of
+    a "Name | Title | email | phone" line are judged one by one.
+    """
+    fields = _FIELD_SEPARATOR.split(line)
+    if len(fields) == 1:
+        return "" if is_contact(line) else line
+    kept = [f for f in fields if f and not is_contact(f)]
+    return " | ".join(kept) if len(kept) < len(fields) else line
+
+
+def heading_section(line: str) -> Optional[str]:
+    candidate = line.strip(" :-_|#*").lower()
+    if not candidate or len(candidate) > 40 or len(candidate.split()) > 5:
+        return None
+    candidate = candidate.replace("&", "and")
+    # "Skills and Tools", "Experience and Internships"
+    return _HEADING_LOOKUP.get(candidate) or _HEADING_LOOKUP.get(candidate.split(" and ")[0])
+
+
+def split_sections(lines: List[str]) -> List[Tuple[str, List[str]]]:
+    """
+    (section, lines) blocks in document order, each starting with its
+    heading; text before the first heading is the "header" block.
+    """
+    sections: List[Tuple[str, List[str]]] = [("header", [])]
+    for line in lines:
+        section = heading_section(line)
+        if section is not None:
+            sections.append((section, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, body) for name, body in sections if body]
+
+
+def _cost(lines: List[str]) -> int:
+    return sum(estimate_tokens(line) + 1 for line in lines)
+
+
+def _fit(lines: List[str], budget: int) -> List[str]:
+    kept, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return kept
+
+
+def _shares(sizes: List[int], budget: int) -> List[int]:
+    """
+    Splits budget so small sections are kept whole and the large ones
+    share the rest equally (water-filling).
+    """
+    caps = [0] * len(sizes)
+    remaining = budget
+    order = sorted(range(len(sizes)), key=sizes.__getitem__)
+    for k, i in enumerate(order):
+        caps[i] = min(sizes[i], remaining // (len(order) - k))
+        remaining -= caps[i]
+    return caps
+
+
+def clean_lines(text: str) -> Tuple[List[str], int, int]:
+    """
+    Normalised non-empty lines without page numbers, per-page boilerplate
+    and contact details. Returns (lines, boilerplate removed, contact removed).
+    """
+    pages = [
+        [normalize_line(l) for l in page.splitlines()]
+        for page in text.split(PAGE_BREAK)
+    ]
+    boilerplate = repeated_lines([[l for l in page if l] for page in pages])
+
+    lines, removed_boilerplate, removed_contact = [], 0, 0
+    for page in pages:
+        for line in page:
+            if not line:
+                continue
+            if _PAGE_NUMBER.match(line) or (_signature(line) in boilerplate and heading_section(line) is None):
+                removed_boilerplate += 1
+                continue
+            cleaned = strip_contact(line)
+            if cleaned != line:
+                removed_contact += 1
+            if cleaned:
+                lines.append(cleaned)
+    return lines, removed_boilerplate, removed_contact
+
+
+def compact(text: str, budget: int = None) -> CompactedResume:
+    """
+    Shrinks extracted resume text before it goes into an LLM prompt:
+    normalises whitespace and bullets, drops page numbers, per-page
+    boilerplate and contact lines, keeps only the sections the parser uses
+    and, if still over `budget` tokens, trims the least important sections
+    first. Text without recognisable headings is only cleaned and truncated.
+    """
+    started = time.perf_counter()
+    budget = settings.RESUME_TOKEN_BUDGET if budget is None else budget
+    text = text or ""
+    tokens_before = estimate_tokens(text)
+
+    lines, removed_boilerplate, removed_contact = clean_lines(text)
+
+    sections = split_sections(lines)
+    found = [name for name, _ in sections if name != "header"]
+    if not found:
+        _counters["no_sections"] += 1
+        sections = [("header", lines)]
+    dropped = [name for name, _ in sections if name == "other"]
+    sections = [(name, body) for name, body in sections if name != "other"]
+
+    # Budget by tier, output in document order
+    allowed: Dict[int, List[str]] = {}
+    remaining = budget
+    truncated = False
+    for tier in SECTION_TIERS:
+        positions = [p for p, (name, _) in enumerate(sections) if name in tier]
+        caps = _shares([_cost(sections[p][1]) for p in positions], remaining)
+        for position, cap in zip(positions, caps):
+            name, body = sections[position]
+            kept = _fit(body, cap)
+            if len(kept) < len(body):
+                truncated = True
+            if len(kept) <= 1 and len(body) > 1:
+                # A bare heading is no use to the model
+                dropped.append(name)
+                continue
+            allowed[position] = kept
+            remaining -= _cost(kept)
+
+    compacted = "\n".join(line for position in sorted(allowed) for line in allowed[position])
+    result = CompactedResume(
+        compacted, tokens_before, estimate_tokens(compacted),
+        sorted(set(found) - set(dropped)), dropped, truncated,
+    )
+
+    _counters["documents"] += 1
+    _counters["tokens_before"] += result.tokens_before
+    _counters["tokens_after"] += result.tokens_after
+    _counters["boilerplate_lines"] += removed_boilerplate
+    _counters["contact_lines"] += removed_contact
+    _counters["sections_dropped"] += len(dropped)
+    _counters["truncated"] += truncated
+    _latency.record(time.perf_counter() - started)
+    return result
+
+
+def prepare_for_llm(text: str) -> str:
+    """
+    The text to put in the parsing prompt: compacted when
+    RESUME_COMPACT is on, otherwise only capped at the token budget.
+    """
+    if not settings.RESUME_COMPACT:
+        return text.replace(PAGE_BREAK, "\n")[: settings.RESUME_TOKEN_BUDGET * CHARS_PER_TOKEN]
+    result = compact(text)
+    # Compaction removed everything (odd layout): send the capped original
+    if not result.text.strip():
+        return text.replace(PAGE_BREAK, "\n")[: settings.RESUME_TOKEN_BUDGET * CHARS_PER_TOKEN]
+    return result.text
+
+
+def stats() -> dict:
+    before, after = _counters["tokens_before"], _counters["tokens_after"]
+    return {
+        **_counters,
+        "reduction": round(1 - after / before, 3) if before else 0,
+        "latency": _latency.snapshot(),
+    }
+
+
+metrics.register("resume_compact", stats)
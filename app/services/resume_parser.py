@@ -1,27 +1,441 @@
 import pdfplumber
 import docx
 import io
+import os
+import asyncio
+import multiprocessing
+import queue
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import Future, wait as futures_wait
+from typing import Union
 
+from app.core.config import settings
+from app.services.resume_compact import PAGE_BREAK
 
-def extract_text_from_pdf(file_bytes: bytes) -> str:
-    text = ""
-    # ⚠ wrap bytes in BytesIO
-    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
+# Bump whenever the extracted text's format changes so cached text is invalidated.
+EXTRACT_VERSION = "2"  # 2: PDF pages joined with PAGE_BREAK
+
+
+class PDFBudgetExceeded(ValueError):
+    """Raised when a PDF is over the size/page budget or yields nothing in time."""
+
+
+class ExtractedText(str):
+    """
+    Text from a PDF that skipped pages over budget. Still usable, but not
+    the whole document: callers must not cache it.
+    """
+    partial = True
+
+
+def is_partial(text: str) -> bool:
+    return isinstance(text, ExtractedText)
+
+
+def plain_text(text: str) -> str:
+    """
+    Extracted text for anything outside the parsing pipeline (API responses,
+    prompts): the page separator only means something to resume_compact.
+    """
+    plain = text.replace(PAGE_BREAK, "\n")
+    return ExtractedText(plain) if is_partial(text) else plain
+
+
+class JobTimeout(Exception):
+    """A pool job ran past its timeout; its worker process was replaced."""
+
+
+# ---------------------------------------------------------------------------
+# Process pool
+# Pages are fanned out to worker processes so a graphics-heavy CV does not
+# hold a threadpool worker (or the GIL) while pdfminer lays out each page.
+# ---------------------------------------------------------------------------
+
+def _worker_main(conn):
+    # Runs in the worker process: one (fn, args) job at a time
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        fn, args = job
+        try:
+            result = ("ok", fn(*args))
+        except Exception as e:
+            result = ("error", e)
+        try:
+            conn.send(result)
+        except Exception as e:
+            # Unpicklable result or exception
+            conn.send(("error", RuntimeError(repr(e))))
+
+
+def _ready() -> bool:
+    return True
+
+
+class WorkerPool:
+    """
+    A fixed set of worker processes fed from one shared queue, each driven
+    by its own thread, one job at a time.
+    - A job's timeout starts when a worker picks it up, not when it was
+      queued, so a busy pool doesn't time out waiting pages.
+    - A job over its timeout fails with JobTimeout and only its worker
+      process is killed and replaced; other callers' jobs, queued or
+      running, carry on.
+    - Cancelling a queued job's future drops it, so a caller can give up
+      on its own pages without touching anyone else's.
+    """
+
+    def __init__(self, workers: int):
+        self._context = multiprocessing.get_context("spawn")
+        self._jobs = queue.SimpleQueue()
+        self._closed = False
+        self.counters = {"jobs": 0, "timeouts": 0, "replaced": 0}
+        self._counters_lock = threading.Lock()  # updated from every dispatcher thread
+        self._threads = [
+            threading.Thread(target=self._run, name=f"pdf-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn, *args, timeout: float = None) -> Future:
+        if self._closed:
+            raise RuntimeError("Extraction pool is shut down")
+        future = Future()
+        self._jobs.put((fn, args, timeout, future))
+        return future
+
+    def _count(self, name: str):
+        with self._counters_lock:
+            self.counters[name] += 1
+
+    def _spawn(self):
+        # spawn: forking a process that already runs an event loop + threads is unsafe
+        parent, child = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child,), daemon=True)
+        process.start()
+        child.close()
+        # Wait out the interpreter start and imports here, so they don't
+        # count against the first job's timeout
+        parent.send((_ready, ()))
+        parent.recv()
+        return process, parent
+
+    def _replace(self, process, conn):
+        self._count("replaced")
+        _stop(process, conn)
+        while True:
+            try:
+                return self._spawn()
+            except (EOFError, OSError) as e:
+                if self._closed:
+                    raise
+                print(f"DEBUG: PDF worker failed to start, retrying: {e!r}")
+                time.sleep(1)
+
+    def _run(self):
+        try:
+            process, conn = self._spawn()
+        except (EOFError, OSError) as e:
+            print(f"DEBUG: PDF worker failed to start: {e!r}")
+            return
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    return
+                fn, args, timeout, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._count("jobs")
+                try:
+                    if not process.is_alive():
+                        process, conn = self._replace(process, conn)
+                    conn.send((fn, args))
+                    finished = conn.poll(timeout)
+                    if finished:
+                        status, value = conn.recv()
+                except (EOFError, OSError) as e:
+                    # The worker died mid-job (OOM kill, segfault in a parser)
+                    future.set_exception(RuntimeError(f"Extraction worker died: {e!r}"))
+                    process, conn = self._replace(process, conn)
+                    continue
+                if not finished:
+                    # Still running: the only way to stop it is to kill it
+                    self._count("timeouts")
+                    future.set_exception(JobTimeout(f"Job exceeded {timeout}s"))
+                    process, conn = self._replace(process, conn)
+                elif status == "ok":
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+        except (EOFError, OSError):
+            # A replacement failed to start during shutdown
+            if not self._closed:
+                raise
+        finally:
+            _stop(process, conn)
+
+    def shutdown(self):
+        self._closed = True
+        # Jobs nobody has started yet are dropped
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[3].cancel()
+        for _ in self._threads:
+            self._jobs.put(None)
+
+
+def _stop(process, conn):
+    try:
+        conn.close()
+    except OSError:
+        pass
+    if process.is_alive():
+        process.terminate()
+    process.join(timeout=1)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> WorkerPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(settings.PDF_WORKERS)
+        return _pool
+
+
+def shutdown_pool():
+    """Stops the worker processes (app shutdown / benchmarks)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def _clean(text: str) -> str:
     return text.encode('utf-8', errors='ignore').decode('utf-8', errors='ignore').strip()
 
 
+# A source is either the raw bytes or a path to a spooled upload. Paths are
+# preferred for the pool: workers open the file themselves instead of each
+# receiving a pickled copy of the document.
+Source = Union[bytes, str]
+
+
+@contextmanager
+def _shared_source(source: Source):
+    """
+    A path every page job can open. In-memory documents are written to a
+    temp file once, instead of pickling the whole PDF into each page job;
+    the file is removed when the document is done (a page job still running
+    past that only fails, and nobody reads its result).
+    """
+    if isinstance(source, str):
+        yield source
+        return
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(source)
+    try:
+        yield f.name
+    finally:
+        try:
+            os.remove(f.name)
+        except OSError:
+            pass
+
+
+def _as_stream(source: Source):
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+
+def _check_size(source: Source):
+    size = os.path.getsize(source) if isinstance(source, str) else len(source)
+    if size > settings.PDF_MAX_BYTES:
+        raise PDFBudgetExceeded(
+            f"PDF is {size} bytes; limit is {settings.PDF_MAX_BYTES}"
+        )
 
-def extract_text_from_docx(file_bytes: bytes) -> str:
-    file_stream = io.BytesIO(file_bytes)
-    doc = docx.Document(file_stream)
+
+def _check_pages(page_count: int):
+    if page_count > settings.PDF_MAX_PAGES:
+        raise PDFBudgetExceeded(
+            f"PDF has {page_count} pages; limit is {settings.PDF_MAX_PAGES}"
+        )
+
+
+# --- Worker functions (top level so they pickle) ---------------------------
+
+def _count_pages(source: Source) -> int:
+    with pdfplumber.open(_as_stream(source)) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_pages(source: Source, start: int, stop: int, max_chars: int) -> list[str]:
+    texts = []
+    with pdfplumber.open(_as_stream(source)) as pdf:
+        for page in pdf.pages[start:stop]:
+            texts.append((page.extract_text() or "")[:max_chars])
+    return texts
+
+
+def _join_pages(pages: list[str]) -> str:
+    # PAGE_BREAK between pages so resume_compact can spot per-page
+    # boilerplate; plain_text() turns it back into newlines
+    return _clean(PAGE_BREAK.join(p for p in pages if p))
+
+
+def _finish(pages: list[str], timed_out: int) -> str:
+    if timed_out:
+        print(f"DEBUG: PDF extraction skipped {timed_out} page(s) over budget")
+        if not any(pages):
+            raise PDFBudgetExceeded("PDF extraction timed out")
+        return ExtractedText(_join_pages(pages))
+    return _join_pages(pages)
+
+
+def _submit_pages(source: Source, page_count: int) -> list[Future]:
+    pool = _get_pool()
+    return [
+        pool.submit(_extract_pages, source, i, i + 1, settings.PDF_MAX_PAGE_CHARS, timeout=settings.PDF_PAGE_TIMEOUT)
+        for i in range(page_count)
+    ]
+
+
+def _collect(futures: list[Future]) -> str:
+    """
+    Joins the pages that finished. A page that timed out, or didn't finish
+    by the document deadline, is skipped; any other error is raised.
+    """
+    pages, timed_out = [], 0
+    for future in futures:
+        if not future.done() or future.cancelled() or isinstance(future.exception(), JobTimeout):
+            pages.append("")
+            timed_out += 1
+        else:
+            pages.append(future.result()[0])
+    return _finish(pages, timed_out)
+
+
+def extract_text_from_pdf(file_bytes: Source) -> str:
+    """
+    Extracts text page-by-page over the process pool and joins it in order.
+    Small documents are extracted inline; the IPC isn't worth it for 1-2 pages.
+    """
+    _check_size(file_bytes)
+
+    page_count = _count_pages(file_bytes)
+    _check_pages(page_count)
+
+    if page_count < settings.PDF_PARALLEL_MIN_PAGES:
+        return _join_pages(_extract_pages(file_bytes, 0, page_count, settings.PDF_MAX_PAGE_CHARS))
+
+    with _shared_source(file_bytes) as path:
+        futures = _submit_pages(path, page_count)
+        try:
+            futures_wait(futures, timeout=settings.PDF_DOC_TIMEOUT)
+        finally:
+            # Only this document's pages: ones still queued are dropped, running
+            # ones end within their own page timeout
+            for future in futures:
+                future.cancel()
+        return _collect(futures)
+
+
+async def _run_in_pool(fn, *args, timeout: float):
+    future = _get_pool().submit(fn, *args, timeout=timeout)
+    try:
+        return await asyncio.wrap_future(future)
+    finally:
+        future.cancel()
+
+
+async def _wait_all(futures: list[Future], timeout: float):
+    # One loop future for the lot, rather than wrapping each page's future
+    # (whose late results would be reported as never retrieved)
+    loop = asyncio.get_running_loop()
+    all_done = loop.create_future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def settle():
+        if not all_done.done():
+            all_done.set_result(None)
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            try:
+                loop.call_soon_threadsafe(settle)
+            except RuntimeError:
+                pass  # loop already closed
+
+    for future in futures:
+        future.add_done_callback(on_done)
+    await asyncio.wait([all_done], timeout=timeout)
+
+
+async def extract_text_from_pdf_async(file_bytes: Source) -> str:
+    """
+    Same as extract_text_from_pdf but awaits the process pool directly,
+    so no threadpool worker is held while pages are extracted.
+    """
+    _check_size(file_bytes)
+
+    try:
+        page_count = await _run_in_pool(_count_pages, file_bytes, timeout=settings.PDF_PAGE_TIMEOUT)
+    except JobTimeout:
+        raise PDFBudgetExceeded("PDF page count timed out")
+    _check_pages(page_count)
+
+    if page_count < settings.PDF_PARALLEL_MIN_PAGES:
+        try:
+            pages = await _run_in_pool(
+                _extract_pages, file_bytes, 0, page_count, settings.PDF_MAX_PAGE_CHARS,
+                timeout=min(settings.PDF_PAGE_TIMEOUT * max(1, page_count), settings.PDF_DOC_TIMEOUT),
+            )
+        except JobTimeout:
+            return _finish([""] * page_count, page_count)
+        return _join_pages(pages)
+
+    shared = _shared_source(file_bytes)
+    path = await asyncio.to_thread(shared.__enter__)
+    try:
+        futures = _submit_pages(path, page_count)
+        try:
+            await _wait_all(futures, settings.PDF_DOC_TIMEOUT)
+        finally:
+            # Also on cancellation (client gone): drop this document's queued pages
+            for future in futures:
+                future.cancel()
+        return _collect(futures)
+    finally:
+        await asyncio.to_thread(shared.__exit__, None, None, None)
+
+
+def extract_text_from_docx(file_bytes: Source) -> str:
+    doc = docx.Document(_as_stream(file_bytes))
     text= "\n".join([para.text for para in doc.paragraphs])
-    return text.encode('utf-8', errors='ignore').decode('utf-8', errors='ignore').strip()
+    return _clean(text)
 
-def extract_resume_text(filename: str, file_bytes: bytes) -> str:
+def extract_resume_text(filename: str, file_bytes: Source) -> str:
     if filename.lower().endswith(".pdf"):
         return extract_text_from_pdf(file_bytes)
     elif filename.lower().endswith(".docx"):
@@ -29,3 +443,14 @@ def extract_resume_text(filename: str, file_bytes: bytes) -> str:
     else:
         raise ValueError("Unsupported file type. Upload PDF or DOCX only.")
 
+
+async def extract_resume_text_async(filename: str, file_bytes: Source) -> str:
+    if filename.lower().endswith(".pdf"):
+        return await extract_text_from_pdf_async(file_bytes)
+    elif filename.lower().endswith(".docx"):
+        try:
+            return await _run_in_pool(extract_text_from_docx, file_bytes, timeout=settings.PDF_DOC_TIMEOUT)
+        except JobTimeout:
+            raise ValueError("DOCX extraction timed out")
+    else:
+        raise ValueError("Unsupported file type. Upload PDF or DOCX only.")
@@ -1,30 +1,134 @@
+import asyncio
+import sys
+from abc import ABC, abstractmethod
+import threading
+import time
 import uuid
-from typing import List, Dict, Optional
+import weakref
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Optional, Sequence
 from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services import metrics
+from app.services.feedback_events import feedback_events
+
+STORAGE_DIR = Path(__file__).resolve().parent.parent / "storage"
+# Per-session files. Shared content-addressed clips (audio/cache) are never
+# deleted here: other sessions may be playing them.
+SESSION_FILE_PATTERNS = ("audio/q_{sid}_*", "answers/answer_{sid}_*")
 
 class InterviewSession:
-    def __init__(self, session_id: str, questions: List[str]):
+    """
+    Containers are never mutated in place: writers build a new tuple/dict
+    and swap it in under `lock`, so readers (routes, the TTS scheduler,
+    background tasks, threadpool code) can use them without locking.
+    """
+    # No per-instance __dict__: a worker holds thousands of these
+    __slots__ = (
+        "session_id", "questions", "current_index", "answers", "feedbacks",
+        "is_completed", "created_at", "last_active", "pre_generated_audio", "lock",
+    )
+
+    def __init__(self, session_id: str, questions: Sequence[str]):
         self.session_id = session_id
-        self.questions = questions
+        self.questions = tuple(questions)
         self.current_index = 0
-        self.answers: List[str] = []
+        self.answers: tuple = ()
         self.feedbacks: Dict[int, Dict] = {}
         self.is_completed: bool = False
         self.created_at = datetime.now()
+        self.last_active = time.monotonic()
         self.pre_generated_audio: Dict[int, str] = {} # Map index -> relative_path
+        self.lock = threading.Lock() # guards writes only
+
+def session_size(session: InterviewSession) -> int:
+    """
+    Approximate bytes held by a session (object, containers and their strings).
+    """
+    size = sys.getsizeof(session)
+    for items in (session.questions, session.answers):
+        size += sys.getsizeof(items) + sum(sys.getsizeof(x) for x in items)
+    size += sys.getsizeof(session.pre_generated_audio) + sum(sys.getsizeof(p) for p in session.pre_generated_audio.values())
+    size += sys.getsizeof(session.feedbacks)
+    for feedback in session.feedbacks.values():
+        size += sys.getsizeof(feedback) + sum(sys.getsizeof(v) for v in feedback.values())
+    return size
+
+def delete_session_files(session_id: str) -> int:
+    deleted = 0
+    for pattern in SESSION_FILE_PATTERNS:
+        for path in STORAGE_DIR.glob(pattern.format(sid=session_id)):
+            try:
+                path.unlink()
+                deleted += 1
+            except FileNotFoundError:
+                pass
+    return deleted
+
+class SessionStore(ABC):
+    """
+    Interface every session backend implements. Routes, background tasks
+    and the TTS scheduler only talk to the global `session_manager`, so the
+    backend is picked by settings.SESSION_STORE:
+    - "memory": process-local dict (single worker, lost on restart)
+    - "sql":    SQLAlchemy tables on app.database.db.engine, shared by all
+                workers (see session_store_sql.SqlSessionManager)
+    get_session() returns an InterviewSession snapshot; change it only
+    through the store's methods.
+    """
 
-class SessionManager:
     def __init__(self):
-        self.sessions: Dict[str, InterviewSession] = {}
+        self._async_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self.stale_submits = 0
 
+    @abstractmethod
     def create_session(self, questions: List[str]) -> str:
-        session_id = str(uuid.uuid4())[:8]
-        session = InterviewSession(session_id, questions)
-        self.sessions[session_id] = session
-        return session_id
+        ...
+
+    @abstractmethod
+    def add_question(self, session_id: str, question: str):
+        ...
 
-    def get_session(self, session_id: str) -> Optional[InterviewSession]:
-        return self.sessions.get(session_id)
+    @abstractmethod
+    def discard_session(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def get_session(self, session_id: str, fresh: bool = False) -> Optional[InterviewSession]:
+        """
+        fresh=True bypasses any read cache: use it for the index a
+        compare-and-advance submit will be checked against.
+        """
+
+    @abstractmethod
+    def submit_answer(self, session_id: str, answer: str, feedback: dict = None, expected_index: int = None) -> bool:
+        """
+        Compare-and-advance: records the answer and moves to the next
+        question only if the session is still on `expected_index` (when
+        given), so a duplicate submit can't skip a question.
+        """
+
+    def async_lock(self, session_id: str) -> asyncio.Lock:
+        """
+        Per-session lock for multi-step async flows (submit, then read the
+        next question and its audio). Only held while someone uses it.
+        """
+        lock = self._async_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._async_locks[session_id] = lock
+        return lock
+
+    @abstractmethod
+    def add_feedback(self, session_id: str, index: int, feedback: dict):
+        ...
+
+    @abstractmethod
+    def set_cached_audio(self, session_id: str, index: int, path: str):
+        ...
 
     def get_current_question(self, session_id: str) -> Optional[str]:
         session = self.get_session(session_id)
@@ -35,24 +139,108 @@ class SessionManager:
             return session.questions[session.current_index]
         return None
 
-    def submit_answer(self, session_id: str, answer: str, feedback: dict = None) -> bool:
+    def get_cached_audio(self, session_id: str, index: int) -> Optional[str]:
+        session = self.get_session(session_id)
+        if session:
+            return session.pre_generated_audio.get(index)
+        return None
+
+    def get_all_feedback(self, session_id: str) -> Optional[List[Dict]]:
+        session = self.get_session(session_id)
+        if not session:
+            return None
+        # Return sorted by index
+        return [session.feedbacks[i] for i in sorted(session.feedbacks.keys())]
+
+    def is_finished(self, session_id: str) -> bool:
+        session = self.get_session(session_id)
+        if not session:
+            return True # Treat invalid as finished/error
+        return session.is_completed # Use the new is_completed attribute
+
+    def sweep(self) -> List[str]:
+        """
+        Evicts idle (SESSION_TTL_SECONDS) and excess (SESSION_MAX_COUNT, least
+        recently used first) sessions. Returns every session id evicted since
+        the last sweep, so the caller can delete their files.
+        """
+        return []
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__, "stale_submits": self.stale_submits}
+
+class SessionManager(SessionStore):
+    """
+    In-memory backend. Sessions are kept in least-recently-used order;
+    reads and writes both count as use.
+    """
+    def __init__(self, ttl: float = None, max_sessions: int = None):
+        super().__init__()
+        self._index_lock = threading.Lock() # guards the OrderedDict itself
+        self.sessions: "OrderedDict[str, InterviewSession]" = OrderedDict()
+        self.ttl = settings.SESSION_TTL_SECONDS if ttl is None else ttl
+        self.max_sessions = settings.SESSION_MAX_COUNT if max_sessions is None else max_sessions
+        self._evicted: List[str] = []
+        self.counters = {"evicted_ttl": 0, "evicted_lru": 0, "files_deleted": 0}
+
+    def create_session(self, questions: List[str]) -> str:
+        session_id = str(uuid.uuid4())[:8]
+        session = InterviewSession(session_id, questions)
+        with self._index_lock:
+            self.sessions[session_id] = session
+            while len(self.sessions) > self.max_sessions:
+                evicted, _ = self.sessions.popitem(last=False)
+                self._evicted.append(evicted)
+                self.counters["evicted_lru"] += 1
+        return session_id
+
+    def add_question(self, session_id: str, question: str):
+        """
+        Appends a question to a session whose questions are still being streamed in.
+        """
+        session = self.get_session(session_id)
+        if session:
+            with session.lock:
+                session.questions = session.questions + (question,)
+
+    def discard_session(self, session_id: str):
+        with self._index_lock:
+            self.sessions.pop(session_id, None)
+
+    def get_session(self, session_id: str, fresh: bool = False) -> Optional[InterviewSession]:
+        with self._index_lock:
+            session = self.sessions.get(session_id)
+            if session:
+                session.last_active = time.monotonic()
+                self.sessions.move_to_end(session_id)
+        return session
+
+    def submit_answer(self, session_id: str, answer: str, feedback: dict = None, expected_index: int = None) -> bool:
         """
         Saves answer, optionally saves feedback, and advances to next question.
-        Returns True if successful, False if session invalid or finished.
+        Returns True if successful, False if session invalid, finished, or
+        no longer on expected_index.
         """
         session = self.get_session(session_id)
-        if not session or session.is_completed:
+        if not session:
             return False
-            
-        session.answers.append(answer)
-        if feedback:
-            session.feedbacks[session.current_index] = feedback
-            
-        session.current_index += 1
-        
-        if session.current_index >= len(session.questions):
-            session.is_completed = True
-            
+
+        with session.lock:
+            index = session.current_index
+            if session.is_completed:
+                return False
+            if expected_index is not None and index != expected_index:
+                self.stale_submits += 1
+                return False
+
+            session.answers = session.answers + (answer,)
+            if feedback:
+                session.feedbacks = {**session.feedbacks, index: feedback}
+            # Completion first: a reader never sees an index past the end
+            # on a session that still looks open
+            session.is_completed = index + 1 >= len(session.questions)
+            session.current_index = index + 1
+
         return True
 
     def add_feedback(self, session_id: str, index: int, feedback: dict):
@@ -62,31 +250,67 @@ class SessionManager:
         """
         session = self.get_session(session_id)
         if session:
-            session.feedbacks[index] = feedback
+            with session.lock:
+                session.feedbacks = {**session.feedbacks, index: feedback}
+            feedback_events.notify(session_id)
 
     def set_cached_audio(self, session_id: str, index: int, path: str):
         session = self.get_session(session_id)
         if session:
-            session.pre_generated_audio[index] = path
+            with session.lock:
+                session.pre_generated_audio = {**session.pre_generated_audio, index: path}
 
-    def get_cached_audio(self, session_id: str, index: int) -> Optional[str]:
-        session = self.get_session(session_id)
-        if session:
-            return session.pre_generated_audio.get(index)
-        return None
+    def sweep(self) -> List[str]:
+        cutoff = time.monotonic() - self.ttl
+        with self._index_lock:
+            # LRU order: the first session still in use ends the scan
+            expired = []
+            for session_id, session in self.sessions.items():
+                if session.last_active > cutoff:
+                    break
+                expired.append(session_id)
+            for session_id in expired:
+                del self.sessions[session_id]
+            self.counters["evicted_ttl"] += len(expired)
 
-    def get_all_feedback(self, session_id: str) -> Optional[List[Dict]]:
-        session = self.get_session(session_id)
-        if not session:
-            return None
-        # Return sorted by index
-        return [session.feedbacks[i] for i in sorted(session.feedbacks.keys())]
+            evicted, self._evicted = self._evicted + expired, []
+        return evicted
 
-    def is_finished(self, session_id: str) -> bool:
-        session = self.get_session(session_id)
-        if not session:
-            return True # Treat invalid as finished/error
-        return session.is_completed # Use the new is_completed attribute
+    def stats(self) -> dict:
+        with self._index_lock:
+            sample = list(islice(self.sessions.values(), 200))
+        return {
+            **super().stats(),
+            "live_sessions": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "avg_session_bytes": sum(map(session_size, sample)) // len(sample) if sample else 0,
+            **self.counters,
+        }
+
+async def run_sweeper():
+    """
+    Periodic eviction, started with the app. The sweep and the file
+    deletes go in the threadpool.
+    """
+    while True:
+        await asyncio.sleep(settings.SESSION_SWEEP_INTERVAL)
+        try:
+            evicted = await run_in_threadpool(session_manager.sweep)
+            if evicted:
+                deleted = await run_in_threadpool(lambda: sum(map(delete_session_files, evicted)))
+                session_manager.counters["files_deleted"] += deleted
+                print(f"[Sessions] Evicted {len(evicted)} session(s), deleted {deleted} file(s)")
+        except Exception as e:
+            print(f"[Sessions] Sweep failed: {e}")
+
+def create_session_manager() -> SessionStore:
+    if settings.SESSION_STORE == "sql":
+        from app.services.session_store_sql import SqlSessionManager
+        return SqlSessionManager()
+    if settings.SESSION_STORE != "memory":
+        raise ValueError(f"Unknown SESSION_STORE '{settings.SESSION_STORE}'. Use 'memory' or 'sql'")
+    return SessionManager()
 
 # Global Instance
-session_manager = SessionManager()
+session_manager = create_session_manager()
+metrics.register("session_store", session_manager.stats, blocking=settings.SESSION_STORE == "sql")
@@ -0,0 +1,259 @@
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.database.db import engine
+from app.models.base import Base
+from app.models.interview_session import InterviewSessionRecord, SessionAnswer, SessionQuestion
+from app.services.feedback_events import feedback_events
+from app.services.session_manager import InterviewSession, SessionStore
+
+SUBMIT_RETRIES = 5
+# A read refreshes updated_at at most this often; mutations always do
+TOUCH_INTERVAL = timedelta(seconds=60)
+
+
+class SqlSessionManager(SessionStore):
+    """
+    Session backend on app.database.db.engine (SQLite locally, Postgres in
+    production), so any uvicorn worker can serve any request of an interview.
+    - interview_sessions holds the index and completion flag; questions and
+      answers are in session_questions/session_answers, keyed by
+      (session_id, position).
+    - submit_answer advances the index with a compare-and-set UPDATE in the
+      same transaction as the answer insert, so two workers can't both
+      take the same question.
+    - Reads come from a per-worker snapshot cached for SESSION_CACHE_TTL
+      seconds; this worker's own writes drop its snapshot immediately, other
+      workers' writes show up once it expires. get_session(fresh=True)
+      skips the snapshot (and refreshes it).
+    - Every method is a blocking database call: from async code, call it
+      through run_in_threadpool.
+    """
+
+    def __init__(self, cache_ttl: float = None):
+        super().__init__()
+        Base.metadata.create_all(engine)
+        self._db = sessionmaker(bind=engine, expire_on_commit=False)
+        self.cache_ttl = settings.SESSION_CACHE_TTL if cache_ttl is None else cache_ttl
+        self._cache: Dict[str, Tuple[float, InterviewSession]] = {}
+        self._lock = threading.Lock()
+        self.counters = {
+            "cache_hits": 0, "cache_misses": 0, "submit_conflicts": 0,
+            "evicted_ttl": 0, "evicted_lru": 0, "files_deleted": 0,
+        }
+
+    # -- local read cache ----------------------------------------------------
+
+    def _invalidate(self, session_id: str):
+        with self._lock:
+            self._cache.pop(session_id, None)
+
+    def get_session(self, session_id: str, fresh: bool = False) -> Optional[InterviewSession]:
+        now = time.monotonic()
+        with self._lock:
+            cached = None if fresh else self._cache.get(session_id)
+            if cached and cached[0] > now:
+                self.counters["cache_hits"] += 1
+                return cached[1]
+            self.counters["cache_misses"] += 1
+
+        session = self._load(session_id)
+        if session is not None:
+            with self._lock:
+                self._cache[session_id] = (now + self.cache_ttl, session)
+        return session
+
+    def _load(self, session_id: str) -> Optional[InterviewSession]:
+        with self._db() as db:
+            record = db.get(InterviewSessionRecord, session_id)
+            if record is None:
+                return None
+            questions = db.execute(
+                select(SessionQuestion.question, SessionQuestion.audio_path)
+                .where(SessionQuestion.session_id == session_id)
+                .order_by(SessionQuestion.position)
+            ).all()
+            answers = db.execute(
+                select(SessionAnswer.position, SessionAnswer.answer_text, SessionAnswer.feedback)
+                .where(SessionAnswer.session_id == session_id)
+                .order_by(SessionAnswer.position)
+            ).all()
+
+        session = InterviewSession(session_id, [q.question for q in questions])
+        session.current_index = record.current_index
+        session.is_completed = record.is_completed
+        session.created_at = record.created_at
+        session.answers = tuple(a.answer_text for a in answers)
+        session.feedbacks = {a.position: json.loads(a.feedback) for a in answers if a.feedback}
+        session.pre_generated_audio = {i: q.audio_path for i, q in enumerate(questions) if q.audio_path}
+
+        # A read is activity too, but mustn't turn every cold read into a write
+        if record.updated_at is None or record.updated_at < datetime.now() - TOUCH_INTERVAL:
+            with self._db.begin() as db:
+                _touch(db, session_id)
+        return session
+
+    # -- writes ----------------------------------------------------------------
+
+    def create_session(self, questions: List[str]) -> str:
+        session_id = str(uuid.uuid4())[:8]
+        with self._db.begin() as db:
+            db.add(InterviewSessionRecord(id=session_id, current_index=0, is_completed=False))
+            db.add_all(
+                SessionQuestion(session_id=session_id, position=i, question=q)
+                for i, q in enumerate(questions)
+            )
+        return session_id
+
+    def add_question(self, session_id: str, question: str):
+        with self._db.begin() as db:
+            count = db.scalar(select(func.count()).where(SessionQuestion.session_id == session_id))
+            db.add(SessionQuestion(session_id=session_id, position=count, question=question))
+            _touch(db, session_id)
+        self._invalidate(session_id)
+
+    def discard_session(self, session_id: str):
+        with self._db.begin() as db:
+            db.execute(delete(SessionAnswer).where(SessionAnswer.session_id == session_id))
+            db.execute(delete(SessionQuestion).where(SessionQuestion.session_id == session_id))
+            db.execute(delete(InterviewSessionRecord).where(InterviewSessionRecord.id == session_id))
+        self._invalidate(session_id)
+
+    def submit_answer(self, session_id: str, answer: str, feedback: dict = None, expected_index: int = None) -> bool:
+        """
+        Saves the answer to the current question and advances the index,
+        atomically across workers. False if the session is invalid, finished
+        or (with expected_index) already past that question.
+        """
+        try:
+            for _ in range(SUBMIT_RETRIES):
+                with self._db.begin() as db:
+                    record = db.get(InterviewSessionRecord, session_id)
+                    if record is None or record.is_completed:
+                        return False
+                    index = record.current_index
+                    if expected_index is not None and index != expected_index:
+                        self.stale_submits += 1
+                        return False
+                    total = db.scalar(select(func.count()).where(SessionQuestion.session_id == session_id))
+                    advanced = db.execute(
+                        update(InterviewSessionRecord)
+                        .where(
+                            InterviewSessionRecord.id == session_id,
+                            InterviewSessionRecord.current_index == index,
+                            InterviewSessionRecord.is_completed.is_(False),
+                        )
+                        .values(current_index=index + 1, is_completed=index + 1 >= total)
+                        .execution_options(synchronize_session=False)
+                    ).rowcount
+                    if not advanced:
+                        # Another worker advanced first: re-read (and with
+                        # expected_index, fail on the next pass)
+                        self.counters["submit_conflicts"] += 1
+                        continue
+                    db.add(SessionAnswer(
+                        session_id=session_id,
+                        position=index,
+                        answer_text=answer,
+                        feedback=json.dumps(feedback) if feedback else None,
+                        score=_score(feedback),
+                    ))
+                    return True
+            return False
+        finally:
+            self._invalidate(session_id)
+
+    def add_feedback(self, session_id: str, index: int, feedback: dict):
+        with self._db.begin() as db:
+            updated = db.execute(
+                update(SessionAnswer)
+                .where(SessionAnswer.session_id == session_id, SessionAnswer.position == index)
+                .values(feedback=json.dumps(feedback), score=_score(feedback))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not updated:
+                db.add(SessionAnswer(session_id=session_id, position=index, feedback=json.dumps(feedback), score=_score(feedback)))
+            _touch(db, session_id)
+        self._invalidate(session_id)
+        feedback_events.notify(session_id)
+
+    def set_cached_audio(self, session_id: str, index: int, path: str):
+        with self._db.begin() as db:
+            db.execute(
+                update(SessionQuestion)
+                .where(SessionQuestion.session_id == session_id, SessionQuestion.position == index)
+                .values(audio_path=path)
+                .execution_options(synchronize_session=False)
+            )
+            _touch(db, session_id)
+        self._invalidate(session_id)
+
+    def sweep(self) -> List[str]:
+        """
+        Recency is the record's updated_at (bumped by every write, and by
+        reads at most once per TOUCH_INTERVAL), so it's shared by all
+        workers; whichever worker sweeps first deletes the files.
+        """
+        cutoff = datetime.now() - timedelta(seconds=settings.SESSION_TTL_SECONDS)
+        with self._db() as db:
+            expired = db.scalars(
+                select(InterviewSessionRecord.id).where(InterviewSessionRecord.updated_at < cutoff)
+            ).all()
+            excess = db.scalars(
+                select(InterviewSessionRecord.id)
+                .where(InterviewSessionRecord.updated_at >= cutoff)
+                .order_by(InterviewSessionRecord.updated_at.desc())
+                .offset(settings.SESSION_MAX_COUNT)
+            ).all()
+        for session_id in (*expired, *excess):
+            self.discard_session(session_id)
+        now = time.monotonic()
+        with self._lock:
+            for session_id in [sid for sid, (expires, _) in self._cache.items() if expires <= now]:
+                del self._cache[session_id]
+        self.counters["evicted_ttl"] += len(expired)
+        self.counters["evicted_lru"] += len(excess)
+        return [*expired, *excess]
+
+    def stats(self) -> dict:
+        with self._db() as db:
+            live = db.scalar(select(func.count(InterviewSessionRecord.id)))
+        return {
+            **super().stats(),
+            "database": engine.url.get_backend_name(),
+            "live_sessions": live,
+            "cached_sessions": len(self._cache),
+            **self.counters,
+        }
+
+
+def _touch(db, session_id: str):
+    db.execute(
+        update(InterviewSessionRecord)
+        .where(InterviewSessionRecord.id == session_id)
+        .values(updated_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _score(feedback: Optional[dict]) -> Optional[int]:
+    """
+    The evaluator's rating as an int: "7/10" -> 7 (also "7" or 7).
+    None for "N/A" (error results) or anything unparseable.
+    """
+    rating = (feedback or {}).get("rating")
+    if isinstance(rating, bool):
+        return None
+    if isinstance(rating, int):
+        return rating
+    match = re.match(r"\s*(\d+)\s*(?:/\s*10\s*)?$", rating) if isinstance(rating, str) else None
+    return int(match.group(1)) if match else None
@@ -0,0 +1,99 @@
+import asyncio
+import copy
+import functools
+import hashlib
+import json
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from app.services import metrics
+
+
+def normalize(value: Any) -> Any:
+    """
+    Canonical form of a call's input: strings with whitespace collapsed,
+    dict keys sorted (by json.dumps below), tuples as lists.
+    """
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    return value
+
+
+def call_key(*parts: Any) -> str:
+    encoded = json.dumps(normalize(list(parts)), sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical calls into one. The first caller for a
+    key starts the work in its own task; callers arriving while it runs
+    await that task instead of making the same upstream request. Nothing is
+    kept once it finishes: this only removes duplicate in-flight work,
+    caching is left to the caches.
+    - Waiters get a deep copy of the result, so one caller mutating its
+      result can't affect another's.
+    - A waiter being cancelled (client gone) doesn't cancel the shared work.
+    - An exception is raised to every waiter.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.counters = defaultdict(lambda: {"calls": 0, "leaders": 0, "coalesced": 0, "errors": 0})
+
+    async def do(self, group: str, key: str, fn: Callable[..., Awaitable], *args, **kwargs):
+        counters = self.counters[group]
+        counters["calls"] += 1
+        flight = (group, key)
+        task = self._flights.get(flight)
+        if task is not None:
+            counters["coalesced"] += 1
+            return copy.deepcopy(await asyncio.shield(task))
+
+        counters["leaders"] += 1
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+        self._flights[flight] = task
+
+        def done(t: asyncio.Task):
+            if self._flights.get(flight) is t:
+                del self._flights[flight]
+            if t.cancelled() or t.exception() is not None:
+                counters["errors"] += 1
+
+        task.add_done_callback(done)
+        return await asyncio.shield(task)
+
+    def in_flight(self, group: str, key: str) -> bool:
+        return (group, key) in self._flights
+
+    def stats(self) -> dict:
+        in_flight = defaultdict(int)
+        for group, _ in self._flights:
+            in_flight[group] += 1
+        return {
+            group: {**counts, "in_flight": in_flight[group]}
+            for group, counts in sorted(self.counters.items())
+        }
+
+
+singleflight = SingleFlight()
+metrics.register("singleflight", singleflight.stats)
+
+
+def coalesce(group: str, model: Callable[[], str] = None):
+    """
+    Decorator for async model calls: concurrent calls with the same
+    normalized arguments (and model, if the function's model isn't one of
+    them) share one execution.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            key = call_key(model() if model else None, args, kwargs)
+            return await singleflight.do(group, key, fn, *args, **kwargs)
+        return wrapper
+    return decorator
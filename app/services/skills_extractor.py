@@ -0,0 +1,250 @@
+import json
+import re
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services import metrics, resume_compact
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+_MONTH = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s*"
+_DATE_RANGE = re.compile(
+    rf"\(?\s*({_MONTH})?(19|20)\d{{2}}\s*(-|–|—|to)\s*(({_MONTH})?(19|20)\d{{2}}|present|current|now|date)\s*\)?",
+    re.IGNORECASE,
+)
+_YEAR = re.compile(r"\(?\b(19|20)\d{2}\b\)?")
+_DEGREE = re.compile(
+    r"\b(b\.?\s?tech|m\.?\s?tech|b\.?\s?e\b|m\.?\s?e\b|b\.?\s?sc?|m\.?\s?sc?|b\.?\s?a\b|m\.?\s?a\b|mba|bba|bca|mca|"
+    r"ph\.?\s?d|bachelor|master|doctor|diploma|associate degree|high school|secondary school|a-levels|hsc|ssc)",
+    re.IGNORECASE,
+)
+_INSTITUTION = re.compile(r"\b(university|universidade|universidad|college|institute|school|academy|polytechnic|iit|nit)\b", re.IGNORECASE)
+_ENTRY_SEPARATOR = re.compile(r"\s+(?:at|@)\s+|\s*[,|]\s*|\s+[-–—]\s+")
+_BULLET = re.compile(r"^[-*]\s*")
+
+DESCRIPTION_MAX_CHARS = 300
+
+_counters = {"documents": 0, "skills_found": 0}
+_latency = metrics.LatencyStats()
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: every pattern is found in one pass over the text,
+    however many patterns there are. Patterns are matched on lowercase
+    text; a match must not start or end inside a word.
+    """
+
+    def __init__(self, patterns: Dict[str, str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]
+        for pattern, value in patterns.items():
+            self._add(pattern, value)
+        self._link()
+
+    def _add(self, pattern: str, value: str):
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), value))
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """
+        Yields (start, end, value) for every whole-word occurrence.
+        """
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._out[state]:
+                start, end = i + 1 - length, i + 1
+                if _boundary(text, start, end):
+                    yield start, end, value
+
+
+def _boundary(text: str, start: int, end: int) -> bool:
+    # Only an alphanumeric edge needs a break next to it: ".net" may follow
+    # "asp", "c++" is never followed by a letter anyway
+    if text[start].isalnum() and start > 0 and text[start - 1].isalnum():
+        return False
+    if text[end - 1].isalnum() and end < len(text) and text[end].isalnum():
+        return False
+    return True
+
+
+def _longest(matches: List[Tuple[int, int, str]]) -> List[Tuple[int, int, str]]:
+    # "react native" beats the "react" inside it
+    kept, covered = [], -1
+    for start, end, value in sorted(matches, key=lambda m: (m[0], -(m[1] - m[0]))):
+        if start >= covered:
+            kept.append((start, end, value))
+            covered = end
+    return kept
+
+
+class SkillsDictionary:
+    """
+    Canonical skill names with their aliases, loaded from a JSON file:
+      {"skills": [{"name": "JavaScript", "aliases": ["js", "es6"],
+                   "skills_section_only": ["..."]}]}
+    skills_section_only aliases are common words ("go", "spring") that only
+    count inside a Skills section.
+    """
+
+    def __init__(self, entries: List[dict]):
+        everywhere, skills_only = {}, {}
+        for entry in entries:
+            name = entry["name"]
+            everywhere[name.lower()] = name
+            for alias in entry.get("aliases", ()):
+                everywhere[_normalize(alias)] = name
+            for alias in entry.get("skills_section_only", ()):
+                skills_only[_normalize(alias)] = name
+        self.names = {name for name in everywhere.values()}
+        self._aliases = {**skills_only, **everywhere}
+        self._everywhere = AhoCorasick(everywhere)
+        self._skills_section = AhoCorasick({**skills_only, **everywhere})
+
+    @classmethod
+    def load(cls, path: str) -> "SkillsDictionary":
+        path = Path(path) if Path(path).is_absolute() else BASE_DIR / path
+        return cls(json.loads(path.read_text(encoding="utf-8"))["skills"])
+
+    def canonical(self, skill: str) -> Optional[str]:
+        return self._aliases.get(_normalize(skill))
+
+    def find(self, text: str, skills_section: bool = False) -> List[str]:
+        automaton = self._skills_section if skills_section else self._everywhere
+        return [value for _, _, value in _longest(list(automaton.iter(_normalize(text))))]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _sections(text: str) -> List[Tuple[str, List[str]]]:
+    # Same clean-up as the LLM input: no footers, page numbers or contact details
+    return resume_compact.split_sections(resume_compact.clean_lines(text or "")[0])
+
+
+def _strip_dates(line: str) -> str:
+    return _YEAR.sub("", _DATE_RANGE.sub("", line)).strip(" ,|-–—()")
+
+
+def _split_entry(line: str) -> Tuple[str, str]:
+    parts = [p.strip() for p in _ENTRY_SEPARATOR.split(line, maxsplit=1) if p.strip()]
+    return (parts[0], parts[1]) if len(parts) == 2 else (parts[0] if parts else "NA", "NA")
+
+
+def parse_experience(lines: List[str]) -> List[dict]:
+    """
+    An entry starts at each line with a date range ("Jan 2020 - Present");
+    that line holds title and company, or the line before it if it is only
+    the dates. The lines up to the next entry are its description.
+    """
+    headers: Dict[int, str] = {}
+    for i, line in enumerate(lines):
+        if not _DATE_RANGE.search(line):
+            continue
+        header = _strip_dates(line)
+        if not header and i > 0 and i - 1 not in headers and not _DATE_RANGE.search(lines[i - 1]):
+            headers[i - 1] = lines[i - 1]
+            headers[i] = ""
+        else:
+            headers[i] = header
+
+    entries = []
+    for i, line in enumerate(lines):
+        if i in headers:
+            if headers[i]:
+                title, company = _split_entry(headers[i])
+                entries.append({"title": title, "company": company, "description": ""})
+        elif entries:
+            text = f"{entries[-1]['description']} {_BULLET.sub('', line)}".strip()
+            entries[-1]["description"] = text[:DESCRIPTION_MAX_CHARS]
+    for entry in entries:
+        entry["description"] = entry["description"] or "NA"
+    return entries
+
+
+def parse_education(lines: List[str]) -> List[dict]:
+    """
+    An entry per line naming a degree; the institution is the part of that
+    line (or the next) with "University", "College", ... in it.
+    """
+    entries = []
+    for i, line in enumerate(lines):
+        if not _DEGREE.search(line):
+            continue
+        parts = [p.strip() for p in re.split(r"\s*[,|]\s*|\s+[-–—]\s+|\s+from\s+|\s+at\s+", _strip_dates(line)) if p.strip()]
+        institution = next((p for p in parts if _INSTITUTION.search(p)), None)
+        if institution is None and i + 1 < len(lines) and _INSTITUTION.search(lines[i + 1]) and not _DEGREE.search(lines[i + 1]):
+            institution = _strip_dates(lines[i + 1])
+        degree = next((p for p in parts if p != institution), parts[0] if parts else "NA")
+        entries.append({"degree": degree, "institution": institution or "NA"})
+    return entries
+
+
+def extract_skills(text: str) -> List[str]:
+    """
+    Canonical skill names in order of first mention. Section-only aliases
+    are matched in the Skills section(s).
+    """
+    found = []
+    for name, lines in _sections(text):
+        found.extend(skills_dictionary.find("\n".join(lines), skills_section=name == "skills"))
+    return list(dict.fromkeys(found))
+
+
+def extract(text: str) -> dict:
+    """
+    The ATS JSON (skills, experience, education) without a model call.
+    Experience and education come from their sections only; empty lists
+    when the resume has no such heading.
+    """
+    started = time.perf_counter()
+    sections = _sections(text)
+    skills = []
+    for name, lines in sections:
+        skills.extend(skills_dictionary.find("\n".join(lines), skills_section=name == "skills"))
+    # Headings are the first line of each block
+    experience = [e for name, lines in sections if name == "experience" for e in parse_experience(lines[1:])]
+    education = [e for name, lines in sections if name == "education" for e in parse_education(lines[1:])]
+    result = {"skills": list(dict.fromkeys(skills)), "experience": experience, "education": education}
+
+    _counters["documents"] += 1
+    _counters["skills_found"] += len(result["skills"])
+    _latency.record(time.perf_counter() - started)
+    return result
+
+
+def stats() -> dict:
+    return {**_counters, "dictionary_size": len(skills_dictionary.names), "latency": _latency.snapshot()}
+
+
+skills_dictionary = SkillsDictionary.load(settings.SKILLS_DICTIONARY_PATH)
+metrics.register("skills_extractor", stats)
@@ -1,26 +1,52 @@
 import os
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
+from typing import Union
+from app.services import http_transport
+from app.core.config import settings
 
 load_dotenv()
 
 API_TOKEN = os.getenv("HF_API_KEY")
 model_id = "openai/whisper-large-v3-turbo"
 
-def transcribe_audio(audio_bytes: bytes) -> str:
+def _stub_transcript(audio: Union[bytes, str]) -> str:
+    # STT_BACKEND=stub: deterministic placeholder, no network or API key needed
+    size = len(audio) if isinstance(audio, bytes) else os.path.getsize(audio)
+    return f"[stub transcript: {size} bytes]"
+
+def transcribe_audio(audio_bytes: Union[bytes, str]) -> str:
     """
-    Transcribes audio bytes to text using Hugging Face Inference API.
+    Transcribes audio (bytes or a file path) to text using Hugging Face Inference API.
     """
+    if settings.STT_BACKEND == "stub":
+        return _stub_transcript(audio_bytes)
+
     if not API_TOKEN:
         print("DEBUG: HF_API_KEY missing for STT")
         return "Error: API Key missing"
 
-    client = InferenceClient(token=API_TOKEN)
-
     try:
         # automatic-speech-recognition
-        response = client.automatic_speech_recognition(audio_bytes, model=model_id)
-        return response.text
+        response = http_transport.automatic_speech_recognition(audio_bytes, model=model_id)
+        return response.get("text", "")
+    except Exception as e:
+        print(f"DEBUG: STT Error: {e}")
+        return ""
+
+async def transcribe_audio_async(audio_bytes: Union[bytes, str]) -> str:
+    """
+    Async version of transcribe_audio (no threadpool hop).
+    """
+    if settings.STT_BACKEND == "stub":
+        return _stub_transcript(audio_bytes)
+
+    if not API_TOKEN:
+        print("DEBUG: HF_API_KEY missing for STT")
+        return "Error: API Key missing"
+
+    try:
+        response = await http_transport.aautomatic_speech_recognition(audio_bytes, model=model_id)
+        return response.get("text", "")
     except Exception as e:
         print(f"DEBUG: STT Error: {e}")
         return ""
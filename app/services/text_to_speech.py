@@ -1,10 +1,13 @@
 import os
 import io
+import re
+import asyncio
+import threading
 import soundfile as sf
-import uuid
 from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
 
 load_dotenv()
 
@@ -17,57 +20,285 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 AUDIO_DIR = BASE_DIR / "app" / "storage" / "audio"
 AUDIO_DIR.mkdir(parents=True, exist_ok=True)
 
-import traceback
 from gtts import gTTS
+from app.services.tts_cache import audio_cache, cache_key
+from app.services.singleflight import call_key, singleflight
+from app.services.audio_info import audio_duration, detect_format
 
-def speak_text(text: str, filename_prefix: str = "output") -> dict:
+TTS_ENGINE = "gtts"
+TTS_LANG = "en"
+STREAM_CHUNK_BYTES = 16 * 1024
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Cache writes scheduled off the response path, by clip key
+_pending_writes: Dict[str, asyncio.Future] = {}
+
+def clip_key(text: str) -> str:
+    return cache_key(text, TTS_LANG, TTS_ENGINE)
+
+def clip_relative_path(text: str) -> str:
+    return audio_cache.relative_path(clip_key(text))
+
+def speak_text(text: str, filename_prefix: str = "output", persist: bool = True) -> dict:
     """
     Converts text to speech. 
     Directly uses gTTS for faster response and reliability, avoiding HF Inference cold starts/timeouts.
+    Clips are content-addressed: the same text is synthesised once and then
+    served from the shared cache for every session (filename_prefix is only
+    used in logs).
+    Synthesis happens in memory; with persist=False nothing is written and
+    the result carries the MP3 bytes under "audio" instead of a path.
     """
+    key = clip_key(text)
+    hit = _cache_hit(key, filename_prefix)
+    if hit:
+        return hit
+
     # Direct fallback to gTTS for speed
-    return speak_text_gtts(text, filename_prefix)
+    result = speak_text_gtts(text, filename_prefix)
+    if result.get("valid") and persist:
+        _persist(key, result)
+    return result
+
+async def speak_text_async(text: str, filename_prefix: str = "output", persist: bool = True) -> dict:
+    """
+    speak_text for the event loop: the (network-bound) synthesis runs in the
+    threadpool and the cache write is scheduled in the background, so the
+    caller gets the clip's paths without waiting on the disk.
+    Concurrent requests for the same clip (any session) share one synthesis.
+    """
+    key = clip_key(text)
+    return await singleflight.do("tts", call_key(key, persist), _speak_text_async, key, text, filename_prefix, persist)
+
+async def _speak_text_async(key: str, text: str, filename_prefix: str, persist: bool) -> dict:
+    await _wait_for_write(key)
+    hit = await run_in_threadpool(_cache_hit, key, filename_prefix)
+    if hit:
+        return hit
+
+    result = await run_in_threadpool(speak_text_gtts, text, filename_prefix)
+    if result.get("valid") and persist:
+        audio = result.pop("audio")
+        result["file_path"] = str(audio_cache.path_for(key))
+        result["relative_path"] = audio_cache.relative_path(key)
+        _persist_in_background(key, audio, result["duration"])
+    return result
+
+def _cache_hit(key: str, filename_prefix: str) -> Optional[dict]:
+    cached = audio_cache.lookup(key)
+    if cached is None:
+        return None
+    print(f"DEBUG: TTS cache hit for {filename_prefix}", flush=True)
+    return {
+        "valid": True,
+        "file_path": str(cached),
+        "relative_path": audio_cache.relative_path(key),
+        "duration": audio_cache.duration(key),
+        "cached": True,
+    }
+
+def _persist(key: str, result: dict):
+    # The clip's only disk write; the in-memory bytes are not kept afterwards
+    audio_cache.store(key, result.pop("audio"), result["duration"])
+    result["file_path"] = str(audio_cache.path_for(key))
+    result["relative_path"] = audio_cache.relative_path(key)
+
+def _persist_in_background(key: str, audio: bytes, duration: float):
+    """
+    Writes a clip to the cache in the threadpool without holding up the
+    caller. The paths are content-addressed, so they can be handed out
+    before the write lands; the write is a local file of a few tens of KB,
+    done well before a client can fetch the URL.
+    """
+    write = asyncio.ensure_future(run_in_threadpool(audio_cache.store, key, audio, duration))
+    _pending_writes[key] = write
+
+    def finished(fut: asyncio.Future):
+        if _pending_writes.get(key) is fut:
+            del _pending_writes[key]
+        if not fut.cancelled() and fut.exception() is not None:
+            print(f"[TTS] Failed to cache clip {key[:12]}: {fut.exception()}")
+
+    write.add_done_callback(finished)
+
+async def _wait_for_write(key: str):
+    # A request right behind a fresh synthesis reads the clip from the
+    # cache instead of synthesising it again
+    write = _pending_writes.get(key)
+    if write is not None:
+        await asyncio.wait([write])
+
+async def flush_pending_writes():
+    """
+    Waits for scheduled cache writes (called on shutdown).
+    """
+    if _pending_writes:
+        await asyncio.wait(list(_pending_writes.values()))
+
+def split_sentences(text: str) -> list[str]:
+    return [s for s in SENTENCE_END.split(text.strip()) if s]
+
+def _synthesize_sentences(sentences: list[str], emit, cancelled: threading.Event):
+    # gTTS.stream() yields MP3 frames per request it makes, so the first
+    # bytes are ready after the first sentence, not the whole text.
+    for sentence in sentences:
+        for chunk in gTTS(text=sentence, lang=TTS_LANG).stream():
+            if cancelled.is_set():
+                return
+            emit(chunk)
+
+class _ClipStream:
+    """
+    One streamed synthesis, shared by every client streaming the same clip.
+    Chunks are kept as they arrive, so a client joining late replays them
+    and then follows live. The synthesis stops once the last client leaves.
+    """
+
+    def __init__(self, key: str, text: str, filename_prefix: str):
+        self.key = key
+        self.filename_prefix = filename_prefix
+        self.chunks: list[bytes] = []
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.listeners = 0
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._cancelled = threading.Event()
+        self.task = asyncio.ensure_future(self._run(text))
+
+    def _append(self, chunk: bytes):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _emit(self, chunk: bytes):
+        self._loop.call_soon_threadsafe(self._append, chunk)
+
+    async def _run(self, text: str):
+        print(f"DEBUG: Streaming gTTS for {self.filename_prefix}...", flush=True)
+        try:
+            await run_in_threadpool(_synthesize_sentences, split_sentences(text), self._emit, self._cancelled)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            if _streams.get(self.key) is self:
+                del _streams[self.key]
+            self._notify()
+        if self.error is None and not self._cancelled.is_set() and self.chunks:
+            audio = b"".join(self.chunks)
+            _persist_in_background(self.key, audio, audio_duration(audio))
+            print(f"DEBUG: Streamed gTTS complete for {self.filename_prefix}.", flush=True)
+
+    async def follow(self) -> AsyncIterator[bytes]:
+        sent = 0
+        while True:
+            while sent < len(self.chunks):
+                sent += 1
+                yield self.chunks[sent - 1]
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+    def leave(self):
+        self.listeners -= 1
+        if self.listeners == 0 and not self.done:
+            # Last client went away: stop the worker thread
+            self._cancelled.set()
+            self.task.cancel()
+
+# Streamed syntheses in progress, by clip key
+_streams: Dict[str, _ClipStream] = {}
+
+async def stream_speech(text: str, filename_prefix: str = "output") -> AsyncIterator[bytes]:
+    """
+    Yields MP3 bytes as they are synthesised, sentence by sentence, so the
+    client can start playback before the clip is complete. Synthesis runs in
+    a worker thread and stays ahead of the client. Once the whole clip has
+    been streamed it is persisted in the shared audio cache (same key as
+    speak_text), so replays and later sessions get the file.
+    - Concurrent streams of the same clip share one synthesis; a clip
+      already being synthesised by speak_text_async is awaited and then
+      streamed from the cache.
+    - A cached clip is streamed straight from disk (lookup, open and reads
+      in the threadpool).
+    - Closing the generator (client gone) stops the synthesis unless
+      another client is still streaming it.
+    """
+    key = clip_key(text)
+    stream = _streams.get(key)
+    if stream is None:
+        if singleflight.in_flight("tts", call_key(key, True)):
+            await speak_text_async(text, filename_prefix)
+        await _wait_for_write(key)
+        cached = await run_in_threadpool(audio_cache.lookup, key)
+        if cached is not None:
+            print(f"DEBUG: TTS cache hit for {filename_prefix} (stream)", flush=True)
+            f = await run_in_threadpool(open, cached, "rb")
+            try:
+                while chunk := await run_in_threadpool(f.read, STREAM_CHUNK_BYTES):
+                    yield chunk
+            finally:
+                await run_in_threadpool(f.close)
+            return
+        # Another client may have started streaming it while we looked
+        stream = _streams.get(key)
+        if stream is None:
+            stream = _streams[key] = _ClipStream(key, text, filename_prefix)
 
-    # Legacy HF Code (Commented out for performance)
-    # if not API_TOKEN:
-    #     print("DEBUG: HF_API_KEY not set. Using gTTS fallback.", flush=True)
-    #     return speak_text_gtts(text, filename_prefix)
-    # ...
+    stream.listeners += 1
+    try:
+        async for chunk in stream.follow():
+            yield chunk
+    finally:
+        stream.leave()
 
-def speak_text_gtts(text: str, filename_prefix: str) -> dict:
+def speak_text_gtts(text: str, filename_prefix: str = "output") -> dict:
+    """
+    Synthesises into a memory buffer. Returns the MP3 bytes and their
+    duration (from the frame headers); persisting is up to the caller.
+    """
     try:
-        print("DEBUG: Starting gTTS generation...", flush=True)
-        tts = gTTS(text=text, lang='en')
-        filename = f"{filename_prefix}_gtts.mp3" 
-        filepath = AUDIO_DIR / filename
-        
-        print(f"DEBUG: Saving gTTS to {filepath}...", flush=True)
-        tts.save(str(filepath))
-        print("DEBUG: gTTS save complete.", flush=True)
-
-        
-        # Duration check with soundfile supports mp3 if libsndfile supports it, otherwise generic check or skip.
-        # valid=True is enough.
+        print(f"DEBUG: Starting gTTS generation for {filename_prefix}...", flush=True)
+        tts = gTTS(text=text, lang=TTS_LANG)
+        buffer = io.BytesIO()
+        tts.write_to_fp(buffer)
+        audio = buffer.getvalue()
+        print("DEBUG: gTTS generation complete.", flush=True)
+
         return {
             "valid": True,
-            "file_path": str(filepath),
-            "relative_path": f"/storage/audio/{filename}",
-            "duration": 0.0 # Unknown without extra lib
+            "audio": audio,
+            "duration": round(audio_duration(audio), 3),
         }
     except Exception as e:
          return {"valid": False, "error": f"gTTS Error: {str(e)}"}
 
 def save_audio(audio_bytes: bytes, filename: str) -> dict:
+    """
+    Stores a clip under app/storage/audio. Bytes already in the format the
+    filename asks for are written as-is (duration from the headers); only a
+    format change goes through a decode/encode.
+    """
     filepath = AUDIO_DIR / filename
-    with io.BytesIO(audio_bytes) as bio:
-        audio_data, samplerate = sf.read(bio)
-        sf.write(str(filepath), audio_data, samplerate)
-        info = sf.info(str(filepath))
-        return {
-            "valid": True,
-            "file_path": str(filepath),
-            "relative_path": f"/storage/audio/{filename}",
-            "duration": float(info.duration)
-        }
-
-
+    if detect_format(audio_bytes) == filepath.suffix.lstrip(".").lower():
+        filepath.write_bytes(audio_bytes)
+        duration = audio_duration(audio_bytes)
+    else:
+        with io.BytesIO(audio_bytes) as bio:
+            audio_data, samplerate = sf.read(bio)
+        out = io.BytesIO()
+        sf.write(out, audio_data, samplerate, format=filepath.suffix.lstrip(".").upper())
+        filepath.write_bytes(out.getvalue())
+        duration = len(audio_data) / samplerate
+    return {
+        "valid": True,
+        "file_path": str(filepath),
+        "relative_path": f"/storage/audio/{filename}",
+        "duration": float(duration)
+    }
@@ -0,0 +1,181 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services import metrics
+from app.services.audio_info import audio_duration
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+CACHE_DIR = BASE_DIR / "app" / "storage" / "audio" / "cache"
+
+
+def normalize_text(text: str) -> str:
+    # Case is kept: gTTS reads "SQL" and "sql" differently.
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(text: str, lang: str, engine: str) -> str:
+    return hashlib.sha256(f"{engine}|{lang}|{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Content-addressed store for synthesised clips, shared by every session
+    and every worker process. Each clip lives once at
+    cache/<2 hex>/<sha256>.mp3.
+    - The directory is the only index: lookups stat the file, and the size
+      cap is checked against a scan of the directory, so it holds for the
+      shared cache rather than once per process. A scan runs when this
+      process's running estimate crosses the cap, or RESCAN_INTERVAL after
+      the last one.
+    - Recency is the file's mtime (bumped on every hit, by any process);
+      the least recently used clips are deleted first.
+    - A clip used within grace_seconds is never deleted: a live session may
+      still fetch it by URL. While every clip is that recent the cap can be
+      exceeded (counted under over_cap).
+    """
+
+    RESCAN_INTERVAL = 60.0
+
+    def __init__(self, root: Path, max_bytes: int, grace_seconds: float):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.grace_seconds = grace_seconds
+        self._durations: Dict[str, float] = {}
+        self._scanned_total = 0      # bytes on disk at the last scan
+        self._scanned_entries = 0
+        self._added_since_scan = 0   # bytes this process wrote since
+        self._scanned_at = float("-inf")
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "bytes_saved": 0, "evictions": 0, "over_cap": 0}
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.mp3"
+
+    def relative_path(self, key: str) -> str:
+        return f"/storage/audio/cache/{key[:2]}/{key}.mp3"
+
+    def lookup(self, key: str) -> Optional[Path]:
+        path = self.path_for(key)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            with self._lock:
+                self.counters["misses"] += 1
+            return None
+        with self._lock:
+            self.counters["hits"] += 1
+            self.counters["bytes_saved"] += size
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def add(self, key: str):
+        """
+        Registers a clip that has just been written to path_for(key), and
+        evicts if the shared directory may be over the cap.
+        """
+        size = self.path_for(key).stat().st_size
+        with self._lock:
+            self._added_since_scan += size
+            due = (
+                self._scanned_total + self._added_since_scan > self.max_bytes
+                or time.monotonic() - self._scanned_at >= self.RESCAN_INTERVAL
+            )
+        if due:
+            self._evict(keep=key)
+
+    def store(self, key: str, data: bytes, duration: Optional[float] = None):
+        """
+        Writes a clip produced in memory (e.g. by a streamed synthesis) and
+        registers it. Written to a temp file and renamed into place.
+        """
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        if duration is not None:
+            self._durations[key] = duration
+        self.add(key)
+
+    def duration(self, key: str) -> float:
+        """
+        Clip length in seconds, from the MP3 headers (memoised per key).
+        """
+        if key not in self._durations:
+            try:
+                self._durations[key] = round(audio_duration(self.path_for(key).read_bytes()), 3)
+            except OSError:
+                return 0.0
+        return self._durations[key]
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        files = []
+        for path in self.root.glob("*/*.mp3"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # evicted by another process mid-scan
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        return files
+
+    def _evict(self, keep: str):
+        if not self._evict_lock.acquire(blocking=False):
+            return  # another thread is already scanning
+        try:
+            files = sorted(self._scan())
+            total = sum(size for _, _, size in files)
+            entries = len(files)
+            cutoff = time.time() - self.grace_seconds
+            for mtime, key, size in files:
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                if mtime >= cutoff:
+                    # Oldest first: everything left is within the grace period
+                    self.counters["over_cap"] += 1
+                    break
+                try:
+                    self.path_for(key).unlink()
+                    self.counters["evictions"] += 1
+                except FileNotFoundError:
+                    pass  # another process evicted it first
+                self._durations.pop(key, None)
+                total -= size
+                entries -= 1
+            with self._lock:
+                self._scanned_total, self._scanned_entries = total, entries
+                self._added_since_scan = 0
+                self._scanned_at = time.monotonic()
+        finally:
+            self._evict_lock.release()
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": self._scanned_entries,
+            "bytes_stored": self._scanned_total + self._added_since_scan,
+            "max_bytes": self.max_bytes,
+            "grace_seconds": self.grace_seconds,
+        }
+
+
+audio_cache = AudioCache(CACHE_DIR, settings.TTS_CACHE_MAX_BYTES, settings.TTS_CACHE_GRACE_SECONDS)
+metrics.register("tts_cache", audio_cache.stats)
@@ -0,0 +1,194 @@
+import asyncio
+import itertools
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services import metrics, text_to_speech
+from app.services.session_manager import session_manager
+
+JobKey = Tuple[str, int]
+
+
+class TTSJob:
+    __slots__ = ("session_id", "index", "text", "future", "urgent", "enqueued_at", "seq")
+
+    def __init__(self, session_id: str, index: int, text: str, future: asyncio.Future, urgent: bool, seq: int):
+        self.session_id = session_id
+        self.index = index
+        self.text = text
+        self.future = future
+        self.urgent = urgent
+        self.enqueued_at = time.perf_counter()
+        self.seq = seq
+
+
+class TTSScheduler:
+    """
+    Process-wide TTS work queue.
+    - At most `concurrency` syntheses run at once, across all sessions.
+    - The next job is the one needed soonest: urgent requests (a user is
+      waiting on /interview/next) first, then the smallest distance between
+      the question index and its session's current index.
+    - A session's current index is the last one requested urgently (the
+      question the user is on), tracked here rather than read from the
+      session store on every pick.
+    - Jobs are keyed by (session, index); asking for a queued or running job
+      returns the same future instead of synthesising the clip twice.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(1, concurrency)
+        self._jobs: Dict[JobKey, TTSJob] = {}      # queued or running
+        self._queued: Dict[JobKey, TTSJob] = {}    # waiting for a worker
+        self._progress: Dict[str, int] = {}        # session -> current index
+        self._per_session = Counter()              # session -> jobs queued or running
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers = []
+        self._seq = itertools.count()
+        self.running = 0
+        self.counters = {"submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0, "cancelled": 0}
+        self.wait_time = metrics.LatencyStats()
+        self.run_time = metrics.LatencyStats()
+
+    def _ensure_workers(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.concurrency:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    def submit(self, session_id: str, index: int, text: str, urgent: bool = False) -> asyncio.Future:
+        """
+        Queues synthesis of question `index` for a session (or joins the
+        pending job). The future resolves to speak_text()'s result dict.
+        """
+        self._ensure_workers()
+        key = (session_id, index)
+        job = self._jobs.get(key)
+        if job is not None:
+            self.counters["deduplicated"] += 1
+            job.urgent = job.urgent or urgent
+            return job.future
+
+        job = TTSJob(session_id, index, text, asyncio.get_running_loop().create_future(), urgent, next(self._seq))
+        self._jobs[key] = job
+        self._per_session[session_id] += 1
+        self._progress.setdefault(session_id, 0)
+        self._queued[key] = job
+        self.counters["submitted"] += 1
+        self._wakeup.set()
+        return job.future
+
+    def prefetch(self, session_id: str, index: int, text: str):
+        """
+        submit() for callers that don't wait on the clip: failures are
+        logged by the worker (and retrieved here so asyncio doesn't warn).
+        """
+        self.submit(session_id, index, text).add_done_callback(
+            lambda future: future.cancelled() or future.exception()
+        )
+
+    async def request(self, session_id: str, index: int, text: str) -> dict:
+        """
+        For a caller that needs the audio now: jumps the queue, or awaits
+        the job already in flight for the same question. `index` becomes
+        the session's current index for prioritising its prefetches.
+        """
+        future = self.submit(session_id, index, text, urgent=True)
+        self._progress[session_id] = max(index, self._progress.get(session_id, 0))
+        return await asyncio.shield(future)
+
+    def pending(self, session_id: str, index: int) -> bool:
+        """
+        Whether question `index` of a session is queued or being synthesised.
+        """
+        return (session_id, index) in self._jobs
+
+    def cancel_session(self, session_id: str) -> int:
+        """
+        Drops a discarded session's queued jobs (their futures are
+        cancelled); a job already running finishes. Returns how many.
+        """
+        dropped = [job for key, job in self._queued.items() if key[0] == session_id]
+        for job in dropped:
+            del self._queued[(job.session_id, job.index)]
+            self._finished(job)
+            job.future.cancel()
+        self.counters["cancelled"] += len(dropped)
+        return len(dropped)
+
+    def _priority(self, job: TTSJob):
+        distance = job.index - self._progress.get(job.session_id, 0)
+        if distance < 0:
+            # Already answered: nobody will play it, do it last
+            distance = float("inf")
+        return (not job.urgent, distance, job.seq)
+
+    def _finished(self, job: TTSJob):
+        self._jobs.pop((job.session_id, job.index), None)
+        self._per_session[job.session_id] -= 1
+        if self._per_session[job.session_id] <= 0:
+            del self._per_session[job.session_id]
+            self._progress.pop(job.session_id, None)
+
+    def _next_job(self) -> Optional[TTSJob]:
+        if not self._queued:
+            return None
+        job = min(self._queued.values(), key=self._priority)
+        del self._queued[(job.session_id, job.index)]
+        return job
+
+    async def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            self.wait_time.record(time.perf_counter() - job.enqueued_at)
+            self.running += 1
+            started = time.perf_counter()
+            try:
+                result = await text_to_speech.speak_text_async(job.text, f"q_{job.session_id}_{job.index}")
+            except Exception as e:
+                result = {"valid": False, "error": str(e)}
+            finally:
+                self.running -= 1
+                self.run_time.record(time.perf_counter() - started)
+                self._finished(job)
+
+            try:
+                if result.get("valid"):
+                    await run_in_threadpool(session_manager.set_cached_audio, job.session_id, job.index, result["relative_path"])
+                    self.counters["completed"] += 1
+                else:
+                    print(f"[TTS] Failed audio for {job.session_id} Q{job.index + 1}: {result.get('error')}")
+                    self.counters["failed"] += 1
+            except Exception as e:
+                print(f"[TTS] Could not record audio for {job.session_id} Q{job.index + 1}: {e}")
+                self.counters["failed"] += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                # Every awaiting caller gets an answer, whatever happened above
+                if not job.future.done():
+                    job.future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": len(self._queued),
+            "running": self.running,
+            **self.counters,
+            "wait_time": self.wait_time.snapshot(),
+            "run_time": self.run_time.snapshot(),
+        }
+
+
+tts_scheduler = TTSScheduler(settings.TTS_CONCURRENCY)
+metrics.register("tts_scheduler", tts_scheduler.stats)
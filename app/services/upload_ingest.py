@@ -0,0 +1,120 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Optional, Union
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+
+class IngestedUpload:
+    """
+    An upload that has been streamed off the request.
+    Small files stay in memory (as one immutable bytes object, handed out
+    without copying); anything over UPLOAD_SPOOL_BYTES lives in a temp file
+    so parsers (and worker processes) can open it by path.
+    The SHA-256 is computed while streaming, so callers never re-hash.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename or ""
+        self.size = 0
+        self.sha256 = ""
+        self.path: Optional[str] = None
+        self._buffer: Optional[bytearray] = bytearray()  # while streaming
+        self._data: Optional[bytes] = None                 # once complete
+        self._file = None
+        self._owned = True  # False once save_to() hands the temp file to the caller
+
+    def source(self) -> Union[str, bytes]:
+        """
+        What to hand a parser: a file path when spooled to disk, else the bytes.
+        """
+        if self.path:
+            return self.path
+        return self._data
+
+    def save_to(self, dest: str):
+        """
+        Persists the upload. Spooled files are moved rather than copied.
+        """
+        if self.path:
+            shutil.move(self.path, dest)
+            self.path = dest
+            self._owned = False
+        else:
+            with open(dest, "wb") as f:
+                f.write(self._data)
+
+    def close(self):
+        if self.path and self._owned:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        self._buffer = None
+        self._data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds the {max_bytes} byte limit")
+
+
+async def ingest_upload(file: UploadFile, max_bytes: int = None) -> IngestedUpload:
+    """
+    Streams an UploadFile in chunks into an IngestedUpload, hashing as it goes.
+    Raises 413 as soon as the limit is crossed instead of after a full read.
+    """
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    size = getattr(file, "size", None)
+    if size is not None and size > max_bytes:
+        raise _too_large(max_bytes)
+
+    upload = IngestedUpload(file.filename)
+    digest = hashlib.sha256()
+    try:
+        while True:
+            chunk = await file.read(settings.UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            upload.size += len(chunk)
+            if upload.size > max_bytes:
+                raise _too_large(max_bytes)
+            digest.update(chunk)
+
+            if upload._file is None and upload.size > settings.UPLOAD_SPOOL_BYTES:
+                # Roll over to disk; from here on writes go through the threadpool.
+                suffix = os.path.splitext(upload.filename)[1]
+                upload._file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+                upload.path = upload._file.name
+                await run_in_threadpool(upload._file.write, upload._buffer)
+                upload._buffer = None
+
+            if upload._file is not None:
+                await run_in_threadpool(upload._file.write, chunk)
+            else:
+                upload._buffer.extend(chunk)
+    except BaseException:
+        if upload._file is not None:
+            upload._file.close()
+        upload.close()
+        raise
+
+    if upload._file is not None:
+        upload._file.close()
+        upload._file = None
+    else:
+        # The one copy of an in-memory upload; source() returns it as is
+        upload._data = bytes(upload._buffer)
+        upload._buffer = None
+    upload.sha256 = digest.hexdigest()
+    return upload
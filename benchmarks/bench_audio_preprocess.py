@@ -0,0 +1,84 @@
+"""
+Benchmark: answer audio pre-processing (VAD trim, mono, 16 kHz FLAC).
+
+Usage:
+    python -m benchmarks.bench_audio_preprocess [recordings_dir] [--iterations 20]
+
+Without a directory it synthesises a fixture set shaped like browser
+recordings: 48 kHz / 44.1 kHz stereo WAV, a few seconds of "speech"
+(amplitude-modulated harmonics) with long leading and trailing room noise.
+Any .wav/.flac/.ogg/.mp3 files in recordings_dir are benchmarked as well.
+Reports, per recording, bytes and seconds removed and processing time.
+"""
+import argparse
+import io
+import time
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from app.services import audio_preprocess
+
+AUDIO_SUFFIXES = {".wav", ".flac", ".ogg", ".mp3"}
+
+
+def synth_recording(rate: int, lead: float, speech: float, tail: float, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    total = int((lead + speech + tail) * rate)
+    noise = rng.normal(0, 0.003, size=(total, 2))
+
+    t = np.arange(int(speech * rate)) / rate
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))  # ~4 syllables/s
+    voice = 0.2 * voice * syllables
+
+    start = int(lead * rate)
+    noise[start: start + len(voice)] += voice[:, None]
+    buffer = io.BytesIO()
+    sf.write(buffer, noise.astype(np.float32), rate, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def fixtures(directory=None):
+    cases = [
+        ("48k_stereo_short", synth_recording(48000, 2.0, 4.0, 3.0, 1)),
+        ("48k_stereo_long", synth_recording(48000, 4.0, 30.0, 6.0, 2)),
+        ("44k1_stereo", synth_recording(44100, 1.5, 12.0, 2.5, 3)),
+        ("48k_no_silence", synth_recording(48000, 0.0, 10.0, 0.0, 4)),
+    ]
+    if directory:
+        for path in sorted(Path(directory).iterdir()):
+            if path.suffix.lower() in AUDIO_SUFFIXES:
+                cases.append((path.name, path.read_bytes()))
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("recordings_dir", nargs="?")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'recording':<24} {'bytes in':>10} {'bytes out':>10} {'sec in':>7} {'sec out':>7} {'ms':>7}")
+    total_in = total_out = 0
+    for name, audio in fixtures(args.recordings_dir):
+        prepared = audio_preprocess.prepare_for_stt(audio)
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            audio_preprocess.prepare_for_stt(audio)
+        per_call = (time.perf_counter() - start) / args.iterations * 1000
+        total_in += prepared.bytes_in
+        total_out += prepared.bytes_out
+        print(
+            f"{name:<24} {prepared.bytes_in:>10} {prepared.bytes_out:>10} "
+            f"{prepared.seconds_in:>7.2f} {prepared.seconds_out:>7.2f} {per_call:>7.1f}"
+        )
+
+    print(f"\nUploaded to STT: {total_out / max(total_in, 1):.1%} of the original bytes")
+
+
+if __name__ == "__main__":
+    main()
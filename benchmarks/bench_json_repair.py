@@ -0,0 +1,53 @@
+"""
+Regression + speed benchmark for the local JSON repair pipeline.
+
+Usage:
+    python -m benchmarks.bench_json_repair [--iterations 2000]
+
+Every fixture in fixtures/broken_json.json is a real-world shape of broken
+model output. Each one must parse, and must be recovered by the expected
+strategy (a cheaper strategy is also accepted). Exits non-zero on failure.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from app.json_utils import STRATEGIES, JSONRepairError, repair_json
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "broken_json.json"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    fixtures = json.loads(FIXTURES.read_text())
+    failures = 0
+    print(f"{'fixture':<28} {'strategy':<18} {'us/call':>8}")
+    for fixture in fixtures:
+        try:
+            parsed, strategy = repair_json(fixture["raw"])
+        except JSONRepairError:
+            print(f"{fixture['name']:<28} FAILED")
+            failures += 1
+            continue
+        if STRATEGIES.index(strategy) > STRATEGIES.index(fixture["expect"]) or not isinstance(parsed, dict):
+            print(f"{fixture['name']:<28} {strategy:<18} (expected {fixture['expect']})")
+            failures += 1
+            continue
+
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            repair_json(fixture["raw"])
+        per_call = (time.perf_counter() - start) / args.iterations * 1e6
+        print(f"{fixture['name']:<28} {strategy:<18} {per_call:>8.1f}")
+
+    print(f"\n{len(fixtures) - failures}/{len(fixtures)} fixtures recovered locally")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
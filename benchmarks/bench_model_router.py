@@ -0,0 +1,120 @@
+"""
+Benchmark: model router (latency ranking, hedging, circuit breaking)
+against local fake model servers.
+
+Usage:
+    python -m benchmarks.bench_model_router [--requests 300] [--concurrency 16]
+
+Starts two fake OpenAI-style servers (benchmarks/fake_model_server.py),
+"fake/primary" (~200 ms) and "fake/secondary" (~300 ms), and routes a
+"bench" task over them. The same load runs through four phases, each once
+calling the primary directly (what every module did with its hard-coded
+MODEL_ID) and once through the router:
+  healthy   both servers normal
+  tail      10% of the primary's calls take 2 s
+  outage    the primary returns 503 to everything
+  recovered the primary is back (after the breaker cooldown)
+Reports latency percentiles, errors, how calls were split between the
+models, and the router's hedges, failovers and breaker trips per phase.
+Router state carries over between phases, as it would in a worker.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from app.core.config import settings
+from app.services import http_transport, metrics
+from app.services.model_router import ModelRouter
+from benchmarks.fake_model_server import FakeModel, serve
+
+PRIMARY, SECONDARY = "fake/primary", "fake/secondary"
+PAYLOAD = {"model": PRIMARY, "messages": [{"role": "user", "content": "ping"}], "max_tokens": 50}
+
+PHASES = (
+    ("healthy", {}),
+    ("tail", {"slow_rate": 0.1, "slow": 2.0}),
+    ("outage", {"slow_rate": 0.0, "error_rate": 1.0}),
+    ("recovered", {"error_rate": 0.0}),
+)
+
+
+async def run(call, requests: int, concurrency: int) -> tuple:
+    latency, errors, served = metrics.LatencyStats(requests), 0, Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                body = await call()
+                served[body.get("model")] += 1
+            except Exception:
+                errors += 1
+            latency.record(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latency.snapshot(), errors, served
+
+
+def report(phase: str, mode: str, latency: dict, errors: int, served: Counter, requests: int, extra: str = ""):
+    split = " ".join(f"{model.split('/')[1]}={count / requests:.0%}" for model, count in sorted(served.items()))
+    print(
+        f"{phase:<10} {mode:<7} {latency.get('p50_ms', 0):>7} {latency.get('p95_ms', 0):>7} "
+        f"{latency.get('p99_ms', 0):>7} {latency.get('max_ms', 0):>7} {errors:>6}  {split} {extra}"
+    )
+
+
+async def main_async(args):
+    primary, secondary = FakeModel(latency=0.2, jitter=0.05), FakeModel(latency=0.3, jitter=0.05)
+    servers = [serve(primary), serve(secondary)]
+    settings.MODEL_ENDPOINTS = (
+        f"{PRIMARY}=http://127.0.0.1:{servers[0].server_port},"
+        f"{SECONDARY}=http://127.0.0.1:{servers[1].server_port}"
+    )
+    settings.MODEL_ROUTES = f"bench={PRIMARY}|{SECONDARY}"
+    settings.MODEL_ROUTER_ENABLED = True
+    settings.ROUTER_BREAKER_COOLDOWN = args.cooldown
+    settings.ROUTER_STALE_SECONDS = max(args.cooldown, 1.0)
+    settings.HTTP_BACKOFF_MAX = 1.0
+    router = ModelRouter()
+
+    print(f"{'phase':<10} {'mode':<7} {'p50_ms':>7} {'p95_ms':>7} {'p99_ms':>7} {'max_ms':>7} {'errors':>6}  served")
+    for phase, changes in PHASES:
+        primary.configure(**changes)
+        if phase == "recovered":
+            await asyncio.sleep(args.cooldown)
+
+        direct = await run(lambda: http_transport.achat_completion(dict(PAYLOAD)), args.requests, args.concurrency)
+        report(phase, "direct", *direct, args.requests)
+
+        before = dict(router.counters["bench"])
+        trips = sum(b.trips for b in router._breakers.values())
+        routed = await run(lambda: router.achat("bench", dict(PAYLOAD)), args.requests, args.concurrency)
+        after = router.counters["bench"]
+        delta = {k: after[k] - before.get(k, 0) for k in ("hedges", "failovers", "forced")}
+        delta["trips"] = sum(b.trips for b in router._breakers.values()) - trips
+        report(phase, "routed", *routed, args.requests, " ".join(f"{k}={v}" for k, v in delta.items()))
+
+    print()
+    for model, stats in router.stats()["tasks"]["bench"]["models"].items():
+        print(f"{model}: ewma {stats['ewma_ms']} ms, error rate {stats['error_rate']}, "
+              f"hedge wins {stats['hedge_wins']}, cancelled {stats['cancelled']}")
+    print(f"breakers: {router.stats()['breakers']}")
+    await http_transport.aclose()
+    for server in servers:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--cooldown", type=float, default=2.0, help="breaker cooldown (s)")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: question bank retrieval.
+
+Usage:
+    python -m benchmarks.bench_question_bank [--size 20000] [--lookups 200]
+
+Fills a throwaway bank (a temp directory, not QUESTION_BANK_DIR) with
+--size synthetic questions built from templates over the skills
+dictionary, then looks up questions for every resume in
+fixtures/resumes.json, with the profile extracted by the fast skills
+extractor. Reports append throughput, lookup latency percentiles, the hit
+rate, and the questions picked for each resume, so the diversification
+can be eyeballed.
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app.core.config import settings
+from app.services import metrics, skills_extractor
+from app.services.question_bank import QuestionBank
+from app.services.skills_extractor import skills_dictionary
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "resumes.json"
+
+TEMPLATES = (
+    "How have you used {a} in production, and what problems did it solve?",
+    "What are the trade-offs between {a} and {b}?",
+    "Walk me through debugging a performance issue in a {a} application.",
+    "How would you design a service using {a} and {b} to handle a traffic spike?",
+    "What testing strategy do you follow for code written in {a}?",
+    "Explain a difficult bug you fixed involving {a}.",
+    "How do you keep a {a} codebase maintainable as the team grows?",
+    "How would you migrate an existing system from {b} to {a}?",
+    "What security concerns do you consider when working with {a}?",
+    "How do you monitor and troubleshoot {a} in production?",
+)
+
+
+def synthetic_questions(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    names = sorted(skills_dictionary.names)
+    questions = set()
+    while len(questions) < count:
+        a, b = rng.sample(names, 2)
+        questions.add(rng.choice(TEMPLATES).format(a=a, b=b) + f" (#{len(questions)})")
+    return list(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=10)
+    args = parser.parse_args()
+
+    settings.QUESTION_BANK_ENABLED = True
+    with tempfile.TemporaryDirectory() as directory:
+        bank = QuestionBank(directory)
+        questions = synthetic_questions(args.size)
+        started = time.perf_counter()
+        for i in range(0, len(questions), 10):
+            bank.add(questions[i: i + 10])
+        elapsed = time.perf_counter() - started
+        print(f"banked {len(bank._questions)} questions in {elapsed:.1f}s "
+              f"({len(bank._questions) / elapsed:.0f}/s, {bank.counters['duplicates']} near-duplicates skipped)")
+
+        # Re-open from disk, as a fresh worker would
+        bank = QuestionBank(directory)
+        profiles = [
+            (fixture["name"], skills_extractor.extract(fixture["text"]))
+            for fixture in json.loads(FIXTURES.read_text())
+        ]
+        for name, profile in profiles:
+            picked = bank.lookup(profile, args.questions)
+            print(f"\n{name}: {', '.join(profile['skills'][:8]) or '-'}")
+            for question in picked or ["(miss: would call the LLM)"]:
+                print(f"  - {question}")
+
+        latency = metrics.LatencyStats()
+        for i in range(args.lookups):
+            started = time.perf_counter()
+            bank.lookup(profiles[i % len(profiles)][1], args.questions)
+            latency.record(time.perf_counter() - started)
+        print(f"\nlookup over {len(bank._questions)} questions: {latency.snapshot()}")
+        print(f"bank stats: {json.dumps(bank.stats())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: resume text compaction before LLM parsing.
+
+Usage:
+    python -m benchmarks.bench_resume_compact [resumes_dir] [--budget 2500] [--iterations 200]
+
+Runs resume_compact.compact() over fixtures/resumes.json (anonymised
+resume layouts: multi-page PDFs with running headers/footers and page
+numbers, inline contact blocks, headingless free text) and over any
+.pdf/.docx/.txt files in resumes_dir, extracted the same way as uploads.
+Reports estimated input tokens before/after, the sections kept and
+dropped, and compaction time. Fixtures also list text that must survive
+(skills, employers, schools) and text that must be gone (contact details,
+footers, hobbies); exits non-zero if any check fails. The must-survive
+checks are skipped for a resume that had to be truncated to fit --budget.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from app.services import resume_compact, resume_parser
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "resumes.json"
+RESUME_SUFFIXES = {".pdf", ".docx", ".txt"}
+
+
+def load_corpus(directory: str) -> list:
+    corpus = [dict(f) for f in json.loads(FIXTURES.read_text())]
+    if directory:
+        for path in sorted(Path(directory).iterdir()):
+            if path.suffix.lower() not in RESUME_SUFFIXES:
+                continue
+            if path.suffix.lower() == ".txt":
+                text = path.read_text(errors="ignore")
+            else:
+                text = resume_parser.extract_resume_text(path.name, str(path))
+            corpus.append({"name": path.name, "text": text})
+    return corpus
+
+
+def check(document: dict, result) -> list:
+    # Under a budget too small for the whole resume, losing text is expected
+    keep = [] if result.truncated else document.get("keep", [])
+    problems = [f"lost {s!r}" for s in keep if s not in result.text]
+    problems += [f"kept {s!r}" for s in document.get("drop", []) if s in result.text]
+    problems += [f"no {s} section" for s in document.get("sections", []) if s not in result.sections]
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("resumes_dir", nargs="?")
+    parser.add_argument("--budget", type=int, default=None)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.resumes_dir)
+    failures = 0
+    total_before = total_after = 0
+    print(f"{'resume':<32} {'tokens':>7} {'after':>6} {'saved':>6} {'ms':>6}  sections (dropped)")
+    for document in corpus:
+        result = resume_compact.compact(document["text"], args.budget)
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            resume_compact.compact(document["text"], args.budget)
+        per_call = (time.perf_counter() - started) / args.iterations * 1000
+
+        total_before += result.tokens_before
+        total_after += result.tokens_after
+        saved = 1 - result.tokens_after / result.tokens_before if result.tokens_before else 0
+        sections = ",".join(result.sections) or "-"
+        dropped = ",".join(result.dropped)
+        print(
+            f"{document['name'][:32]:<32} {result.tokens_before:>7} {result.tokens_after:>6} "
+            f"{saved:>6.0%} {per_call:>6.2f}  {sections}{f' ({dropped})' if dropped else ''}"
+            f"{' [truncated]' if result.truncated else ''}"
+        )
+        for problem in check(document, result):
+            print(f"    FAIL: {problem}")
+            failures += 1
+
+    saved = 1 - total_after / total_before if total_before else 0
+    print(f"\n{len(corpus)} resumes: {total_before} -> {total_after} estimated input tokens ({saved:.0%} saved)")
+    resume_parser.shutdown_pool()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: local skills extraction (/parse/parse-ats?mode=fast) against
+the LLM parse.
+
+Usage:
+    python -m benchmarks.bench_skills_extract [--iterations 200] [--llm]
+
+Each resume in fixtures/resumes.json carries a hand-labelled reference
+skills list. For every resume this reports precision/recall of the fast
+extractor against that reference and its time per call. With --llm (needs
+HF_API_KEY) the same resumes also go through resume_ai.convert_resume_to_json,
+reporting the LLM's precision/recall and latency, and how much of the LLM's
+skills list the fast path reproduces. The LLM call runs with SKILLS_PREFILL
+off, so its list is its own. Skill names are compared after alias
+normalisation ("JS" == "JavaScript").
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from app.core.config import settings
+from app.services import skills_extractor
+from app.services.skills_extractor import skills_dictionary
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "resumes.json"
+
+
+def canonical_set(skills: list) -> set:
+    return {skills_dictionary.canonical(s) or s.strip().lower() for s in skills if isinstance(s, str)}
+
+
+def precision_recall(found: set, expected: set) -> tuple:
+    hits = len(found & expected)
+    precision = hits / len(found) if found else 1.0
+    recall = hits / len(expected) if expected else 1.0
+    return precision, recall
+
+
+def run_llm(text: str) -> tuple:
+    from app.services import resume_ai
+    settings.SKILLS_PREFILL = False
+    started = time.perf_counter()
+    parsed = resume_ai.convert_resume_to_json(text)
+    return parsed.get("skills", []) if isinstance(parsed, dict) else [], time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--llm", action="store_true", help="also run the LLM parse (network, HF_API_KEY)")
+    args = parser.parse_args()
+
+    fixtures = json.loads(FIXTURES.read_text())
+    totals = {"fast": [0, 0, 0.0], "llm": [0, 0, 0.0]}  # hits, found, seconds
+    expected_total = 0
+    header = f"{'resume':<30} {'fast P':>7} {'fast R':>7} {'fast ms':>8}"
+    if args.llm:
+        header += f" {'llm P':>7} {'llm R':>7} {'llm ms':>8} {'agree':>6}"
+    print(header)
+
+    for fixture in fixtures:
+        expected = canonical_set(fixture["skills"])
+        expected_total += len(expected)
+
+        fast = canonical_set(skills_extractor.extract_skills(fixture["text"]))
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            skills_extractor.extract(fixture["text"])
+        fast_seconds = (time.perf_counter() - started) / args.iterations
+        precision, recall = precision_recall(fast, expected)
+        totals["fast"][0] += len(fast & expected)
+        totals["fast"][1] += len(fast)
+        totals["fast"][2] += fast_seconds
+        line = f"{fixture['name'][:30]:<30} {precision:>7.0%} {recall:>7.0%} {fast_seconds * 1000:>8.2f}"
+
+        if args.llm:
+            llm_skills, llm_seconds = run_llm(fixture["text"])
+            llm = canonical_set(llm_skills)
+            precision, recall = precision_recall(llm, expected)
+            agreement = len(fast & llm) / len(llm) if llm else 1.0
+            totals["llm"][0] += len(llm & expected)
+            totals["llm"][1] += len(llm)
+            totals["llm"][2] += llm_seconds
+            line += f" {precision:>7.0%} {recall:>7.0%} {llm_seconds * 1000:>8.0f} {agreement:>6.0%}"
+        print(line)
+
+    print()
+    for name, (hits, found, seconds) in totals.items():
+        if name == "llm" and not args.llm:
+            continue
+        precision = hits / found if found else 1.0
+        recall = hits / expected_total if expected_total else 1.0
+        print(f"{name:<5} precision {precision:.0%}  recall {recall:.0%}  "
+              f"avg {seconds / len(fixtures) * 1000:.2f} ms/resume")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Fake OpenAI-style chat completion server with injected latency and errors,
+for exercising the model router without the HF router.
+
+Usage:
+    python -m benchmarks.fake_model_server [--port 9001] [--latency 0.3] [--jitter 0.1]
+        [--slow-rate 0.05] [--slow 3.0] [--error-rate 0.0] [--reply TEXT]
+
+Serves POST /v1/chat/completions (plain and stream=true) for any model
+name. Every response waits latency ± jitter seconds; slow-rate of them
+wait `slow` seconds instead (the tail), and error-rate of them return a
+503. Point the app at it with, e.g.:
+
+    MODEL_ENDPOINTS="mistralai/Mistral-7B-Instruct-v0.2=http://127.0.0.1:9001"
+
+POST /admin with a JSON object of the same fields (latency, jitter,
+slow_rate, slow, error_rate) changes them on a running server.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = json.dumps({"feedback": "Clear and correct.", "rating": "Good", "is_satisfactory": True})
+
+
+class FakeModel:
+    FIELDS = ("latency", "jitter", "slow_rate", "slow", "error_rate")
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.1, slow_rate: float = 0.0,
+                 slow: float = 3.0, error_rate: float = 0.0, reply: str = DEFAULT_REPLY):
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow = slow
+        self.error_rate = error_rate
+        self.reply = reply
+        self.requests = 0
+
+    def configure(self, **changes):
+        for name, value in changes.items():
+            if name in self.FIELDS:
+                setattr(self, name, float(value))
+
+    def delay(self) -> float:
+        if random.random() < self.slow_rate:
+            return self.slow
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under a burst of clients
+    request_queue_size = 256
+
+
+def make_handler(model: FakeModel):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            try:
+                self._handle()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client gave up on us: a cancelled hedge
+
+        def _handle(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if self.path == "/admin":
+                model.configure(**payload)
+                return self._json(200, {f: getattr(model, f) for f in FakeModel.FIELDS})
+            if self.path != "/v1/chat/completions":
+                return self._json(404, {"error": "not found"})
+
+            model.requests += 1
+            time.sleep(model.delay())
+            if random.random() < model.error_rate:
+                return self._json(503, {"error": "injected failure"})
+            usage = {"prompt_tokens": 100, "completion_tokens": len(model.reply) // 4}
+            if payload.get("stream"):
+                return self._stream(payload, usage)
+            self._json(200, {
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": model.reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        def _stream(self, payload: dict, usage: dict):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for line in model.reply.splitlines(keepends=True):
+                chunk = {"model": payload.get("model"), "choices": [{"index": 0, "delta": {"content": line}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\ndata: [DONE]\n\n".encode("utf-8"))
+            self.close_connection = True
+
+    return Handler
+
+
+def serve(model: FakeModel, port: int = 0, host: str = "127.0.0.1") -> FakeServer:
+    """
+    Starts a server in a daemon thread; port 0 picks a free one
+    (server.server_port). Stop it with server.shutdown().
+    """
+    server = FakeServer((host, port), make_handler(model))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow", type=float, default=3.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    args = parser.parse_args()
+
+    model = FakeModel(args.latency, args.jitter, args.slow_rate, args.slow, args.error_rate, args.reply)
+    server = FakeServer((args.host, args.port), make_handler(model))
+    print(f"fake model server on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Concurrency stress test for the session store.
+
+Usage:
+    python -m benchmarks.stress_sessions [--questions 50] [--tasks 32] [--threads 8] [--store memory|sql]
+
+Hammers one session from many asyncio tasks and threadpool threads at once:
+every worker keeps submitting an answer for the index it last saw (so most
+submits are duplicates that must be rejected), while others write feedback
+and cached audio and read the session. Afterwards it checks the invariants:
+- every question was answered exactly once, in order, and nothing was skipped
+- current_index == number of answers, is_completed only at the end
+- no reader ever saw an index past the question list or a torn snapshot
+Exits non-zero on any violation.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.session_manager import SessionManager
+
+violations = []
+
+
+def check(condition: bool, message: str):
+    if not condition:
+        violations.append(message)
+
+
+def reader(store, session_id: str, total: int):
+    session = store.get_session(session_id)
+    index = session.current_index
+    check(0 <= index <= total, f"index {index} out of range")
+    check(len(session.questions) == total, "question list changed")
+    check(all(i < total for i in session.feedbacks), "feedback for unknown question")
+    if session.is_completed:
+        check(index >= total - 1, f"completed at index {index}")
+
+
+def answer_loop(store, session_id: str, total: int, worker: str, accepted: list, start: threading.Barrier):
+    start.wait()
+    while not store.is_finished(session_id):
+        expected = store.get_session(session_id).current_index
+        time.sleep(random.random() * 1e-4)  # widen the read -> submit window
+        if store.submit_answer(session_id, f"{worker}:{expected}", expected_index=expected):
+            accepted.append(expected)
+        store.add_feedback(session_id, max(expected - 1, 0), {"score": random.randint(0, 10)})
+        store.set_cached_audio(session_id, min(expected + 1, total - 1), f"/storage/audio/{worker}.mp3")
+        reader(store, session_id, total)
+
+
+async def async_worker(store, session_id: str, total: int, name: str, accepted: list):
+    while not store.is_finished(session_id):
+        expected = store.get_session(session_id).current_index
+        await asyncio.sleep(0)  # let other tasks read the same index
+        async with store.async_lock(session_id):
+            if store.submit_answer(session_id, f"{name}:{expected}", expected_index=expected):
+                accepted.append(expected)
+        reader(store, session_id, total)
+
+
+async def run(store, total: int, tasks: int, threads: int):
+    session_id = store.create_session([f"Question {i}?" for i in range(total)])
+    accepted = []
+
+    loop = asyncio.get_running_loop()
+    start = threading.Barrier(threads)
+    # Own pool: the barrier needs every thread running at once
+    pool = ThreadPoolExecutor(max_workers=threads)
+    thread_jobs = [
+        loop.run_in_executor(pool, answer_loop, store, session_id, total, f"thread{i}", accepted, start)
+        for i in range(threads)
+    ]
+    task_jobs = [async_worker(store, session_id, total, f"task{i}", accepted) for i in range(tasks)]
+    started = time.perf_counter()
+    await asyncio.gather(*thread_jobs, *task_jobs)
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+
+    session = store.get_session(session_id)
+    check(sorted(accepted) == list(range(total)), f"accepted indexes {sorted(accepted)}")
+    check(len(session.answers) == total, f"{len(session.answers)} answers for {total} questions")
+    check(session.current_index == total and session.is_completed, "session did not finish cleanly")
+    check(
+        [int(a.split(":")[1]) for a in session.answers] == list(range(total)),
+        "answers stored out of order",
+    )
+    return elapsed, store.stale_submits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--store", choices=("memory", "sql"), default="memory")
+    args = parser.parse_args()
+    # Switch threads as often as possible to provoke interleavings
+    sys.setswitchinterval(1e-6)
+
+    if args.store == "sql":
+        from app.services.session_store_sql import SqlSessionManager
+        store = SqlSessionManager()
+    else:
+        store = SessionManager()
+
+    elapsed, rejected = asyncio.run(run(store, args.questions, args.tasks, args.threads))
+    print(f"{args.questions} questions, {args.tasks} tasks + {args.threads} threads, {args.store} store")
+    print(f"finished in {elapsed:.2f}s, {rejected} duplicate submits rejected")
+    if violations:
+        print(f"\n{len(violations)} invariant violation(s):")
+        for message in violations[:20]:
+            print(f"  - {message}")
+        sys.exit(1)
+    print("all invariants hold")
+
+
+if __name__ == "__main__":
+    main()